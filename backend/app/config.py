@@ -15,6 +15,70 @@ class Settings:
     DB_NAME: str = os.getenv("DB_NAME", "postgres")
     root_path: str = os.getenv("ROOT_PATH", "")
 
+    TOOLS_CONTAINER_NAME: str = os.getenv("TOOLS_CONTAINER_NAME", "security-tools")
+    TOOLS_SHARED_DIR: str = os.getenv("TOOLS_SHARED_DIR", "/home/app/shared")
+    TOOLS_RUNNER_SOCKET: str = os.getenv("TOOLS_RUNNER_SOCKET", "/home/app/shared/runner.sock")
+    TOOLS_RUNNER_POOL_SIZE: int = int(os.getenv("TOOLS_RUNNER_POOL_SIZE", "8"))
+    TOOLS_RUNNER_CONNECT_TIMEOUT: float = float(os.getenv("TOOLS_RUNNER_CONNECT_TIMEOUT", "2"))
+    # Seconds between SIGTERM and SIGKILL when a tool is stopped on timeout, cancel or shutdown
+    TOOLS_KILL_GRACE_SECONDS: float = float(os.getenv("TOOLS_KILL_GRACE_SECONDS", "5"))
+    # Bytes of a tool's stderr kept (the tail) and stored with its result
+    TOOLS_STDERR_TAIL_BYTES: int = int(os.getenv("TOOLS_STDERR_TAIL_BYTES", "8192"))
+    # Tool report files of at least this many bytes are decoded in the result process pool
+    TOOLS_OUTPUT_OFFLOAD_BYTES: int = int(os.getenv("TOOLS_OUTPUT_OFFLOAD_BYTES", str(1024 * 1024)))
+    PARTIAL_RESULTS_MAX_BYTES: int = int(os.getenv("PARTIAL_RESULTS_MAX_BYTES", str(256 * 1024 * 1024)))
+    PARTIAL_RESULTS_TTL_SECONDS: int = int(os.getenv("PARTIAL_RESULTS_TTL_SECONDS", "3600"))
+
+    SCAN_WORKER_CONCURRENCY: int = int(os.getenv("SCAN_WORKER_CONCURRENCY", "4"))
+    SCAN_WORKER_POLL_INTERVAL: float = float(os.getenv("SCAN_WORKER_POLL_INTERVAL", "2"))
+    SCAN_JOB_HEARTBEAT_SECONDS: int = int(os.getenv("SCAN_JOB_HEARTBEAT_SECONDS", "15"))
+    SCAN_JOB_STALE_SECONDS: int = int(os.getenv("SCAN_JOB_STALE_SECONDS", "90"))
+    SCAN_JOB_MAX_ATTEMPTS: int = int(os.getenv("SCAN_JOB_MAX_ATTEMPTS", "3"))
+
+    # Per-tool process limits of each worker, e.g. "amass=2,subfinder=4,theharvester=2"
+    TOOL_SLOTS: str = os.getenv("TOOL_SLOTS", "amass=2,subfinder=4,theharvester=2")
+    TOOL_DEFAULT_SLOTS: int = int(os.getenv("TOOL_DEFAULT_SLOTS", "2"))
+    # Queued scans above which POST /scan/ answers 429 (0 disables admission control)
+    SCAN_QUEUE_MAX_PENDING: int = int(os.getenv("SCAN_QUEUE_MAX_PENDING", "200"))
+    SCAN_ESTIMATED_DURATION_SECONDS: int = int(os.getenv("SCAN_ESTIMATED_DURATION_SECONDS", "150"))
+
+    # Domains amass/subfinder enumerate in one process, e.g. "amass=20,subfinder=50" (tools not
+    # listed run one process per domain); a batch starts when full or after TOOL_BATCH_MAX_WAIT_SECONDS
+    TOOL_BATCH_SIZES: str = os.getenv("TOOL_BATCH_SIZES", "")
+    TOOL_BATCH_MAX_WAIT_SECONDS: float = float(os.getenv("TOOL_BATCH_MAX_WAIT_SECONDS", "5"))
+
+    # Seconds a tool's result is reused for later scans of the same domain (0 disables)
+    TOOL_CACHE_TTLS: str = os.getenv("TOOL_CACHE_TTLS", "amass=21600,subfinder=21600,theharvester=10800")
+
+    # Seconds a scan's row updates are buffered so close updates share one UPDATE
+    SCAN_PERSIST_DELAY_SECONDS: float = float(os.getenv("SCAN_PERSIST_DELAY_SECONDS", "0.5"))
+
+    # Streamed findings are written every N new findings or T seconds, whichever comes first
+    FINDINGS_FLUSH_BATCH_SIZE: int = int(os.getenv("FINDINGS_FLUSH_BATCH_SIZE", "500"))
+    FINDINGS_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("FINDINGS_FLUSH_INTERVAL_SECONDS", "2"))
+    # Consecutive failed flushes after which a batch is stored by halves and the rows that still fail are dropped
+    FINDINGS_FLUSH_MAX_FAILURES: int = int(os.getenv("FINDINGS_FLUSH_MAX_FAILURES", "3"))
+
+    # Server-Sent Events of scan progress
+    SCAN_EVENTS_POLL_INTERVAL: float = float(os.getenv("SCAN_EVENTS_POLL_INTERVAL", "2"))
+    SCAN_EVENTS_KEEPALIVE_SECONDS: float = float(os.getenv("SCAN_EVENTS_KEEPALIVE_SECONDS", "15"))
+    SCAN_EVENTS_RETRY_MS: int = int(os.getenv("SCAN_EVENTS_RETRY_MS", "3000"))
+    SCAN_EVENTS_RETENTION_SECONDS: int = int(os.getenv("SCAN_EVENTS_RETENTION_SECONDS", "604800"))
+    # Values a `findings` event carries at most; larger batches are flagged as truncated
+    SCAN_EVENTS_MAX_FINDINGS: int = int(os.getenv("SCAN_EVENTS_MAX_FINDINGS", "200"))
+
+    # Serialised responses of finished scans kept in each API process, plus an optional
+    # shared Redis cache (needs the `redis` package) used by every process
+    RESULT_CACHE_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESULT_CACHE_REDIS_URL: str = os.getenv("RESULT_CACHE_REDIS_URL", "")
+    RESULT_CACHE_TTL_SECONDS: int = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+
+    # CPU-heavy result processing (report decoding, merging, result documents) of at least
+    # this many findings runs in a pool of RESULT_POOL_WORKERS processes (0 keeps it inline)
+    RESULT_OFFLOAD_MIN_ITEMS: int = int(os.getenv("RESULT_OFFLOAD_MIN_ITEMS", "20000"))
+    RESULT_POOL_WORKERS: int = int(os.getenv("RESULT_POOL_WORKERS", "2"))
+    RESULT_POOL_NICE: int = int(os.getenv("RESULT_POOL_NICE", "10"))
+
     @property
     def DATABASE_URL(self):
         """
@@ -0,0 +1,114 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case, literal, tuple_, asc
+from app.db.models.asset import Asset
+from app.db.models.finding import Finding
+from tools.findings import normalize_hostname
+from typing import Optional, List, Tuple
+from datetime import datetime
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _upsert_from_findings(dialect: str, scan_id: str, apex: str):
+    """
+    INSERT ... SELECT of a scan's distinct findings into `assets`, merging with existing rows.
+    """
+    rows = (
+        select(
+            literal(apex),
+            Finding.kind,
+            Finding.value,
+            func.min(Finding.first_seen_at),
+            func.max(Finding.first_seen_at),
+            literal(1),
+            literal(scan_id),
+        )
+        .where(Finding.scan_id == scan_id)
+        .group_by(Finding.kind, Finding.value)
+    )
+    columns = ["apex", "kind", "value", "first_seen", "last_seen", "seen_count", "last_scan_id"]
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(Asset).from_select(columns, rows)
+        new = stmt.inserted
+        least, greatest = func.least, func.greatest
+    else:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+            least, greatest = func.least, func.greatest
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+            least, greatest = func.min, func.max
+        stmt = insert(Asset).from_select(columns, rows)
+        new = stmt.excluded
+
+    values = {
+        "first_seen": least(Asset.first_seen, new.first_seen),
+        "last_seen": greatest(Asset.last_seen, new.last_seen),
+        "seen_count": Asset.seen_count + case((Asset.last_scan_id == new.last_scan_id, 0), else_=1),
+        "last_scan_id": new.last_scan_id,
+    }
+    if dialect == "mysql":
+        return stmt.on_duplicate_key_update(**values)
+    return stmt.on_conflict_do_update(index_elements=["apex", "kind", "value"], set_=values)
+
+
+async def upsert_scan_assets(db: AsyncSession, scan_id: str, domain: str) -> int:
+    """
+    Merges a scan's findings into the asset inventory of its domain in one statement.
+    """
+    result = await db.execute(_upsert_from_findings(db.bind.dialect.name, scan_id, normalize_hostname(domain)))
+    await db.commit()
+    return result.rowcount
+
+
+def encode_asset_cursor(asset: Asset) -> str:
+    raw = json.dumps([asset.kind, asset.value]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_asset_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Raises ValueError for a cursor that was not produced by encode_asset_cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        kind, value = json.loads(raw)
+        return str(kind), str(value)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+async def get_assets_page(
+    db: AsyncSession,
+    apex: str,
+    kind: Optional[str] = None,
+    seen_since: Optional[datetime] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Asset], Optional[str]]:
+    """
+    Retrieves one page of a domain's assets in (kind, value) order, walking the
+    primary key with keyset pagination. Returns the assets and the next page's
+    cursor (None on the last page).
+    """
+    query = select(Asset).filter(Asset.apex == normalize_hostname(apex))
+    if kind:
+        query = query.filter(Asset.kind == kind)
+    if seen_since is not None:
+        query = query.filter(Asset.last_seen >= seen_since)
+    if cursor:
+        query = query.filter(tuple_(Asset.kind, Asset.value) > tuple_(*decode_asset_cursor(cursor)))
+    query = query.order_by(asc(Asset.kind), asc(Asset.value)).limit(limit + 1)
+
+    result = await db.execute(query)
+    assets = list(result.scalars().all())
+    next_cursor = None
+    if len(assets) > limit:
+        assets = assets[:limit]
+        next_cursor = encode_asset_cursor(assets[-1])
+    return assets, next_cursor
@@ -0,0 +1,190 @@
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, insert, func, literal, or_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from app.db.models.finding import Finding
+from app.db.models.scan import Scan
+from app.crud.scan import domain_filter
+from typing import List, Dict, Any, AsyncIterator, Iterable, Optional, Tuple
+from datetime import datetime
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+COPY_COLUMNS = ("scan_id", "tool", "kind", "value", "first_seen_at")
+
+# Hostnames and email addresses are at most 254 characters; anything longer is not a finding.
+VALUE_MAX_LENGTH = Finding.__table__.c.value.type.length
+
+Grouped = Dict[str, Dict[str, List[str]]]
+
+
+async def add_findings(db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+    """
+    Appends findings ({scan_id, tool, kind, value, first_seen_at}) in bulk:
+    COPY on Postgres, one executemany INSERT elsewhere. Values longer than the
+    column are dropped first, as one of them would fail the whole batch.
+    Returns the number of rows stored.
+    """
+    valid = [row for row in rows if len(row["value"]) <= VALUE_MAX_LENGTH]
+    if len(valid) < len(rows):
+        logger.warning(f"Dropped {len(rows) - len(valid)} findings longer than {VALUE_MAX_LENGTH} characters")
+    rows = valid
+    if not rows:
+        return 0
+    if db.bind.dialect.name == "postgresql":
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Finding.__tablename__,
+            records=[tuple(row[column] for column in COPY_COLUMNS) for row in rows],
+            columns=COPY_COLUMNS,
+        )
+    else:
+        await db.execute(insert(Finding), rows)
+    await db.commit()
+    return len(rows)
+
+
+def finding_rows(scan_id: str, tool: str, results: Dict[str, Any], kinds: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Rows for the findings lists of one tool result.
+    """
+    now = datetime.now()
+    return [
+        {"scan_id": scan_id, "tool": tool.lower(), "kind": kind, "value": value, "first_seen_at": now}
+        for kind in kinds
+        for value in results.get(kind) or []
+    ]
+
+
+def _group(triples: Iterable[Tuple[str, str, str]]) -> Grouped:
+    grouped: Grouped = {}
+    for tool, kind, value in triples:
+        grouped.setdefault(tool, {}).setdefault(kind, []).append(value)
+    return grouped
+
+
+async def get_findings_by_tool(db: AsyncSession, scan_id: str) -> Grouped:
+    """
+    Retrieves a scan's findings grouped by tool and kind, in discovery order.
+    """
+    result = await db.execute(
+        select(Finding.tool, Finding.kind, Finding.value)
+        .filter(Finding.scan_id == scan_id)
+        .order_by(Finding.id)
+    )
+    return _group(result)
+
+
+def _findings_aggregate(dialect: str):
+    row = (Finding.tool, Finding.kind, Finding.value)
+    if dialect == "postgresql":
+        return func.json_agg(aggregate_order_by(func.json_build_array(*row), Finding.id))
+    if dialect == "sqlite":
+        return func.json_group_array(func.json_array(*row))
+    return func.json_arrayagg(func.json_array(*row))
+
+
+async def get_scan_with_findings(db: AsyncSession, scan_id: str) -> Tuple[Optional[Scan], Grouped]:
+    """
+    Retrieves a scan and its findings grouped by tool and kind in a single query:
+    the findings are aggregated into one JSON array by a correlated subquery.
+    """
+    findings = (
+        select(_findings_aggregate(db.bind.dialect.name))
+        .where(Finding.scan_id == Scan.id)
+        .scalar_subquery()
+    )
+    result = await db.execute(select(Scan, findings).filter(Scan.id == scan_id))
+    row = result.first()
+    if row is None:
+        return None, {}
+    scan, triples = row
+    if isinstance(triples, str):
+        triples = json.loads(triples)
+    return scan, _group(triples or [])
+
+
+async def copy_findings(db: AsyncSession, source_scan_id: str, target_scan_ids: List[str], commit: bool = True) -> None:
+    """
+    Copies one scan's findings to other scans with INSERT ... SELECT.
+    """
+    for target in target_scan_ids:
+        await db.execute(
+            insert(Finding).from_select(
+                list(COPY_COLUMNS),
+                select(literal(target), Finding.tool, Finding.kind, Finding.value, Finding.first_seen_at)
+                .filter(Finding.scan_id == source_scan_id)
+                .order_by(Finding.id),
+            )
+        )
+    if commit:
+        await db.commit()
+
+
+async def delete_findings(db: AsyncSession, scan_id: str) -> int:
+    """
+    Removes a scan's findings, e.g. those of an interrupted earlier attempt.
+    """
+    result = await db.execute(delete(Finding).where(Finding.scan_id == scan_id))
+    await db.commit()
+    return result.rowcount
+
+
+EXPORT_COLUMNS = ("scan_id", "domain", "tool", "kind", "value", "first_seen_at")
+DEDUP_EXPORT_COLUMNS = ("kind", "value", "first_seen_at", "last_seen_at", "scans")
+
+
+async def stream_findings(
+    db: AsyncSession,
+    domains: List[str],
+    domain_match: str = "exact",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    kinds: Optional[List[str]] = None,
+    dedup: bool = False,
+    batch_size: int = 1000,
+) -> AsyncIterator[Any]:
+    """
+    Streams the findings of every active scan of `domains` created in [since, until)
+    from a server-side cursor, `batch_size` rows at a time, so memory use does not
+    grow with the export. Rows have EXPORT_COLUMNS, or DEDUP_EXPORT_COLUMNS with
+    `dedup`, where each (kind, value) appears once and the database does the grouping.
+    """
+    dialect = db.bind.dialect.name
+    filters = [Scan.is_active == True, or_(*(domain_filter(dialect, domain, domain_match) for domain in domains))]
+    if since is not None:
+        filters.append(Scan.created_date >= since)
+    if until is not None:
+        filters.append(Scan.created_date < until)
+    if kinds:
+        filters.append(Finding.kind.in_(kinds))
+
+    if dedup:
+        query = (
+            select(
+                Finding.kind,
+                Finding.value,
+                func.min(Finding.first_seen_at).label("first_seen_at"),
+                func.max(Finding.first_seen_at).label("last_seen_at"),
+                func.count(func.distinct(Finding.scan_id)).label("scans"),
+            )
+            .join(Scan, Scan.id == Finding.scan_id)
+            .filter(*filters)
+            .group_by(Finding.kind, Finding.value)
+            .order_by(Finding.kind, Finding.value)
+        )
+    else:
+        query = (
+            select(Finding.scan_id, Scan.domain, Finding.tool, Finding.kind, Finding.value, Finding.first_seen_at)
+            .join(Scan, Scan.id == Finding.scan_id)
+            .filter(*filters)
+            .order_by(Finding.id)
+        )
+
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for partition in result.partitions():
+        for row in partition:
+            yield row
@@ -1,10 +1,14 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete, func, and_, or_, desc, asc
-from app.db.models.scan import Scan
+from sqlalchemy import select, update, delete, func, and_, or_, desc, asc, cast, extract, text, tuple_, Integer
+from sqlalchemy.orm import load_only
+from app.db.models.scan import Scan, reversed_domain
+from app.crud import scan_stats as crud_scan_stats
 from app.schemas.scan import ScanCreate, ScanUpdate, ScanOut
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
+import base64
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,6 +23,36 @@ async def get_scan_by_id(db: AsyncSession, scan_id: str) -> Optional[Scan]:
     return result.scalars().first()
 
 
+async def get_scan_version(db: AsyncSession, scan_id: str):
+    """
+    Retrieves only (id, status, is_active, updated_date) of a scan, enough to
+    validate a cached response without loading the result columns.
+    """
+    result = await db.execute(
+        select(Scan.id, Scan.status, Scan.is_active, Scan.updated_date).filter(Scan.id == scan_id)
+    )
+    return result.first()
+
+
+async def get_previous_scan(db: AsyncSession, scan: Scan) -> Optional[Scan]:
+    """
+    Retrieves the latest active, finished scan of the same domain created before `scan`.
+    """
+    result = await db.execute(
+        select(Scan)
+        .options(load_only(Scan.id, Scan.domain, Scan.status, Scan.created_date, Scan.updated_date))
+        .filter(
+            Scan.domain == scan.domain,
+            Scan.is_active == True,
+            Scan.status == "finished",
+            tuple_(Scan.created_date, Scan.id) < tuple_(scan.created_date, scan.id),
+        )
+        .order_by(desc(Scan.created_date), desc(Scan.id))
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
 async def get_scans_by_domain(db: AsyncSession, domain: str, skip: int = 0, limit: int = 100) -> List[Scan]:
     """
     Retrieves scans for a specific domain with pagination.
@@ -47,31 +81,66 @@ async def get_scans_by_user(db: AsyncSession, user_id: int, skip: int = 0, limit
     return list(result.scalars().all())
 
 
+DOMAIN_MATCH_MODES = ("exact", "suffix", "substring")
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def domain_filter(dialect: str, domain: str, match: str = "substring"):
+    """
+    WHERE clause for a domain search, each mode backed by an index:
+
+      exact      the domain itself (btree on domain_reversed)
+      suffix     the domain and everything under it, e.g. "*.corp.example.com"
+                 (prefix range of domain_reversed)
+      substring  any domain containing the text (pg_trgm GIN index on Postgres)
+    """
+    if match == "exact":
+        return Scan.domain_reversed == reversed_domain(domain)
+    if match == "suffix":
+        key = reversed_domain(domain.strip().lstrip("*."))
+        if dialect == "sqlite":
+            # SQLite only uses an index for LIKE under case-insensitive collations; use the equivalent range.
+            under = and_(Scan.domain_reversed >= key + ".", Scan.domain_reversed < key + "/")
+        else:
+            under = Scan.domain_reversed.like(_like_escape(key) + ".%", escape="\\")
+        return or_(Scan.domain_reversed == key, under)
+    if match == "substring":
+        return Scan.domain.ilike(f"%{_like_escape(domain.strip())}%", escape="\\")
+    raise ValueError(f"Unknown domain match mode: {match!r}")
+
+
 async def get_scans(
     db: AsyncSession, 
     skip: int = 0, 
     limit: int = 100, 
     status: Optional[str] = None,
     domain: Optional[str] = None,
+    domain_match: str = "substring",
     user_id: Optional[int] = None,
     is_public: Optional[bool] = None,
+    min_subdomains: Optional[int] = None,
     order_by: str = "created_date",
     order_direction: str = "desc"
 ) -> List[Scan]:
     """
     Retrieves a list of scans from the database with filtering and pagination.
     """
-    query = select(Scan).filter(Scan.is_active == True)
+    query = select(Scan).options(load_only(*LIST_COLUMNS)).filter(Scan.is_active == True)
     
     
     if status:
         query = query.filter(Scan.status == status)
     if domain:
-        query = query.filter(Scan.domain.ilike(f"%{domain}%"))
+        query = query.filter(domain_filter(db.bind.dialect.name, domain, domain_match))
     if user_id:
         query = query.filter(Scan.user_id == user_id)
     if is_public is not None:
         query = query.filter(Scan.is_public == is_public)
+    if min_subdomains is not None:
+        query = query.filter(Scan.total_subdomains >= min_subdomains)
     
     
     order_column = getattr(Scan, order_by, Scan.created_date)
@@ -87,9 +156,87 @@ async def get_scans(
     return list(result.scalars().all())
 
 
-async def create_scan(db: AsyncSession, scan: ScanCreate, created_by: Optional[str] = None) -> Scan:
+# Columns of the slim list projection; the tool JSON columns are never loaded for list pages.
+LIST_COLUMNS = (
+    Scan.id, Scan.domain, Scan.status, Scan.created_date, Scan.started_at, Scan.finished_at,
+    Scan.duration_seconds, Scan.error_message, Scan.total_subdomains, Scan.total_emails,
+    Scan.total_ips, Scan.total_hosts, Scan.user_id, Scan.is_public,
+)
+
+
+def encode_scan_cursor(scan: Scan) -> str:
     """
-    Creates a new scan record in the database.
+    Opaque cursor pointing just past `scan` in (created_date, id) order.
+    """
+    raw = json.dumps([scan.created_date.isoformat(), scan.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_scan_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Raises ValueError for a cursor that was not produced by encode_scan_cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_date, scan_id = json.loads(raw)
+        return datetime.fromisoformat(created_date), str(scan_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+async def get_scans_page(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    domain: Optional[str] = None,
+    domain_match: str = "substring",
+    user_id: Optional[int] = None,
+    is_public: Optional[bool] = None,
+    min_subdomains: Optional[int] = None,
+    order_direction: str = "desc",
+) -> Tuple[List[Scan], Optional[str]]:
+    """
+    Retrieves one page of scans in (created_date, id) order using keyset pagination,
+    with only the list columns loaded. Returns the scans and the cursor of the next
+    page (None on the last page).
+    """
+    query = select(Scan).options(load_only(*LIST_COLUMNS)).filter(Scan.is_active == True)
+
+    if status:
+        query = query.filter(Scan.status == status)
+    if domain:
+        query = query.filter(domain_filter(db.bind.dialect.name, domain, domain_match))
+    if user_id:
+        query = query.filter(Scan.user_id == user_id)
+    if is_public is not None:
+        query = query.filter(Scan.is_public == is_public)
+    if min_subdomains is not None:
+        query = query.filter(Scan.total_subdomains >= min_subdomains)
+
+    key = tuple_(Scan.created_date, Scan.id)
+    descending = order_direction.lower() == "desc"
+    if cursor:
+        after = tuple_(*decode_scan_cursor(cursor))
+        query = query.filter(key < after if descending else key > after)
+    if descending:
+        query = query.order_by(desc(Scan.created_date), desc(Scan.id))
+    else:
+        query = query.order_by(asc(Scan.created_date), asc(Scan.id))
+
+    result = await db.execute(query.limit(limit + 1))
+    scans = list(result.scalars().all())
+    next_cursor = None
+    if len(scans) > limit:
+        scans = scans[:limit]
+        next_cursor = encode_scan_cursor(scans[-1])
+    return scans, next_cursor
+
+
+async def create_scan(db: AsyncSession, scan: ScanCreate, created_by: Optional[str] = None, commit: bool = True) -> Scan:
+    """
+    Creates a new scan record in the database. With commit=False the row is only
+    flushed, so the caller can commit it together with what belongs to it.
     """
     db_scan = Scan(
         domain=scan.domain,
@@ -98,16 +245,97 @@ async def create_scan(db: AsyncSession, scan: ScanCreate, created_by: Optional[s
         scan_options=scan.scan_options,
         user_id=scan.user_id,
         is_public=scan.is_public or False,
+        force_refresh=scan.force_refresh,
         created_by=created_by,
         updated_by=created_by,
     )
     db.add(db_scan)
-    await db.commit()
-    await db.refresh(db_scan)
+    await db.flush()
+    await crud_scan_stats.apply_scan_changes(db, {}, [db_scan.id])
+    if commit:
+        await db.commit()
+        await db.refresh(db_scan)
     return db_scan
 
 
-async def update_scan(db: AsyncSession, scan_id: str, scan_update: ScanUpdate, updated_by: Optional[str] = None) -> Optional[Scan]:
+TERMINAL_STATUSES = ("finished", "error", "cancelled")
+
+# Columns the stats rollup is derived from; updates touching them also update the rollup.
+STATS_COLUMNS = frozenset(("status", "is_active", "user_id", "domain", "created_date", "duration_seconds"))
+
+
+def seconds_between(dialect: str, start, end):
+    """
+    SQL expression for the whole seconds from `start` to `end`.
+    """
+    if dialect == "postgresql":
+        return cast(extract("epoch", end - start), Integer)
+    if dialect == "sqlite":
+        return cast((func.julianday(end) - func.julianday(start)) * 86400, Integer)
+    return func.timestampdiff(text("SECOND"), start, end)
+
+
+def scan_status_values(
+    dialect: str,
+    status: str,
+    now: datetime,
+    error_message: Optional[str] = None,
+    started_at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Column values for a status change. started_at is only set the first time a
+    scan runs, and finished_at/duration_seconds are derived in SQL from the stored
+    started_at, so no SELECT is needed beforehand. `started_at` is used when the
+    scan's running transition has not been written yet.
+    """
+    values: Dict[str, Any] = {"status": status}
+    if status == "running":
+        values["started_at"] = func.coalesce(Scan.started_at, started_at or now)
+    elif status in TERMINAL_STATUSES:
+        values["finished_at"] = now
+        start = func.coalesce(Scan.started_at, started_at) if started_at else Scan.started_at
+        values["duration_seconds"] = seconds_between(dialect, start, now)
+    if error_message:
+        values["error_message"] = error_message
+    return values
+
+
+async def update_scan_fields(
+    db: AsyncSession,
+    scan_id: str,
+    values: Dict[str, Any],
+    returning: bool = False,
+    commit: bool = True,
+) -> Optional[Scan]:
+    """
+    Applies column values (plain values or SQL expressions) to a scan in one UPDATE.
+    The updated row is only read back when `returning` is set.
+    """
+    stmt = update(Scan).where(Scan.id == scan_id).values(**values)
+    tracked = not STATS_COLUMNS.isdisjoint(values)
+    before = await crud_scan_stats.snapshot_scans(db, [scan_id]) if tracked else None
+    scan = None
+    if returning and db.bind.dialect.name in ("postgresql", "sqlite"):
+        result = await db.execute(stmt.returning(Scan), execution_options={"synchronize_session": False})
+        scan = result.scalars().first()
+    else:
+        await db.execute(stmt)
+    if tracked:
+        await crud_scan_stats.apply_scan_changes(db, before, [scan_id])
+    if commit:
+        await db.commit()
+    if returning and scan is None:
+        scan = await get_scan_by_id(db, scan_id)
+    return scan
+
+
+async def update_scan(
+    db: AsyncSession,
+    scan_id: str,
+    scan_update: ScanUpdate,
+    updated_by: Optional[str] = None,
+    returning: bool = True,
+) -> Optional[Scan]:
     """
     Updates an existing scan's details in the database.
     """
@@ -119,19 +347,10 @@ async def update_scan(db: AsyncSession, scan_id: str, scan_update: ScanUpdate, u
             duration = (update_data["finished_at"] - update_data["started_at"]).total_seconds()
             update_data["duration_seconds"] = int(duration)
     
-    stmt = (
-        update(Scan)
-        .where(Scan.id == scan_id)
-        .values(
-            **update_data,
-            updated_by=updated_by,
-            updated_date=datetime.now()
-        )
-    )
     logger.debug(f"update_data: {update_data}")
-    await db.execute(stmt)
-    await db.commit()
-    return await get_scan_by_id(db, scan_id)
+    return await update_scan_fields(
+        db, scan_id, {**update_data, "updated_by": updated_by, "updated_date": datetime.now()}, returning=returning
+    )
 
 
 async def update_scan_status(
@@ -139,30 +358,17 @@ async def update_scan_status(
     scan_id: str, 
     status: str, 
     error_message: Optional[str] = None,
-    updated_by: Optional[str] = None
+    updated_by: Optional[str] = None,
+    returning: bool = False,
 ) -> Optional[Scan]:
     """
     Updates a scan's status and optionally sets error message.
+    Timestamps and duration are computed in the same UPDATE.
     """
-    update_data = {"status": status, "updated_by": updated_by, "updated_date": datetime.now()}
-    
-    if status == "running" and not await _scan_has_started_at(db, scan_id):
-        update_data["started_at"] = datetime.now()
-    elif status in ["finished", "error", "cancelled"]:
-        update_data["finished_at"] = datetime.now()
-        
-        scan = await get_scan_by_id(db, scan_id)
-        if scan and scan.started_at:
-            duration = (datetime.now() - scan.started_at).total_seconds()
-            update_data["duration_seconds"] = int(duration)
-    
-    if error_message:
-        update_data["error_message"] = error_message
-    
-    stmt = update(Scan).where(Scan.id == scan_id).values(**update_data)
-    await db.execute(stmt)
-    await db.commit()
-    return await get_scan_by_id(db, scan_id)
+    now = datetime.now()
+    values = scan_status_values(db.bind.dialect.name, status, now, error_message)
+    values.update(updated_by=updated_by, updated_date=now)
+    return await update_scan_fields(db, scan_id, values, returning=returning)
 
 
 async def update_scan_results(
@@ -172,7 +378,8 @@ async def update_scan_results(
     amass: Optional[Dict[str, Any]] = None,
     subfinder: Optional[Dict[str, Any]] = None,
     summary: Optional[Dict[str, Any]] = None,
-    updated_by: Optional[str] = None
+    updated_by: Optional[str] = None,
+    returning: bool = False,
 ) -> Optional[Scan]:
     """
     Updates scan results and metadata.
@@ -191,17 +398,33 @@ async def update_scan_results(
     if summary is not None:
         update_data["summary"] = summary
     
-    
-    stmt = update(Scan).where(Scan.id == scan_id).values(**update_data)
-    await db.execute(stmt)
-    await db.commit()
-    return await get_scan_by_id(db, scan_id)
+    return await update_scan_fields(db, scan_id, update_data, returning=returning)
+
+
+async def backfill_domain_reversed(db: AsyncSession, batch_size: int = 1000) -> int:
+    """
+    Fills domain_reversed for scans created before the column existed.
+    """
+    updated = 0
+    while True:
+        result = await db.execute(
+            select(Scan.id, Scan.domain).filter(Scan.domain_reversed.is_(None)).limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return updated
+        await db.execute(
+            update(Scan), [{"id": scan_id, "domain_reversed": reversed_domain(domain)} for scan_id, domain in rows]
+        )
+        await db.commit()
+        updated += len(rows)
 
 
 async def delete_scan(db: AsyncSession, scan_id: str, deleted_by: Optional[str] = None) -> bool:
     """
     Soft deletes a scan by setting is_active to False.
     """
+    before = await crud_scan_stats.snapshot_scans(db, [scan_id])
     stmt = (
         update(Scan)
         .where(Scan.id == scan_id)
@@ -212,6 +435,7 @@ async def delete_scan(db: AsyncSession, scan_id: str, deleted_by: Optional[str]
         )
     )
     result = await db.execute(stmt)
+    await crud_scan_stats.apply_scan_changes(db, before)
     await db.commit()
     return result.rowcount > 0
 
@@ -220,66 +444,19 @@ async def hard_delete_scan(db: AsyncSession, scan_id: str) -> bool:
     """
     Permanently deletes a scan from the database.
     """
+    before = await crud_scan_stats.snapshot_scans(db, [scan_id])
     stmt = delete(Scan).where(Scan.id == scan_id)
     result = await db.execute(stmt)
+    await crud_scan_stats.apply_scan_changes(db, before)
     await db.commit()
     return result.rowcount > 0
 
 
 async def get_scan_stats(db: AsyncSession, user_id: Optional[int] = None) -> Dict[str, Any]:
     """
-    Retrieves scanning statistics.
+    Retrieves scanning statistics from the incrementally maintained rollup.
     """
-    base_query = select(Scan).filter(Scan.is_active == True)
-    if user_id:
-        base_query = base_query.filter(Scan.user_id == user_id)
-    
-    
-    total_result = await db.execute(select(func.count(Scan.id)).select_from(base_query.subquery()))
-    total_scans = total_result.scalar()
-    
- 
-    status_query = (
-        select(Scan.status, func.count(Scan.id))
-        .select_from(base_query.subquery())
-        .group_by(Scan.status)
-    )
-    status_result = await db.execute(status_query)
-    status_counts = dict(status_result.fetchall())
-    
-   
-    yesterday = datetime.now() - timedelta(days=1)
-    recent_query = base_query.filter(Scan.created_date >= yesterday)
-    recent_result = await db.execute(select(func.count(Scan.id)).select_from(recent_query.subquery()))
-    recent_scans = recent_result.scalar()
-    
-    
-    domain_query = (
-        select(Scan.domain, func.count(Scan.id))
-        .select_from(base_query.subquery())
-        .group_by(Scan.domain)
-        .order_by(desc(func.count(Scan.id)))
-        .limit(10)
-    )
-    domain_result = await db.execute(domain_query)
-    top_domains = dict(domain_result.fetchall())
-    
-    
-    duration_query = (
-        select(func.avg(Scan.duration_seconds))
-        .select_from(base_query.subquery())
-        .filter(Scan.duration_seconds.isnot(None))
-    )
-    duration_result = await db.execute(duration_query)
-    avg_duration = duration_result.scalar()
-    
-    return {
-        "total_scans": total_scans,
-        "status_counts": status_counts,
-        "recent_scans_24h": recent_scans,
-        "top_domains": top_domains,
-        "average_duration_seconds": avg_duration
-    }
+    return await crud_scan_stats.get_scan_stats(db, user_id=user_id)
 
 
 async def get_running_scans(db: AsyncSession) -> List[Scan]:
@@ -322,13 +499,3 @@ async def count_scans_by_domain(db: AsyncSession, domain: str) -> int:
     )
     return result.scalar()
 
-
-async def _scan_has_started_at(db: AsyncSession, scan_id: str) -> bool:
-    """
-    Helper function to check if a scan has a started_at timestamp.
-    """
-    result = await db.execute(
-        select(Scan.started_at).filter(Scan.id == scan_id)
-    )
-    started_at = result.scalar()
-    return started_at is not None
\ No newline at end of file
@@ -0,0 +1,77 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, case
+from app.db.models.finding import Finding
+from app.db.models.scan_diff import ScanDiff
+from typing import Optional, Dict, Any
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _empty_change() -> Dict[str, list]:
+    return {"added": [], "removed": []}
+
+
+async def diff_findings(db: AsyncSession, scan_id: str, against_scan_id: str) -> Dict[str, Any]:
+    """
+    Findings added in `scan_id` and removed since `against_scan_id`, per tool and
+    over all tools. Each side is one GROUP BY over both scans' findings that keeps
+    the values present in only one of them, so neither result set is loaded whole.
+    """
+    in_scan = func.max(case((Finding.scan_id == scan_id, 1), else_=0)).label("in_scan")
+    both = Finding.scan_id.in_([scan_id, against_scan_id])
+    only_one = func.count(func.distinct(Finding.scan_id)) == 1
+
+    tools: Dict[str, Dict[str, Dict[str, list]]] = {}
+    result = await db.stream(
+        select(Finding.tool, Finding.kind, Finding.value, in_scan)
+        .filter(both)
+        .group_by(Finding.tool, Finding.kind, Finding.value)
+        .having(only_one)
+        .order_by(Finding.tool, Finding.kind, Finding.value)
+    )
+    async for tool, kind, value, added in result:
+        change = tools.setdefault(tool, {}).setdefault(kind, _empty_change())
+        change["added" if added else "removed"].append(value)
+
+    total: Dict[str, Dict[str, list]] = {}
+    result = await db.stream(
+        select(Finding.kind, Finding.value, in_scan)
+        .filter(both)
+        .group_by(Finding.kind, Finding.value)
+        .having(only_one)
+        .order_by(Finding.kind, Finding.value)
+    )
+    async for kind, value, added in result:
+        total.setdefault(kind, _empty_change())["added" if added else "removed"].append(value)
+
+    return {
+        "scan_id": scan_id,
+        "against_scan_id": against_scan_id,
+        "tools": tools,
+        "total": total,
+        "added": sum(len(change["added"]) for change in total.values()),
+        "removed": sum(len(change["removed"]) for change in total.values()),
+    }
+
+
+async def get_scan_diff(db: AsyncSession, scan_id: str, against_scan_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Retrieves a stored diff.
+    """
+    result = await db.execute(
+        select(ScanDiff.diff).filter(ScanDiff.scan_id == scan_id, ScanDiff.against_scan_id == against_scan_id)
+    )
+    return result.scalar()
+
+
+async def store_scan_diff(db: AsyncSession, scan_id: str, against_scan_id: str, diff: Dict[str, Any]) -> None:
+    """
+    Stores (or replaces) the diff of two finished scans.
+    """
+    await db.execute(
+        delete(ScanDiff).where(ScanDiff.scan_id == scan_id, ScanDiff.against_scan_id == against_scan_id)
+    )
+    db.add(ScanDiff(scan_id=scan_id, against_scan_id=against_scan_id, diff=diff, created_date=datetime.now()))
+    await db.commit()
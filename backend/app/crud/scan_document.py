@@ -0,0 +1,35 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from app.db.models.scan_document import ScanDocument
+from typing import Optional
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def get_result_document(db: AsyncSession, scan_id: str) -> Optional[ScanDocument]:
+    """
+    Retrieves the stored result document of a scan.
+    """
+    result = await db.execute(select(ScanDocument).filter(ScanDocument.scan_id == scan_id))
+    return result.scalars().first()
+
+
+async def store_result_document(db: AsyncSession, scan_id: str, version: str, content: bytes, raw_size: int) -> ScanDocument:
+    """
+    Stores (or replaces) a scan's gzip-compressed result document.
+    """
+    document = ScanDocument(
+        scan_id=scan_id,
+        version=version,
+        encoding="gzip",
+        content=content,
+        raw_size=raw_size,
+        created_date=datetime.now(),
+    )
+    await db.execute(delete(ScanDocument).where(ScanDocument.scan_id == scan_id))
+    db.add(document)
+    await db.commit()
+    logger.debug(f"Stored result document of scan {scan_id}: {raw_size} -> {len(content)} bytes")
+    return document
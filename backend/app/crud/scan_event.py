@@ -0,0 +1,81 @@
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, insert, text, func, and_, or_
+from app.db.models.scan import Scan
+from app.db.models.scan_event import ScanEvent
+from typing import List, Dict, Any, Iterable, Tuple
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel; the payload is the scan id.
+SCAN_EVENTS_CHANNEL = "scan_events"
+
+
+async def _next_seqs(db: AsyncSession, scan_ids: Iterable[str]) -> Dict[str, int]:
+    """
+    Locks the event streams of `scan_ids` until the transaction ends and returns
+    the next seq of each. Holding the lock until commit makes a scan's events
+    visible in seq order, so a reader past seq N never misses an event below it.
+    """
+    dialect = db.bind.dialect.name
+    next_seqs = {}
+    # A fixed order, so two transactions publishing for the same scans cannot deadlock.
+    for scan_id in sorted(scan_ids):
+        last = select(func.max(ScanEvent.seq)).filter(ScanEvent.scan_id == scan_id)
+        if dialect == "postgresql":
+            await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"{SCAN_EVENTS_CHANNEL}:{scan_id}"})
+        elif dialect == "mysql":
+            await db.execute(select(Scan.id).filter(Scan.id == scan_id).with_for_update())
+            # A locking read sees the latest commit rather than the transaction's snapshot.
+            last = last.with_for_update()
+        next_seqs[scan_id] = ((await db.execute(last)).scalar() or 0) + 1
+    return next_seqs
+
+
+async def add_scan_events(db: AsyncSession, events: Iterable[Tuple[str, str, Dict[str, Any]]], commit: bool = True) -> None:
+    """
+    Appends (scan_id, event, data) rows in one statement, numbering each scan's
+    events under its lock, and notifies listeners of the affected scans. On
+    Postgres the NOTIFY is delivered at commit.
+    """
+    events = list(events)
+    if not events:
+        return
+    now = datetime.now()
+    next_seqs = await _next_seqs(db, {scan_id for scan_id, _, _ in events})
+    rows = []
+    for scan_id, event, data in events:
+        rows.append({"scan_id": scan_id, "seq": next_seqs[scan_id], "event": event, "data": data, "created_date": now})
+        next_seqs[scan_id] += 1
+    await db.execute(insert(ScanEvent), rows)
+    if db.bind.dialect.name == "postgresql":
+        for scan_id in {row["scan_id"] for row in rows}:
+            await db.execute(text("SELECT pg_notify(:channel, :scan_id)"), {"channel": SCAN_EVENTS_CHANNEL, "scan_id": scan_id})
+    if commit:
+        await db.commit()
+
+
+async def get_scan_events_after(db: AsyncSession, cursors: Dict[str, int], limit: int = 500) -> List[ScanEvent]:
+    """
+    Retrieves the events of each scan in `cursors` with a seq greater than its
+    cursor, oldest first.
+    """
+    result = await db.execute(
+        select(ScanEvent)
+        .filter(or_(*(and_(ScanEvent.scan_id == scan_id, ScanEvent.seq > seq) for scan_id, seq in cursors.items())))
+        .order_by(ScanEvent.id)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def purge_scan_events(db: AsyncSession, retention_seconds: int) -> int:
+    """
+    Deletes events older than the retention period.
+    """
+    cutoff = datetime.now() - timedelta(seconds=retention_seconds)
+    result = await db.execute(delete(ScanEvent).where(ScanEvent.created_date < cutoff))
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,441 @@
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func, and_, text
+from app.db.models.scan import Scan
+from app.db.models.scan_job import ScanJob, ScanJobStatus
+from app.db.models.scan_worker import WorkerHeartbeat
+from app.crud.scan_event import add_scan_events
+from app.crud.finding import copy_findings
+from app.crud.scan import TERMINAL_STATUSES
+from app.crud import scan_stats as crud_scan_stats
+from tools.findings import normalize_hostname
+from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How long a MySQL enqueue waits for another enqueue of the same domain to commit.
+ENQUEUE_LOCK_TIMEOUT_SECONDS = 10
+
+
+ACTIVE_STATUSES = [ScanJobStatus.QUEUED.value, ScanJobStatus.RUNNING.value]
+
+# Scan columns copied from a leader's scan to the scans attached to it.
+SHARED_RESULT_COLUMNS = (
+    "theharvester", "amass", "subfinder", "summary", "error_message",
+    "total_subdomains", "total_emails", "total_ips", "total_hosts",
+    "status", "started_at", "finished_at", "duration_seconds",
+)
+
+
+def _leader_query(domain_key: str, force_refresh: bool):
+    query = select(ScanJob).filter(
+        ScanJob.domain_key == domain_key,
+        ScanJob.leader_job_id.is_(None),
+        ScanJob.status.in_(ACTIVE_STATUSES),
+    )
+    if force_refresh:
+        query = query.filter(ScanJob.force_refresh.is_(True))
+    return query
+
+
+async def has_inflight_scan_job(db: AsyncSession, domain: str, force_refresh: bool = False) -> bool:
+    """
+    Checks whether a new scan of `domain` would attach to an in-flight job.
+    """
+    result = await db.execute(_leader_query(normalize_hostname(domain), force_refresh).limit(1))
+    return result.scalars().first() is not None
+
+
+async def enqueue_scan_job(
+    db: AsyncSession,
+    scan_id: str,
+    domain: Optional[str] = None,
+    priority: int = 0,
+    max_attempts: int = 3,
+    force_refresh: bool = False,
+) -> ScanJob:
+    """
+    Adds a scan to the durable job queue.
+
+    If a job for the same normalised domain is already queued or running, the
+    new job is attached to it instead of being queued on its own. A
+    force_refresh scan only attaches to a leader that also bypasses the cache.
+    The commit includes the scan row if the caller created it with commit=False.
+    Concurrent enqueues of one domain are serialised on PostgreSQL and MySQL;
+    SQLite already runs one write transaction at a time.
+    """
+    domain_key = normalize_hostname(domain) if domain else None
+    # Serialise enqueues of the same domain so two first requests cannot both become leaders.
+    async with _domain_enqueue_lock(db, domain_key):
+        leader = None
+        if domain_key:
+            query = _leader_query(domain_key, force_refresh).order_by(ScanJob.id).limit(1).with_for_update()
+            leader = (await db.execute(query)).scalars().first()
+
+        now = datetime.now()
+        job = ScanJob(
+            scan_id=scan_id,
+            status=ScanJobStatus.QUEUED.value,
+            priority=priority,
+            domain_key=domain_key,
+            force_refresh=force_refresh,
+            max_attempts=max_attempts,
+            available_at=now,
+        )
+        event = {"status": "pending", "domain": domain, "queued": True}
+        if leader:
+            job.status = ScanJobStatus.ATTACHED.value
+            job.leader_job_id = leader.id
+            leader.priority = max(leader.priority, priority)
+            event["attached_to_scan_id"] = leader.scan_id
+            if leader.status == ScanJobStatus.RUNNING.value:
+                before = await crud_scan_stats.snapshot_scans(db, [scan_id])
+                await db.execute(
+                    update(Scan)
+                    .where(Scan.id == scan_id)
+                    .values(status="running", started_at=now, updated_by="system_scanner")
+                )
+                await crud_scan_stats.apply_scan_changes(db, before)
+                event["status"] = "running"
+            logger.info(f"Scan {scan_id} attached to in-flight job {leader.id} for {domain_key}")
+        db.add(job)
+        await add_scan_events(db, [(scan_id, "status", event)], commit=False)
+        await db.commit()
+    await db.refresh(job)
+    return job
+
+
+@asynccontextmanager
+async def _domain_enqueue_lock(db: AsyncSession, domain_key: Optional[str]):
+    """
+    Holds a per-domain lock from the leader lookup until the new job is committed.
+    """
+    dialect = db.bind.dialect.name
+    if not domain_key or dialect not in ("postgresql", "mysql"):
+        yield
+        return
+    if dialect == "postgresql":
+        await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": domain_key})
+        yield
+        return
+    # GET_LOCK belongs to a connection rather than a transaction, and the session may hand its
+    # connection back to the pool on commit, so the lock is taken on a connection of its own.
+    # Names are capped at 64 characters, hence the digest.
+    name = "scan_job:" + hashlib.sha1(domain_key.encode()).hexdigest()
+    async with db.bind.connect() as lock_conn:
+        acquired = (await lock_conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": name, "timeout": ENQUEUE_LOCK_TIMEOUT_SECONDS},
+        )).scalar()
+        if not acquired:
+            logger.warning(f"Could not lock enqueues for {domain_key}; the scan may not be coalesced")
+        try:
+            yield
+        finally:
+            if acquired:
+                await lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+
+
+async def get_leader_scan_id(db: AsyncSession, scan_id: str) -> Optional[str]:
+    """
+    Retrieves the scan whose run `scan_id` is attached to, if any.
+    """
+    leader = ScanJob.__table__.alias("leader")
+    result = await db.execute(
+        select(leader.c.scan_id)
+        .select_from(ScanJob)
+        .join(leader, leader.c.id == ScanJob.leader_job_id)
+        .filter(ScanJob.scan_id == scan_id)
+        .order_by(ScanJob.id.desc())
+        .limit(1)
+    )
+    return result.scalar()
+
+
+def _follower_scan_ids(leader_job_id: int):
+    return select(ScanJob.scan_id).where(
+        ScanJob.leader_job_id == leader_job_id,
+        ScanJob.status == ScanJobStatus.ATTACHED.value,
+    )
+
+
+async def _fan_out_results(db: AsyncSession, leader: ScanJob) -> int:
+    """
+    Copies the leader scan's results to every attached scan and closes their jobs.
+    Must run while the leader row is locked, so no scan can attach concurrently.
+    """
+    result = await db.execute(select(Scan).filter(Scan.id == leader.scan_id))
+    source = result.scalars().first()
+    follower_ids = list((await db.execute(_follower_scan_ids(leader.id))).scalars().all())
+    if not source or not follower_ids:
+        return 0
+
+    values = {column: getattr(source, column) for column in SHARED_RESULT_COLUMNS}
+    await copy_findings(db, leader.scan_id, follower_ids, commit=False)
+    before = await crud_scan_stats.snapshot_scans(db, follower_ids)
+    await db.execute(
+        update(Scan)
+        .where(Scan.id.in_(follower_ids))
+        .values(**values, updated_by="system_scanner", updated_date=datetime.now())
+    )
+    await crud_scan_stats.apply_scan_changes(db, before)
+    await db.execute(
+        update(ScanJob)
+        .where(ScanJob.leader_job_id == leader.id, ScanJob.status == ScanJobStatus.ATTACHED.value)
+        .values(status=ScanJobStatus.DONE.value)
+    )
+    event = {"status": source.status, "summary": source.summary, "error": source.error_message}
+    await add_scan_events(db, [(scan_id, "status", event) for scan_id in follower_ids], commit=False)
+    logger.info(f"Copied results of scan {leader.scan_id} to {len(follower_ids)} attached scans")
+    return len(follower_ids)
+
+
+async def claim_next_scan_job(db: AsyncSession, worker_id: str) -> Optional[ScanJob]:
+    """
+    Claims the next available job for `worker_id`.
+    Rows locked by other workers are skipped rather than waited on.
+    """
+    now = datetime.now()
+    result = await db.execute(
+        select(ScanJob)
+        .filter(
+            ScanJob.status == ScanJobStatus.QUEUED.value,
+            ScanJob.available_at <= now,
+        )
+        .order_by(ScanJob.priority.desc(), ScanJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalars().first()
+    if not job:
+        await db.commit()
+        return None
+
+    job.status = ScanJobStatus.RUNNING.value
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.locked_at = now
+    job.heartbeat_at = now
+    follower_ids = list((await db.execute(_follower_scan_ids(job.id))).scalars().all())
+    if follower_ids:
+        before = await crud_scan_stats.snapshot_scans(db, follower_ids)
+        await db.execute(
+            update(Scan)
+            .where(Scan.id.in_(follower_ids), Scan.started_at.is_(None))
+            .values(status="running", started_at=now, updated_by="system_scanner")
+        )
+        await crud_scan_stats.apply_scan_changes(db, before)
+        await add_scan_events(db, [(scan_id, "status", {"status": "running"}) for scan_id in follower_ids], commit=False)
+    await db.commit()
+    return job
+
+
+async def heartbeat_scan_jobs(db: AsyncSession, job_ids: List[int], worker_id: str) -> None:
+    """
+    Marks jobs held by `worker_id` as still alive.
+    """
+    if not job_ids:
+        return
+    await db.execute(
+        update(ScanJob)
+        .where(ScanJob.id.in_(job_ids), ScanJob.locked_by == worker_id)
+        .values(heartbeat_at=datetime.now())
+    )
+    await db.commit()
+
+
+async def complete_scan_job(db: AsyncSession, job_id: int) -> None:
+    """
+    Marks a job as done and hands its results to the scans attached to it.
+    """
+    result = await db.execute(select(ScanJob).filter(ScanJob.id == job_id).with_for_update())
+    job = result.scalars().first()
+    if not job:
+        return
+    job.status = ScanJobStatus.DONE.value
+    job.locked_by = None
+    job.heartbeat_at = None
+    await _fan_out_results(db, job)
+    await db.commit()
+
+
+async def fail_scan_job(db: AsyncSession, job_id: int, error: str, retry_delay_seconds: int = 30) -> None:
+    """
+    Records a failed attempt. The job is requeued with a linear backoff until
+    it runs out of attempts, after which it is marked as failed.
+    """
+    result = await db.execute(select(ScanJob).filter(ScanJob.id == job_id).with_for_update())
+    job = result.scalars().first()
+    if not job:
+        return
+    job.last_error = error
+    job.locked_by = None
+    job.heartbeat_at = None
+    if job.attempts < job.max_attempts:
+        job.status = ScanJobStatus.QUEUED.value
+        job.available_at = datetime.now() + timedelta(seconds=retry_delay_seconds * job.attempts)
+    else:
+        job.status = ScanJobStatus.FAILED.value
+        await _fail_leader_scan(db, job, error)
+        await _fail_followers(db, job, error)
+    await db.commit()
+
+
+async def _fail_leader_scan(db: AsyncSession, job: ScanJob, error: str) -> None:
+    """
+    Ends the job's own scan with an error, unless the run already finalised it.
+    """
+    now = datetime.now()
+    message = f"Scan job failed after {job.attempts} attempts: {error}"
+    before = await crud_scan_stats.snapshot_scans(db, [job.scan_id])
+    result = await db.execute(
+        update(Scan)
+        .where(Scan.id == job.scan_id, Scan.status.notin_(TERMINAL_STATUSES))
+        .values(status="error", error_message=message, finished_at=now, updated_date=now)
+    )
+    await crud_scan_stats.apply_scan_changes(db, before)
+    if result.rowcount:
+        await add_scan_events(db, [(job.scan_id, "status", {"status": "error", "error": message})], commit=False)
+
+
+async def _fail_followers(db: AsyncSession, leader: ScanJob, error: str) -> None:
+    now = datetime.now()
+    message = f"Shared scan run failed: {error}"
+    follower_ids = list((await db.execute(_follower_scan_ids(leader.id))).scalars().all())
+    if not follower_ids:
+        return
+    before = await crud_scan_stats.snapshot_scans(db, follower_ids)
+    await db.execute(
+        update(Scan)
+        .where(Scan.id.in_(follower_ids))
+        .values(status="error", error_message=message, finished_at=now, updated_date=now)
+    )
+    await crud_scan_stats.apply_scan_changes(db, before)
+    await add_scan_events(
+        db, [(scan_id, "status", {"status": "error", "error": message}) for scan_id in follower_ids], commit=False
+    )
+    await db.execute(
+        update(ScanJob)
+        .where(ScanJob.leader_job_id == leader.id, ScanJob.status == ScanJobStatus.ATTACHED.value)
+        .values(status=ScanJobStatus.FAILED.value, last_error=error)
+    )
+
+
+async def release_scan_job(db: AsyncSession, job_id: int) -> None:
+    """
+    Puts a job back on the queue without counting the attempt
+    (used when a worker shuts down before finishing it).
+    """
+    await db.execute(
+        update(ScanJob)
+        .where(ScanJob.id == job_id, ScanJob.status == ScanJobStatus.RUNNING.value)
+        .values(
+            status=ScanJobStatus.QUEUED.value,
+            attempts=ScanJob.attempts - 1,
+            locked_by=None,
+            heartbeat_at=None,
+            available_at=datetime.now(),
+        )
+    )
+    await db.commit()
+
+
+async def requeue_stale_scan_jobs(db: AsyncSession, stale_after_seconds: int) -> int:
+    """
+    Returns jobs whose worker stopped sending heartbeats to the queue.
+    Jobs that already used all their attempts are marked as failed.
+    """
+    cutoff = datetime.now() - timedelta(seconds=stale_after_seconds)
+    stale = and_(ScanJob.status == ScanJobStatus.RUNNING.value, ScanJob.heartbeat_at < cutoff)
+
+    exhausted = await db.execute(
+        select(ScanJob).filter(stale, ScanJob.attempts >= ScanJob.max_attempts).with_for_update(skip_locked=True)
+    )
+    for job in exhausted.scalars().all():
+        await _fail_leader_scan(db, job, "Worker heartbeat lost")
+        await _fail_followers(db, job, "Worker heartbeat lost")
+    failed = await db.execute(
+        update(ScanJob)
+        .where(stale, ScanJob.attempts >= ScanJob.max_attempts)
+        .values(status=ScanJobStatus.FAILED.value, locked_by=None, last_error="Worker heartbeat lost")
+    )
+    requeued = await db.execute(
+        update(ScanJob)
+        .where(stale)
+        .values(status=ScanJobStatus.QUEUED.value, locked_by=None, available_at=datetime.now(), last_error="Worker heartbeat lost")
+    )
+    await db.commit()
+    if failed.rowcount or requeued.rowcount:
+        logger.warning(f"Recovered stale scan jobs: {requeued.rowcount} requeued, {failed.rowcount} failed")
+    return requeued.rowcount
+
+
+async def count_queued_scan_jobs(db: AsyncSession) -> int:
+    """
+    Counts jobs waiting to be claimed.
+    """
+    result = await db.execute(
+        select(func.count(ScanJob.id)).filter(ScanJob.status == ScanJobStatus.QUEUED.value)
+    )
+    return result.scalar()
+
+
+async def count_scan_jobs_by_status(db: AsyncSession) -> Dict[str, int]:
+    """
+    Counts queued and running jobs.
+    """
+    result = await db.execute(
+        select(ScanJob.status, func.count(ScanJob.id))
+        .filter(ScanJob.status.in_([ScanJobStatus.QUEUED.value, ScanJobStatus.RUNNING.value]))
+        .group_by(ScanJob.status)
+    )
+    counts = {ScanJobStatus.QUEUED.value: 0, ScanJobStatus.RUNNING.value: 0}
+    counts.update(dict(result.fetchall()))
+    return counts
+
+
+async def upsert_worker_heartbeat(
+    db: AsyncSession,
+    worker_id: str,
+    hostname: str,
+    pid: int,
+    concurrency: int,
+    active_jobs: int,
+    stats: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Records that a worker is alive together with its current load.
+    """
+    await db.merge(WorkerHeartbeat(
+        id=worker_id,
+        hostname=hostname,
+        pid=pid,
+        concurrency=concurrency,
+        active_jobs=active_jobs,
+        stats=stats,
+        heartbeat_at=datetime.now(),
+    ))
+    await db.commit()
+
+
+async def delete_worker_heartbeat(db: AsyncSession, worker_id: str) -> None:
+    """
+    Removes a worker that shut down cleanly.
+    """
+    await db.execute(delete(WorkerHeartbeat).where(WorkerHeartbeat.id == worker_id))
+    await db.commit()
+
+
+async def get_live_workers(db: AsyncSession, stale_after_seconds: int) -> List[WorkerHeartbeat]:
+    """
+    Retrieves workers that sent a heartbeat recently.
+    """
+    cutoff = datetime.now() - timedelta(seconds=stale_after_seconds)
+    result = await db.execute(
+        select(WorkerHeartbeat).filter(WorkerHeartbeat.heartbeat_at >= cutoff)
+    )
+    return list(result.scalars().all())
@@ -0,0 +1,214 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, desc, text
+from app.db.models.scan import Scan
+from app.db.models.scan_stats import ScanStatCounter
+from collections import Counter
+from typing import Optional, List, Dict, Any, Iterable
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+# Hour buckets older than this are purged; only the last 24 are read.
+HOUR_BUCKETS_KEPT = 48
+
+SNAPSHOT_COLUMNS = (
+    Scan.id, Scan.user_id, Scan.domain, Scan.status, Scan.is_active, Scan.created_date, Scan.duration_seconds,
+)
+
+
+def user_scope(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def hour_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H")
+
+
+def _scopes(user_id: Optional[int]) -> List[str]:
+    return [GLOBAL_SCOPE, user_scope(user_id)] if user_id else [GLOBAL_SCOPE]
+
+
+def _contributions(row, oldest_hour: str) -> Counter:
+    """
+    The counters one scan adds to each of its scopes.
+    """
+    counters = Counter()
+    if row is None or row.is_active is False:
+        return counters
+    counters[("scans", "total")] += 1
+    counters[("status", row.status)] += 1
+    counters[("domain", row.domain)] += 1
+    if row.created_date is not None:
+        # Buckets past the retention window may already be purged; never recreate them.
+        bucket = hour_key(row.created_date)
+        if bucket >= oldest_hour:
+            counters[("hour", bucket)] += 1
+    if row.duration_seconds is not None:
+        counters[("duration", "sum")] += row.duration_seconds
+        counters[("duration", "count")] += 1
+    return counters
+
+
+def _upsert_increments(dialect: str, rows: List[Dict[str, Any]]):
+    """
+    INSERT ... ON CONFLICT that adds each row's value to the stored counter.
+    """
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(ScanStatCounter).values(rows)
+        return stmt.on_duplicate_key_update(
+            value=ScanStatCounter.value + stmt.inserted.value, updated_date=stmt.inserted.updated_date
+        )
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(ScanStatCounter).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["scope", "kind", "key"],
+        set_={"value": ScanStatCounter.value + stmt.excluded.value, "updated_date": stmt.excluded.updated_date},
+    )
+
+
+async def snapshot_scans(db: AsyncSession, scan_ids: Iterable[str]) -> Dict[str, Any]:
+    """
+    Locks the given scans and captures the columns the rollup depends on.
+    Pass the result to apply_scan_changes() after modifying the scans in the
+    same transaction.
+    """
+    scan_ids = list(scan_ids)
+    if not scan_ids:
+        return {}
+    result = await db.execute(select(*SNAPSHOT_COLUMNS).where(Scan.id.in_(scan_ids)).with_for_update())
+    return {row.id: row for row in result.all()}
+
+
+async def apply_scan_changes(
+    db: AsyncSession,
+    before: Dict[str, Any],
+    scan_ids: Optional[Iterable[str]] = None,
+) -> None:
+    """
+    Updates the rollup with the difference between `before` (from snapshot_scans,
+    empty for new scans) and the current state of the scans. Deleted scans simply
+    drop out. Does not commit.
+    """
+    scan_ids = list(scan_ids) if scan_ids is not None else list(before)
+    if not scan_ids:
+        return
+    result = await db.execute(select(*SNAPSHOT_COLUMNS).where(Scan.id.in_(scan_ids)))
+    after = {row.id: row for row in result.all()}
+
+    oldest_hour = hour_key(datetime.now() - timedelta(hours=HOUR_BUCKETS_KEPT))
+    deltas: Dict[tuple, int] = Counter()
+    for scan_id in scan_ids:
+        old, new = before.get(scan_id), after.get(scan_id)
+        for scope in _scopes(old.user_id if old else None):
+            for (kind, key), value in _contributions(old, oldest_hour).items():
+                deltas[(scope, kind, key)] -= value
+        for scope in _scopes(new.user_id if new else None):
+            for (kind, key), value in _contributions(new, oldest_hour).items():
+                deltas[(scope, kind, key)] += value
+
+    now = datetime.now()
+    rows = [
+        {"scope": scope, "kind": kind, "key": key, "value": value, "updated_date": now}
+        for (scope, kind, key), value in sorted(deltas.items())
+        if value
+    ]
+    if rows:
+        await db.execute(_upsert_increments(db.bind.dialect.name, rows))
+
+
+async def get_scan_stats(db: AsyncSession, user_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Reads scanning statistics from the rollup.
+    The last-24h figure has hour granularity.
+    """
+    scope = user_scope(user_id) if user_id else GLOBAL_SCOPE
+    result = await db.execute(
+        select(ScanStatCounter.kind, ScanStatCounter.key, ScanStatCounter.value).where(
+            ScanStatCounter.scope == scope,
+            ScanStatCounter.kind.in_(("scans", "status", "duration", "hour")),
+        )
+    )
+    counters = Counter()
+    status_counts: Dict[str, int] = {}
+    recent_scans = 0
+    since = hour_key(datetime.now() - timedelta(hours=24))
+    for kind, key, value in result.all():
+        if kind == "status":
+            if value:
+                status_counts[key] = value
+        elif kind == "hour":
+            if key >= since:
+                recent_scans += value
+        else:
+            counters[(kind, key)] = value
+
+    domain_result = await db.execute(
+        select(ScanStatCounter.key, ScanStatCounter.value)
+        .where(ScanStatCounter.scope == scope, ScanStatCounter.kind == "domain", ScanStatCounter.value > 0)
+        .order_by(desc(ScanStatCounter.value))
+        .limit(10)
+    )
+    top_domains = dict(domain_result.all())
+
+    duration_count = counters[("duration", "count")]
+    return {
+        "total_scans": counters[("scans", "total")],
+        "status_counts": status_counts,
+        "recent_scans_24h": recent_scans,
+        "top_domains": top_domains,
+        "average_duration_seconds": counters[("duration", "sum")] / duration_count if duration_count else None,
+    }
+
+
+async def rebuild_scan_stats(db: AsyncSession, batch_size: int = 10000) -> int:
+    """
+    Recomputes the whole rollup from the scans table. Returns the number of scans counted.
+    """
+    if db.bind.dialect.name == "postgresql":
+        # Hold off concurrent increments until the rebuilt counters are committed;
+        # they are applied on top of them afterwards.
+        await db.execute(text("LOCK TABLE scan_stat_counters IN EXCLUSIVE MODE"))
+    await db.execute(delete(ScanStatCounter))
+
+    oldest_hour = hour_key(datetime.now() - timedelta(hours=HOUR_BUCKETS_KEPT))
+    totals: Dict[tuple, int] = Counter()
+    scanned = 0
+    result = await db.stream(
+        select(*SNAPSHOT_COLUMNS).where(Scan.is_active == True).execution_options(yield_per=batch_size)
+    )
+    async for row in result:
+        scanned += 1
+        contributions = _contributions(row, oldest_hour)
+        for scope in _scopes(row.user_id):
+            for (kind, key), value in contributions.items():
+                totals[(scope, kind, key)] += value
+
+    now = datetime.now()
+    rows = [
+        {"scope": scope, "kind": kind, "key": key, "value": value, "updated_date": now}
+        for (scope, kind, key), value in totals.items()
+    ]
+    for offset in range(0, len(rows), batch_size):
+        await db.execute(ScanStatCounter.__table__.insert(), rows[offset:offset + batch_size])
+    await db.commit()
+    logger.info(f"Rebuilt scan stats from {scanned} scans ({len(rows)} counters)")
+    return scanned
+
+
+async def purge_hour_buckets(db: AsyncSession) -> int:
+    """
+    Deletes hour buckets older than HOUR_BUCKETS_KEPT hours.
+    """
+    oldest_hour = hour_key(datetime.now() - timedelta(hours=HOUR_BUCKETS_KEPT))
+    result = await db.execute(
+        delete(ScanStatCounter).where(ScanStatCounter.kind == "hour", ScanStatCounter.key < oldest_hour)
+    )
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,102 @@
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from app.db.models.tool_result_cache import ToolResultCache
+from tools.findings import normalize_hostname
+from typing import Optional, Dict, Any
+from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CacheMetrics:
+    """
+    Per-process hit/miss counters of the tool result cache.
+    """
+
+    def __init__(self):
+        self.tools: Dict[str, Dict[str, int]] = {}
+
+    def record(self, tool: str, event: str):
+        counters = self.tools.setdefault(tool, {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0})
+        counters[event] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {tool: dict(counters) for tool, counters in self.tools.items()}
+
+
+cache_metrics = CacheMetrics()
+
+
+def options_hash(options: Optional[Dict[str, Any]]) -> str:
+    """
+    Stable hash of a tool's options, part of the cache key.
+    """
+    return hashlib.sha256(json.dumps(options or {}, sort_keys=True).encode()).hexdigest()
+
+
+async def get_cached_tool_result(
+    db: AsyncSession, domain: str, tool: str, options: Optional[Dict[str, Any]] = None
+) -> Optional[ToolResultCache]:
+    """
+    Retrieves an unexpired cached result for (domain, tool, options).
+    """
+    result = await db.execute(
+        select(ToolResultCache).filter(
+            ToolResultCache.domain == normalize_hostname(domain),
+            ToolResultCache.tool == tool.lower(),
+            ToolResultCache.options_hash == options_hash(options),
+            ToolResultCache.expires_at > datetime.now(),
+        )
+    )
+    entry = result.scalars().first()
+    cache_metrics.record(tool.lower(), "hits" if entry else "misses")
+    return entry
+
+
+async def store_tool_result(
+    db: AsyncSession,
+    domain: str,
+    tool: str,
+    options: Optional[Dict[str, Any]],
+    result: Dict[str, Any],
+    ttl_seconds: int,
+    source_scan_id: Optional[str] = None,
+) -> None:
+    """
+    Stores (or replaces) the cached result for (domain, tool, options).
+    """
+    key = {
+        "domain": normalize_hostname(domain),
+        "tool": tool.lower(),
+        "options_hash": options_hash(options),
+    }
+    await db.execute(
+        delete(ToolResultCache).where(
+            ToolResultCache.domain == key["domain"],
+            ToolResultCache.tool == key["tool"],
+            ToolResultCache.options_hash == key["options_hash"],
+        )
+    )
+    now = datetime.now()
+    db.add(ToolResultCache(
+        **key,
+        result=result,
+        source_scan_id=source_scan_id,
+        created_date=now,
+        expires_at=now + timedelta(seconds=ttl_seconds),
+    ))
+    await db.commit()
+    cache_metrics.record(tool.lower(), "stored")
+
+
+async def purge_expired_tool_results(db: AsyncSession) -> int:
+    """
+    Deletes expired cache entries.
+    """
+    result = await db.execute(delete(ToolResultCache).where(ToolResultCache.expires_at <= datetime.now()))
+    await db.commit()
+    return result.rowcount
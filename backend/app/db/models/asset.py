@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.db.base import Base
+
+
+class Asset(Base):
+    """
+    Inventory of everything ever found for a scanned (apex) domain: one row per
+    (apex, kind, value) with when it was first and last seen and by how many scans.
+    Upserted in one statement from a scan's findings when the scan finalises.
+    """
+    __tablename__ = "assets"
+
+    apex = Column(String(255), primary_key=True)
+    kind = Column(String(20), primary_key=True)
+    value = Column(String(512), primary_key=True)
+    first_seen = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+    seen_count = Column(Integer, nullable=False, default=1)
+    # Last scan counted, so a retried finalisation does not count the same scan twice.
+    last_scan_id = Column(String(36), nullable=True)
+
+    __table_args__ = (
+        Index("ix_assets_apex_last_seen", "apex", "last_seen"),
+    )
+
+    def __repr__(self):
+        return f"<Asset(apex='{self.apex}', kind='{self.kind}', value='{self.value}', seen_count={self.seen_count})>"
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, ForeignKey, Index
+from app.db.base import Base
+from datetime import datetime
+
+
+class Finding(Base):
+    """
+    One finding (subdomain, email, host or ip) discovered by a tool during a scan.
+    Rows are only ever appended, in batches (COPY on Postgres). The tool columns
+    on `scans` only keep each run's metadata (times, errors, timeout/cache flags).
+    """
+    __tablename__ = "findings"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    scan_id = Column(String(36), ForeignKey("scans.id"), nullable=False)
+    tool = Column(String(50), nullable=False)
+    kind = Column(String(20), nullable=False)
+    value = Column(String(512), nullable=False)
+    first_seen_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    __table_args__ = (
+        Index("ix_findings_scan_tool_kind", "scan_id", "tool", "kind"),
+        Index("ix_findings_kind_value", "kind", "value"),
+    )
+
+    def __repr__(self):
+        return f"<Finding(scan_id='{self.scan_id}', tool='{self.tool}', kind='{self.kind}', value='{self.value}')>"
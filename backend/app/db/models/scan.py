@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Enum, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Enum, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base 
 from datetime import datetime  
@@ -12,12 +12,27 @@ class ScanStatus(str, Enum):
     FINISHED = "finished"
     ERROR = "error"
     CANCELLED = "cancelled"
+
+
+def reversed_domain(domain: str) -> str:
+    """
+    Domain with its labels in reverse order ("a.example.com" -> "com.example.a"),
+    so every scan under a parent domain shares a key prefix.
+    """
+    return ".".join(reversed(domain.strip().lower().rstrip(".").split(".")))
+
+
+def _reversed_domain_default(context) -> str:
+    return reversed_domain(context.get_current_parameters()["domain"])
+
     
 class Scan(Base):
     __tablename__ = "scans"
 
     id = Column(String(36), primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     domain = Column(String(255), nullable=False, index=True)
+    # Suffix search: "*.corp.example.com" is a prefix range of this column.
+    domain_reversed = Column(String(255), nullable=True, default=_reversed_domain_default)
     status = Column(String(50), nullable=False, default="pending", index=True)  
     
 
@@ -30,10 +45,10 @@ class Scan(Base):
     error_message = Column(Text, nullable=True)
     
     
-    total_subdomains = Column(Integer, default=0)
-    total_emails = Column(Integer, default=0)
-    total_ips = Column(Integer, default=0)
-    total_hosts = Column(Integer, default=0)  
+    total_subdomains = Column(Integer, default=0, index=True)
+    total_emails = Column(Integer, default=0, index=True)
+    total_ips = Column(Integer, default=0, index=True)
+    total_hosts = Column(Integer, default=0, index=True)  
     
     started_at = Column(DateTime, nullable=True)
     finished_at = Column(DateTime, nullable=True)
@@ -50,6 +65,7 @@ class Scan(Base):
     
     is_active = Column(Boolean, default=True)  
     is_public = Column(Boolean, default=False)  
+    force_refresh = Column(Boolean, default=False)
     
     
     created_by = Column(String(255), nullable=True)
@@ -57,6 +73,17 @@ class Scan(Base):
     updated_by = Column(String(255), nullable=True)
     updated_date = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
 
+    __table_args__ = (
+        # Keyset pagination of list pages: WHERE is_active AND (created_date, id) < cursor.
+        Index("ix_scans_active_created_date_id", "is_active", "created_date", "id"),
+        # text_pattern_ops lets Postgres use the btree for LIKE 'prefix%' under any collation.
+        Index("ix_scans_domain_reversed", "domain_reversed", postgresql_ops={"domain_reversed": "text_pattern_ops"}),
+        # Substring search (ILIKE '%part%'); needs the pg_trgm extension, created by init_db().
+        Index(
+            "ix_scans_domain_trgm", "domain", postgresql_using="gin", postgresql_ops={"domain": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
     def __repr__(self):
         return f"<Scan(id='{self.id}', domain='{self.domain}', status='{self.status}')>"
     
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime, JSON, ForeignKey
+from app.db.base import Base
+from datetime import datetime
+
+
+class ScanDiff(Base):
+    """
+    Computed diff of the findings of two finished scans (`scan_id` against
+    `against_scan_id`). Finished scans never change, so a stored diff stays valid.
+    """
+    __tablename__ = "scan_diffs"
+
+    scan_id = Column(String(36), ForeignKey("scans.id", ondelete="CASCADE"), primary_key=True)
+    against_scan_id = Column(String(36), ForeignKey("scans.id", ondelete="CASCADE"), primary_key=True)
+    diff = Column(JSON, nullable=False)
+    created_date = Column(DateTime, default=datetime.now, nullable=True)
+
+    def __repr__(self):
+        return f"<ScanDiff(scan_id='{self.scan_id}', against_scan_id='{self.against_scan_id}')>"
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, ForeignKey
+from app.db.base import Base
+from datetime import datetime
+
+
+class ScanDocument(Base):
+    """
+    Canonical /results document of a finished scan, serialised once and stored
+    compressed. `version` is the scan's updated_date when it was built; a
+    document whose version no longer matches the scan is stale.
+    """
+    __tablename__ = "scan_documents"
+
+    scan_id = Column(String(36), ForeignKey("scans.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(String(32), nullable=False)
+    encoding = Column(String(16), nullable=False, default="gzip")
+    content = Column(LargeBinary, nullable=False)
+    raw_size = Column(Integer, nullable=False)
+    created_date = Column(DateTime, default=datetime.now, nullable=True)
+
+    def __repr__(self):
+        return f"<ScanDocument(scan_id='{self.scan_id}', version='{self.version}', raw_size={self.raw_size})>"
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, JSON, ForeignKey, Index
+from app.db.base import Base
+from datetime import datetime
+
+
+class ScanEvent(Base):
+    """
+    One progress event of a scan (status change, tool start/finish or a batch of new findings).
+    `seq` numbers a scan's events in the order they were committed; SSE event ids are
+    made of these, so clients resume with Last-Event-ID after a reconnect.
+    """
+    __tablename__ = "scan_events"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    scan_id = Column(String(36), ForeignKey("scans.id"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    event = Column(String(30), nullable=False)
+    data = Column(JSON, nullable=False)
+    created_date = Column(DateTime, default=datetime.now, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_scan_events_scan_id_seq", "scan_id", "seq", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<ScanEvent(id={self.id}, scan_id='{self.scan_id}', seq={self.seq}, event='{self.event}')>"
@@ -0,0 +1,54 @@
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index
+from app.db.base import Base
+from datetime import datetime
+from enum import Enum
+
+
+class ScanJobStatus(str, Enum):
+    QUEUED = "queued"
+    ATTACHED = "attached"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ScanJob(Base):
+    """
+    Durable queue entry for a scan. Workers claim rows with
+    SELECT ... FOR UPDATE SKIP LOCKED, so any number of worker processes
+    on any number of nodes can share the queue.
+
+    A scan requested while another scan of the same domain is queued or
+    running is attached to that job (its leader) instead of running the
+    tools again; the leader's results are copied to it when the leader finishes.
+    """
+    __tablename__ = "scan_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    scan_id = Column(String(36), ForeignKey("scans.id"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default=ScanJobStatus.QUEUED.value)
+    priority = Column(Integer, nullable=False, default=0)
+    domain_key = Column(String(255), nullable=True)
+    leader_job_id = Column(Integer, ForeignKey("scan_jobs.id"), nullable=True, index=True)
+    force_refresh = Column(Boolean, nullable=False, default=False)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime, nullable=False, default=datetime.now)
+
+    locked_by = Column(String(255), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_date = Column(DateTime, default=datetime.now, nullable=True)
+    updated_date = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
+
+    __table_args__ = (
+        Index("ix_scan_jobs_claim", "status", "priority", "available_at"),
+        Index("ix_scan_jobs_domain_key_status", "domain_key", "status"),
+    )
+
+    def __repr__(self):
+        return f"<ScanJob(id={self.id}, scan_id='{self.scan_id}', status='{self.status}')>"
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, Index
+from app.db.base import Base
+from datetime import datetime
+
+
+class ScanStatCounter(Base):
+    """
+    One counter of the scan statistics rollup.
+
+    `scope` is "global" or "user:<id>"; `kind`/`key` name the counter:
+    ("scans", "total"), ("status", <status>), ("duration", "sum"|"count"),
+    ("domain", <domain>) and ("hour", "YYYY-MM-DDTHH") for scans created in
+    that hour. Counters are incremented as scans change state, so reading the
+    stats of a scope is a range read of its primary key.
+    """
+    __tablename__ = "scan_stat_counters"
+
+    scope = Column(String(64), primary_key=True)
+    kind = Column(String(16), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_date = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
+
+    __table_args__ = (
+        # Top domains of a scope: WHERE scope = ? AND kind = 'domain' ORDER BY value DESC.
+        Index("ix_scan_stat_counters_scope_kind_value", "scope", "kind", "value"),
+    )
+
+    def __repr__(self):
+        return f"<ScanStatCounter(scope='{self.scope}', kind='{self.kind}', key='{self.key}', value={self.value})>"
@@ -0,0 +1,24 @@
+
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from app.db.base import Base
+from datetime import datetime
+
+
+class WorkerHeartbeat(Base):
+    """
+    Liveness and load report of a scan worker process, refreshed on every heartbeat.
+    """
+    __tablename__ = "scan_workers"
+
+    id = Column(String(255), primary_key=True)
+    hostname = Column(String(255), nullable=True)
+    pid = Column(Integer, nullable=True)
+    concurrency = Column(Integer, nullable=False, default=0)
+    active_jobs = Column(Integer, nullable=False, default=0)
+    stats = Column(JSON, nullable=True)
+
+    started_at = Column(DateTime, default=datetime.now, nullable=True)
+    heartbeat_at = Column(DateTime, default=datetime.now, nullable=True, index=True)
+
+    def __repr__(self):
+        return f"<WorkerHeartbeat(id='{self.id}', active_jobs={self.active_jobs}/{self.concurrency})>"
@@ -0,0 +1,29 @@
+
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from app.db.base import Base
+from datetime import datetime
+
+
+class ToolResultCache(Base):
+    """
+    Recent output of one tool for one normalised domain and set of tool options.
+    Scans of the same target within the tool's TTL reuse it instead of rerunning the tool.
+    """
+    __tablename__ = "tool_result_cache"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    domain = Column(String(255), nullable=False)
+    tool = Column(String(50), nullable=False)
+    options_hash = Column(String(64), nullable=False)
+    result = Column(JSON, nullable=False)
+    source_scan_id = Column(String(36), nullable=True)
+
+    created_date = Column(DateTime, default=datetime.now, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("domain", "tool", "options_hash", name="uq_tool_result_cache_key"),
+    )
+
+    def __repr__(self):
+        return f"<ToolResultCache(domain='{self.domain}', tool='{self.tool}', expires_at='{self.expires_at}')>"
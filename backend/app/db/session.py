@@ -1,9 +1,20 @@
 
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from app.config import settings
 from app.db.models.user import User
 from app.db.models.scan import Scan
+from app.db.models.scan_job import ScanJob
+from app.db.models.scan_event import ScanEvent
+from app.db.models.finding import Finding
+from app.db.models.scan_worker import WorkerHeartbeat
+from app.db.models.tool_result_cache import ToolResultCache
+from app.db.models.scan_stats import ScanStatCounter
+from app.db.models.scan_document import ScanDocument
+from app.db.models.scan_diff import ScanDiff
+from app.db.models.asset import Asset
 from app.db.base import Base 
+from app.db.upgrade import upgrade_schema
 
 
 engine = create_async_engine(settings.DATABASE_URL, echo=False) 
@@ -31,10 +42,15 @@ async def init_db():
     """
     Creates all database tables defined by SQLAlchemy models.
     This function should be called on application startup.
-    It uses the Base.metadata to discover and create tables.
+    It uses the Base.metadata to discover and create tables, then adds
+    columns that tables created by an earlier release lack (see app.db.upgrade).
     """
     print("Attempting to create database tables...")
     async with engine.begin() as conn:
         print("Tables registered in Base.metadata:", Base.metadata.tables.keys())
+        if engine.dialect.name == "postgresql":
+            # Trigram index of scans.domain (substring search).
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
+    await upgrade_schema(engine)
     print("Database tables creation process completed.")
\ No newline at end of file
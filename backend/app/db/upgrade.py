@@ -0,0 +1,115 @@
+"""
+In-place upgrades of tables that existed before a release added to them.
+
+init_db() creates missing tables with Base.metadata.create_all, which never
+alters a table that already exists. Columns and indexes added to such a table
+are listed here, and upgrade_schema() adds whichever of them the database
+lacks. It only touches what is missing, so it is cheap on an up-to-date
+database and safe to run on every start (init_db() runs it; `python -m
+app.manage migrate` runs it on its own).
+
+On Postgres, indexes are built with CREATE INDEX CONCURRENTLY, so the table
+stays writable while an index on a large table is built.
+"""
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Column, Index, inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.schema import CreateIndex
+
+from app.db.base import Base
+from app.utilities.logger import logger
+
+# (table, column) of every column added to a table that predates it.
+ADDED_COLUMNS: List[Tuple[str, str]] = [
+    ("scans", "force_refresh"),
+    ("scans", "domain_reversed"),
+]
+
+# (table, index, dialect it is limited to or None) of every index added to a table that predates it.
+ADDED_INDEXES: List[Tuple[str, str, Optional[str]]] = [
+    ("scans", "ix_scans_active_created_date_id", None),
+    ("scans", "ix_scans_total_subdomains", None),
+    ("scans", "ix_scans_total_emails", None),
+    ("scans", "ix_scans_total_ips", None),
+    ("scans", "ix_scans_total_hosts", None),
+    ("scans", "ix_scans_domain_reversed", None),
+    ("scans", "ix_scans_domain_trgm", "postgresql"),
+]
+
+
+def missing_columns(sync_conn) -> List[Column]:
+    inspector = inspect(sync_conn)
+    existing = {
+        table: {column["name"] for column in inspector.get_columns(table)}
+        for table in {table for table, _ in ADDED_COLUMNS}
+    }
+    return [Base.metadata.tables[table].c[name] for table, name in ADDED_COLUMNS if name not in existing[table]]
+
+
+def missing_indexes(sync_conn) -> List[Index]:
+    inspector = inspect(sync_conn)
+    dialect = sync_conn.dialect.name
+    wanted = [(table, name) for table, name, only_on in ADDED_INDEXES if only_on in (None, dialect)]
+    existing = {
+        table: {index["name"] for index in inspector.get_indexes(table)}
+        for table in {table for table, _ in wanted}
+    }
+    indexes = {index.name: index for table, _ in wanted for index in Base.metadata.tables[table].indexes}
+    return [indexes[name] for table, name in wanted if name not in existing[table]]
+
+
+def add_column_sql(column: Column, dialect) -> str:
+    preparer = dialect.identifier_preparer
+    # Another process starting at the same time may add the column first.
+    if_not_exists = "IF NOT EXISTS " if dialect.name == "postgresql" else ""
+    return (
+        f"ALTER TABLE {preparer.format_table(column.table)} ADD COLUMN {if_not_exists}"
+        f"{preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+    )
+
+
+def create_index_sql(index: Index, dialect) -> str:
+    if dialect.name != "postgresql":
+        return str(CreateIndex(index).compile(dialect=dialect))
+    sql = str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+    return sql.replace("INDEX ", "INDEX CONCURRENTLY ", 1)
+
+
+async def _drop_invalid_indexes(conn: AsyncConnection) -> None:
+    """
+    A CREATE INDEX CONCURRENTLY that was interrupted leaves an invalid index
+    behind, which IF NOT EXISTS would then keep forever; drop it to rebuild it.
+    """
+    names = [name for _, name, _ in ADDED_INDEXES]
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+        ),
+        {"names": names},
+    )
+    preparer = conn.dialect.identifier_preparer
+    for name in result.scalars().all():
+        logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+        await conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {preparer.quote(name)}")
+
+
+async def upgrade_schema(engine: AsyncEngine) -> None:
+    """
+    Add the listed columns and indexes a database created by an earlier
+    release lacks. Added columns are nullable; rows that predate them read NULL.
+    """
+    async with engine.begin() as conn:
+        for column in await conn.run_sync(missing_columns):
+            logger.info(f"Adding column {column.table.name}.{column.name}")
+            await conn.exec_driver_sql(add_column_sql(column, engine.dialect))
+
+    async with engine.connect() as conn:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if engine.dialect.name == "postgresql":
+            await _drop_invalid_indexes(conn)
+        for index in await conn.run_sync(missing_indexes):
+            logger.info(f"Creating index {index.name} on {index.table.name}")
+            await conn.exec_driver_sql(create_index_sql(index, engine.dialect))
@@ -5,12 +5,15 @@ from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from app.config import app_description, app_name, app_title, app_version, settings
-from app.routers import auth
+from app.routers import auth, assets
 from app.routers.domain import domain as scan
 
 from dotenv import load_dotenv
 
 from app.db.session import init_db 
+from app.utilities.scan_events import broker as scan_events_broker
+from app.utilities.encoding import FastJSONResponse
+from app.utilities.offload import shutdown_pool
 load_dotenv()
 app = FastAPI(
     title=app_title,
@@ -18,6 +21,7 @@ app = FastAPI(
     version=app_version,
     docs_url="/",
     root_path=settings.root_path,
+    default_response_class=FastJSONResponse,
 )
 
 
@@ -65,6 +69,12 @@ app.include_router(
     tags=["scan"],
 )
 
+app.include_router(
+    assets.router,
+    prefix="/assets",
+    tags=["assets"],
+)
+
 
 @app.on_event("startup")
 async def on_startup():
@@ -73,11 +83,17 @@ async def on_startup():
     It calls the init_db function to ensure database tables are created.
     """
     print("Application startup: Initializing database...")
-    from app.db.models import user, scan
+    from app.db.models import user, scan, scan_job, scan_event, finding, scan_worker, tool_result_cache, scan_stats, scan_document, scan_diff, asset
     await init_db()
     print("Database initialization complete.")
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await scan_events_broker.close()
+    shutdown_pool()
+
+
 
 if __name__ == "__main__":
     uvicorn.run(
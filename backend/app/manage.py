@@ -0,0 +1,50 @@
+"""
+Maintenance commands:
+
+    python -m app.manage migrate
+    python -m app.manage rebuild-stats
+    python -m app.manage backfill-domain-search
+"""
+import argparse
+import asyncio
+
+from app.crud import scan as crud_scan
+from app.crud import scan_stats as crud_scan_stats
+from app.db.session import AsyncSessionLocal, init_db
+from app.utilities.logger import logger
+
+
+async def migrate():
+    await init_db()
+    logger.info("Database schema is up to date")
+
+
+async def rebuild_stats():
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        scanned = await crud_scan_stats.rebuild_scan_stats(db)
+    logger.info(f"Scan stats rebuilt from {scanned} scans")
+
+
+async def backfill_domain_search():
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        updated = await crud_scan.backfill_domain_reversed(db)
+    logger.info(f"Filled domain_reversed of {updated} scans")
+
+
+COMMANDS = {
+    "migrate": migrate,
+    "rebuild-stats": rebuild_stats,
+    "backfill-domain-search": backfill_domain_search,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate", help="create missing tables and add columns that earlier releases lack")
+    subparsers.add_parser("rebuild-stats", help="recompute the scan statistics rollup from the scans table")
+    subparsers.add_parser("backfill-domain-search", help="fill domain_reversed of scans created before suffix search")
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command]())
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app.crud import asset as crud_asset
+from app.db.session import get_db
+from app.schemas.asset import AssetOut
+from app.utilities.logger import logger
+from tools.findings import KINDS
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[AssetOut])
+async def list_assets(
+    request: Request,
+    response: Response,
+    apex: str,
+    kind: Optional[str] = None,
+    seen_since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    List the asset inventory of a scanned domain: every subdomain, email, host and
+    IP any scan found for it, with first/last sighting and number of scans.
+    `seen_since` keeps the assets last seen at or after that time. Pages follow
+    (kind, value) order; the next page's cursor is returned in the X-Next-Cursor
+    header (and a Link rel="next" header).
+    """
+    if kind and kind not in KINDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown asset kind: {kind}")
+    logger.info(f"Listing assets of {apex} kind={kind} seen_since={seen_since}")
+    try:
+        assets, next_cursor = await crud_asset.get_assets_page(db, apex, kind, seen_since, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return [AssetOut.model_validate(asset) for asset in assets]
@@ -1,81 +1,184 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi import status as status_codes
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 import asyncio
+import csv
+from contextlib import nullcontext
+from functools import partial
+import gzip
+import io
+from types import SimpleNamespace
 from app.db.session import AsyncSessionLocal
 
 from app.utilities.logger import logger
 from app.db.session import get_db 
 from app.db.models.scan import Scan, ScanStatus
 from app.crud import scan as crud_scan 
-from app.schemas.scan import ScanCreate, ScanUpdate, ScanOut 
+from app.crud import scan_job as crud_scan_job
+from app.crud import scan_event as crud_scan_event
+from app.crud import finding as crud_finding
+from app.crud import scan_document as crud_scan_document
+from app.crud import scan_diff as crud_scan_diff
+from app.crud import asset as crud_asset
+from app.crud import tool_result_cache as crud_tool_cache
+from app.config import settings
+from app.schemas.scan import ScanCreate, ScanUpdate, ScanOut, ScanListItem
+from app.utilities.scan_persister import ScanPersister
+from app.utilities.findings_flusher import FindingsFlusher
+from app.utilities.offload import run_cpu_bound
+from app.utilities.result_processing import (
+    aggregate_totals, canonical_results_document, encode_results_document, findings_size, render_results_document,
+)
+from app.utilities.encoding import accepts_encoding, dumps
+from app.utilities.result_cache import (
+    RESULTS_GZIP_KIND, RESULTS_KIND, SCAN_KIND, etag_matches, make_etag, result_cache, scan_version,
+)
+from app.utilities.scan_events import (
+    TERMINAL_STATUSES, broker, decode_event_cursor, encode_event_cursor, format_sse, publish_scan_event, publish_scan_events,
+)
 from tools.security_tools import SecurityTools 
+from tools.scheduler import ToolScheduler, parse_tool_config
+from tools.findings import KINDS
 
 router = APIRouter() 
-security_tools = SecurityTools()
+tool_scheduler = ToolScheduler(parse_tool_config(settings.TOOL_SLOTS), default_slots=settings.TOOL_DEFAULT_SLOTS)
+security_tools = SecurityTools(settings, tool_slot=tool_scheduler.slot, offload=run_cpu_bound)
+tool_cache_ttls = parse_tool_config(settings.TOOL_CACHE_TTLS)
 
 
-def deduplicate_results(results: dict, keys: List[str] = ["emails", "hosts", "subdomains", "ips"]) -> dict:
+def aggregate_total_results(scan) -> dict:
     """
-    Remove duplicates from lists in results dict for the given keys.
+    Totals of the deduplicated union of all tools' findings, built in one pass.
+    A subdomain found by several tools is counted once.
     """
-    for key in keys:
-        if key in results and isinstance(results[key], list):
-            results[key] = list(dict.fromkeys(results[key]))
-    return results
-    
-def aggregate_total_results(scan) -> dict:
-    def get_list(tool, key):
-        if not tool or not isinstance(tool, dict):
-            return []
-        return tool.get(key, [])
-
-    return {
-        "total_subdomains": (
-            len(get_list(scan.theharvester, "subdomains")) +
-            len(get_list(scan.amass, "subdomains")) +
-            len(get_list(scan.subfinder, "subdomains"))
-        ),
-        "total_emails": (
-            len(get_list(scan.theharvester, "emails")) +
-            len(get_list(scan.amass, "emails")) +
-            len(get_list(scan.subfinder, "emails"))
-        ),
-        "total_hosts": (
-            len(get_list(scan.theharvester, "hosts")) +
-            len(get_list(scan.amass, "hosts")) +
-            len(get_list(scan.subfinder, "hosts"))
-        ),
-        "total_ips": (
-            len(get_list(scan.theharvester, "ips")) +
-            len(get_list(scan.amass, "ips")) +
-            len(get_list(scan.subfinder, "ips"))
-        ),
-    }
+    return aggregate_totals([scan.theharvester, scan.amass, scan.subfinder])
     
 
 async def run_tool_and_update_db(
-    db: AsyncSession,
+    persister: ScanPersister,
     scan_id: str,
     domain: str,
     tool_func,             
     db_field: str,           
     tool_name: str,           
     tool_kwargs: dict = None, 
-    timeout: int = 180
+    timeout: int = 180,
+    priority: int = 0,
+    use_cache: bool = True
 ):
-    logger.info(f"Running {tool_name} for scan_id={scan_id}, domain={domain}")
+    tool_kwargs = tool_kwargs or {}
+    cache_ttl = tool_cache_ttls.get(tool_name.lower(), 0)
+
+    results = None
+    if cache_ttl > 0 and use_cache:
+        results = await _get_cached_results(domain, tool_name, tool_kwargs)
+    elif cache_ttl > 0:
+        crud_tool_cache.cache_metrics.record(tool_name.lower(), "bypassed")
+
+    if results is None:
+        if security_tools.batched(tool_name):
+            # Batched runs wait for their batch here and take one slot per process, not per scan.
+            tool_func = partial(tool_func, priority=priority)
+            slot = nullcontext()
+        else:
+            slot = tool_scheduler.slot(tool_name, priority)
+        async with slot:
+            logger.info(f"Running {tool_name} for scan_id={scan_id}, domain={domain}")
+            await publish_scan_event(scan_id, "tool_started", {"tool": tool_name})
+            start_time = datetime.utcnow()
+            results = await _run_tool(scan_id, domain, tool_func, tool_name, tool_kwargs, timeout, start_time)
+
+        if cache_ttl > 0 and not results.get("error") and not results.get("partial"):
+            await _store_cached_results(scan_id, domain, tool_name, tool_kwargs, results, cache_ttl)
+
+    if results.get("cached"):
+        # Fresh runs flush their findings while streaming; cached ones are ingested in one batch.
+        await _ingest_findings(scan_id, db_field, results)
+    persister.update(**{db_field: tool_metadata(results)}, updated_by=f"system_{tool_name.lower()}_runner")
+    logger.info(f"Queued {tool_name} results of scan {scan_id} for the DB (timeout={results.get('timeout', False)})")
+    await publish_scan_event(scan_id, "tool_finished", {
+        "tool": tool_name,
+        "counts": {kind: len(results.get(kind) or []) for kind in ("subdomains", "emails", "hosts", "ips")},
+        "error": results.get("error"),
+        "timeout": results.get("timeout", False),
+        "partial": results.get("partial", False),
+        "cached": results.get("cached", False),
+    })
+    return results
+
+
+def tool_metadata(results: dict) -> dict:
+    """
+    What is kept in a tool's JSON column: everything but the findings lists, which live in `findings`.
+    """
+    return {key: value for key, value in results.items() if key not in KINDS}
+
+
+def tool_results_response(metadata: Optional[dict], findings: Optional[Dict[str, List[str]]]) -> Optional[dict]:
+    """
+    Rebuild a tool's results in the original response shape from its metadata and findings rows.
+    Scans stored before the findings table keep their lists in the JSON column.
+    """
+    if findings is None:
+        return metadata
+    return {**(metadata or {}), **{kind: findings.get(kind, []) for kind in KINDS}}
+
+
+async def _ingest_findings(scan_id: str, tool: str, results: dict):
+    try:
+        async with AsyncSessionLocal() as findings_db:
+            await crud_finding.add_findings(findings_db, crud_finding.finding_rows(scan_id, tool, results, KINDS))
+    except Exception:
+        logger.exception(f"Failed to store {tool} findings of scan {scan_id}")
+
+
+async def _get_cached_results(domain: str, tool_name: str, tool_kwargs: dict) -> Optional[dict]:
+    try:
+        async with AsyncSessionLocal() as cache_db:
+            cached = await crud_tool_cache.get_cached_tool_result(cache_db, domain, tool_name, tool_kwargs)
+    except Exception:
+        logger.exception(f"Tool result cache lookup failed for {tool_name} on {domain}")
+        return None
+    if not cached:
+        return None
+    logger.info(f"Using cached {tool_name} results for {domain} from scan {cached.source_scan_id}")
+    return {
+        **cached.result,
+        "cached": True,
+        "cached_at": cached.created_date.isoformat(),
+        "cached_from_scan_id": cached.source_scan_id,
+    }
+
+
+async def _store_cached_results(scan_id: str, domain: str, tool_name: str, tool_kwargs: dict, results: dict, ttl: int):
+    try:
+        async with AsyncSessionLocal() as cache_db:
+            await crud_tool_cache.store_tool_result(
+                cache_db, domain, tool_name, tool_kwargs, results, ttl, source_scan_id=scan_id
+            )
+    except Exception:
+        logger.exception(f"Failed to cache {tool_name} results for {domain}")
+
+
+async def _run_tool(scan_id: str, domain: str, tool_func, tool_name: str, tool_kwargs: dict, timeout: int, start_time: datetime) -> dict:
+    """
+    Run one tool under its timeout and shape its output (or partial output) for the DB.
+    """
     results = None
     error_details = None
-    start_time = datetime.utcnow()
-    tool_kwargs = tool_kwargs or {}
-    
+    flusher = FindingsFlusher(security_tools.partial_results, scan_id, tool_name).start()
     try:
         
+        # The tool stops itself at `timeout` and keeps its partial results and stderr;
+        # the outer limit only catches a runner that fails to. Batched runs first wait for
+        # their batch and a tool slot, and their batcher applies the same limit to the process.
+        outer_timeout = None if security_tools.batched(tool_name) else timeout + settings.TOOLS_KILL_GRACE_SECONDS + 10
         tool_result = await asyncio.wait_for(
-            tool_func(domain, **tool_kwargs), 
-            timeout=timeout
+            tool_func(domain, scan_id=scan_id, timeout=timeout, **tool_kwargs), 
+            timeout=outer_timeout
         )
         end_time = datetime.utcnow()
         
@@ -87,6 +190,7 @@ async def run_tool_and_update_db(
                 data = tool_result
            
             
+            # Tool runners already collect findings deduplicated and normalised.
             results = {
                 "subdomains": data.get("subdomains", []),
                 "emails": data.get("emails", []),
@@ -94,14 +198,26 @@ async def run_tool_and_update_db(
                 "ips": data.get("ips", []),
                 "count": len(data.get("subdomains", [])),
                 "start_time": start_time.isoformat(),
-                "end_time": end_time.isoformat()
+                "end_time": end_time.isoformat(),
+                "returncode": tool_result.get("returncode"),
+                "stderr": tool_result.get("stderr", ""),
             }
-            results = deduplicate_results(results)
-            logger.info(f"{tool_name} scan complete for scan_id={scan_id}")
+            if tool_result.get("batch_domains"):
+                results["batch_domains"] = tool_result["batch_domains"]
+            if tool_result.get("timeout"):
+                results.update(timeout=True, partial=True, error=f"{tool_name} timed out after {timeout} seconds")
+                logger.warning(f"{tool_name} timed out for scan_id={scan_id}, saved its partial results.")
+            else:
+                logger.info(f"{tool_name} scan complete for scan_id={scan_id}")
         else:
             error_details = tool_result.get("error", f"{tool_name} failed without specific error.")
             logger.error(f"{tool_name} failed for scan_id={scan_id}: {error_details}")
-            results = {"error": error_details, "start_time": start_time.isoformat(), "end_time": end_time.isoformat()}
+            results = {
+                "error": error_details,
+                "start_time": start_time.isoformat(),
+                "end_time": end_time.isoformat(),
+                "stderr": tool_result.get("stderr", ""),
+            }
             
     except asyncio.TimeoutError:
         logger.warning(f"{tool_name} timed out for scan_id={scan_id}, saving partial results if available.")
@@ -110,7 +226,7 @@ async def run_tool_and_update_db(
 
         
         try:
-            partial_data = await security_tools.get_partial_results(domain)
+            partial_data = await security_tools.get_partial_results(scan_id, tool_name)
             logger.info(f"Retrieved partial results for {tool_name}: {len(partial_data.get('subdomains', []))} subdomains, {len(partial_data.get('emails', []))} emails")
         except Exception as e:
             logger.error(f"Failed to get partial results from {tool_name}: {e}")
@@ -129,10 +245,6 @@ async def run_tool_and_update_db(
             "partial": True,
             "error": f"{tool_name} timed out after {timeout} seconds"
         }
-        results = deduplicate_results(results)
-        
-        
-        security_tools.clear_partial_results(domain)
 
     except Exception as e:
         error_details = f"Exception during {tool_name} run: {str(e)}"
@@ -144,182 +256,608 @@ async def run_tool_and_update_db(
             "timeout": False,
             "partial": False,
         }
+    finally:
+        await flusher.stop()
+        security_tools.clear_partial_results(scan_id, tool_name)
+        if flusher.error and results is not None:
+            logger.error(f"{tool_name} findings of scan_id={scan_id} were not all stored: {flusher.error}")
+            results["findings_error"] = flusher.error
+            results["error"] = results.get("error") or flusher.error
 
-   
-    await crud_scan.update_scan_results(
-        db,
-        scan_id,
-        **{db_field: results if results else {"error": error_details}},
-        updated_by=f"system_{tool_name.lower()}_runner"
-    )
-    logger.info(f"Updated scan {scan_id} with {tool_name} results in DB (timeout={results.get('timeout', False)})")
     return results
 
-async def run_scan_task(scan_id: str):
+async def run_scan_task(scan_id: str, priority: int = 0, attempt: int = 1):
+    logger.info(f"Starting background scan task for scan_id={scan_id}")
     async with AsyncSessionLocal() as db:
-        logger.info(f"Starting background scan task for scan_id={scan_id}")
-
         scan = await crud_scan.get_scan_by_id(db, scan_id)
-        if not scan:
-            logger.error(f"Scan {scan_id} not found in DB for background task.")
-            return
-
-        domain = scan.domain
-        tools_enabled =  {"theharvester": True, "amass": True , "subfinder": True}
-        logger.info(f"tools_enabled: {tools_enabled}")
-      
-        overall_error_message = None
-
-       
-        await crud_scan.update_scan_status(db, scan_id, status=ScanStatus.RUNNING.value, updated_by="system_scanner")
-        logger.info(f"Scan {scan_id} status updated to RUNNING.")
+        if scan and attempt > 1:
+            # Findings flushed by an interrupted earlier attempt are found again by this one.
+            await crud_finding.delete_findings(db, scan_id)
+    if not scan:
+        logger.error(f"Scan {scan_id} not found in DB for background task.")
+        return
+
+    # Tool tasks never share a session: all row updates go through the persister.
+    persister = ScanPersister(scan_id)
+
+    domain = scan.domain
+    tools_enabled =  {"theharvester": True, "amass": True , "subfinder": True}
+    logger.info(f"tools_enabled: {tools_enabled}")
+  
+    overall_error_message = None
 
-        tool_tasks = []
-       
-        if tools_enabled.get("theharvester"):
-            logger.info("Adding theHarvester to tool_tasks")
-            tool_tasks.append(
-                
-                run_tool_and_update_db(
-                db, scan_id, domain,
-                security_tools.run_theharvester,
-                "theharvester",
-                "theHarvester",
-                tool_kwargs={"sources": "all"},
-                timeout=120
-                
-        ))
-        if tools_enabled.get("amass"):
-            logger.info("Adding amass to tool_tasks")
-            tool_tasks.append(
-                run_tool_and_update_db(
-                db, scan_id, domain,
-                security_tools.run_amass,
-                "amass",
-                "amass",
-                tool_kwargs={},
-                timeout=120
-            ))
-        if tools_enabled.get("subfinder"):
-            logger.info("Adding subfinder to tool_tasks")
-            tool_tasks.append(
-                run_tool_and_update_db(
-                db, scan_id, domain,
-                security_tools.run_subfinder,
-                "subfinder",
-                "subfinder",
-                tool_kwargs={},
-                timeout=120
-            ) )  
+   
+    persister.set_status(ScanStatus.RUNNING.value, updated_by="system_scanner")
+    await persister.flush()
+    logger.info(f"Scan {scan_id} status updated to RUNNING.")
+    await publish_scan_event(scan_id, "status", {
+        "status": ScanStatus.RUNNING.value,
+        "domain": domain,
+        "tools": [tool for tool, enabled in tools_enabled.items() if enabled],
+    })
+
+    tool_tasks = []
+   
+    if tools_enabled.get("theharvester"):
+        logger.info("Adding theHarvester to tool_tasks")
+        tool_tasks.append(
             
-        if not tool_tasks:
-            overall_error_message = "No tools enabled for this scan."
-            logger.warning(f"Scan {scan_id}: {overall_error_message}")
-            await crud_scan.update_scan_status(db, scan_id, status=ScanStatus.ERROR.value, error_message=overall_error_message, updated_by="system_scanner")
-            return
-
-        try:
+            run_tool_and_update_db(
+            persister, scan_id, domain,
+            security_tools.run_theharvester,
+            "theharvester",
+            "theHarvester",
+            tool_kwargs={"sources": "all"},
+            timeout=120,
+            priority=priority,
+            use_cache=not scan.force_refresh
             
-            await asyncio.gather(*tool_tasks, return_exceptions=True)
+    ))
+    if tools_enabled.get("amass"):
+        logger.info("Adding amass to tool_tasks")
+        tool_tasks.append(
+            run_tool_and_update_db(
+            persister, scan_id, domain,
+            security_tools.run_amass,
+            "amass",
+            "amass",
+            tool_kwargs={},
+            timeout=120,
+            priority=priority,
+            use_cache=not scan.force_refresh
+        ))
+    if tools_enabled.get("subfinder"):
+        logger.info("Adding subfinder to tool_tasks")
+        tool_tasks.append(
+            run_tool_and_update_db(
+            persister, scan_id, domain,
+            security_tools.run_subfinder,
+            "subfinder",
+            "subfinder",
+            tool_kwargs={},
+            timeout=120,
+            priority=priority,
+            use_cache=not scan.force_refresh
+        ) )  
+        
+    if not tool_tasks:
+        overall_error_message = "No tools enabled for this scan."
+        logger.warning(f"Scan {scan_id}: {overall_error_message}")
+        persister.set_status(ScanStatus.ERROR.value, error_message=overall_error_message, updated_by="system_scanner")
+        await persister.close()
+        await publish_scan_event(scan_id, "status", {"status": ScanStatus.ERROR.value, "error": overall_error_message})
+        return
 
-            scan_after_tools = await crud_scan.get_scan_by_id(db, scan_id)
-            
-            if not scan_after_tools:
-                overall_error_message = "Scan disappeared during execution."
-                raise ValueError(overall_error_message)
+    try:
+        
+        tool_fields = [field for field, enabled in tools_enabled.items() if enabled]
+        tool_results = await asyncio.gather(*tool_tasks, return_exceptions=True)
 
-            
-            summary = aggregate_total_results(scan_after_tools)
-            
-            tool_errors = []
-            if tools_enabled.get("theharvester") and scan_after_tools.theharvester and scan_after_tools.theharvester.get("error"):
-                tool_errors.append(f"theHarvester: {scan_after_tools.theharvester['error']}")
-          
-            if tool_errors:
-                overall_error_message = "Some tools failed: " + "; ".join(tool_errors)
-                final_status = ScanStatus.ERROR.value
-            else:
-                final_status = ScanStatus.FINISHED.value
-
-            await crud_scan.update_scan_results(db, scan_id, summary=summary, updated_by="system_scanner")
-            await crud_scan.update_scan_status(
-                db,
-                scan_id,
-                status=final_status,
-                error_message=overall_error_message,
-                updated_by="system_scanner"
-            )
-            logger.info(f"Scan {scan_id} finalized with status: {final_status}")
+        # The tool tasks returned what they persisted, so there is no need to read the row back.
+        scan_after_tools = SimpleNamespace(theharvester=None, amass=None, subfinder=None)
+        for field, result in zip(tool_fields, tool_results):
+            if isinstance(result, dict):
+                setattr(scan_after_tools, field, result)
+
+        tool_outputs = [scan_after_tools.theharvester, scan_after_tools.amass, scan_after_tools.subfinder]
+        summary = await run_cpu_bound(aggregate_totals, tool_outputs, size=findings_size(*tool_outputs))
+        
+        tool_errors = []
+        if tools_enabled.get("theharvester") and scan_after_tools.theharvester and scan_after_tools.theharvester.get("error"):
+            tool_errors.append(f"theHarvester: {scan_after_tools.theharvester['error']}")
+        # Findings that could not be stored fail the scan whichever tool found them
+        # (theHarvester's are already counted through its error).
+        for field in tool_fields:
+            output = getattr(scan_after_tools, field)
+            if field != "theharvester" and output and output.get("findings_error"):
+                tool_errors.append(f"{field}: {output['findings_error']}")
+      
+        if tool_errors:
+            overall_error_message = "Some tools failed: " + "; ".join(tool_errors)
+            final_status = ScanStatus.ERROR.value
+        else:
+            final_status = ScanStatus.FINISHED.value
+
+        # The totals also go to their indexed columns, so lists can sort and filter by result size.
+        persister.update(summary=summary, **summary, updated_by="system_scanner")
+        persister.set_status(final_status, error_message=overall_error_message, updated_by="system_scanner")
+        await persister.close()
+        # Tools that succeeded still found something when another failed.
+        await record_scan_assets(scan_id, domain)
+        if final_status == ScanStatus.FINISHED.value:
+            await precompute_results_document(scan_id)
+        logger.info(f"Scan {scan_id} finalized with status: {final_status}")
+        await publish_scan_event(scan_id, "status", {"status": final_status, "summary": summary, "error": overall_error_message})
+
+    except asyncio.CancelledError:
+        # Only a stopping worker cancels a scan task, and it puts the job back on the
+        # queue: the scan is pending again and its stream stays open for the rerun.
+        logger.warning(f"Scan {scan_id} was interrupted, it goes back on the queue.")
+        persister.update(started_at=None, updated_by="system_scanner")
+        persister.set_status(ScanStatus.PENDING.value, updated_by="system_scanner")
+        await persister.close()
+        await publish_scan_event(scan_id, "status", {"status": ScanStatus.PENDING.value, "queued": True, "requeued": True})
+        raise
+    except Exception as e:
+        overall_error_message = f"Critical error during scan orchestration: {str(e)}"
+        logger.exception(f"Critical exception in scan {scan_id} orchestration.")
+        persister.set_status(ScanStatus.ERROR.value, error_message=overall_error_message, updated_by="system_scanner")
+        await persister.close()
+        await publish_scan_event(scan_id, "status", {"status": ScanStatus.ERROR.value, "error": overall_error_message})
+
+async def _estimate_queue_wait(db: AsyncSession, position: int) -> int:
+    """
+    Rough number of seconds until a scan at `position` in the queue gets a worker.
+    """
+    workers = await crud_scan_job.get_live_workers(db, settings.SCAN_JOB_STALE_SECONDS)
+    capacity = max(1, sum(worker.concurrency for worker in workers))
+    rounds = -(-position // capacity)
+    return rounds * settings.SCAN_ESTIMATED_DURATION_SECONDS
 
-        except asyncio.CancelledError:
-            logger.warning(f"Scan {scan_id} was cancelled.")
-            await crud_scan.update_scan_status(db, scan_id, status=ScanStatus.CANCELLED.value, updated_by="system_scanner")
-        except Exception as e:
-            overall_error_message = f"Critical error during scan orchestration: {str(e)}"
-            logger.exception(f"Critical exception in scan {scan_id} orchestration.")
-            await crud_scan.update_scan_status(db, scan_id, status=ScanStatus.ERROR.value, error_message=overall_error_message, updated_by="system_scanner")
 
 @router.post("/", response_model=ScanOut, status_code=status.HTTP_202_ACCEPTED)
 async def start_scan(
     scan_create: ScanCreate,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
+    """
+    Create a scan record and put it on the durable job queue.
+    The scan itself is run by a worker process (`python -m app.worker`).
+    """
     
     logger.info(f"Received scan request for domain={scan_create.domain}")
-    db_scan = await crud_scan.create_scan(db, scan_create, created_by="api_user") 
+    if settings.SCAN_QUEUE_MAX_PENDING > 0 and not await crud_scan_job.has_inflight_scan_job(
+        db, scan_create.domain, scan_create.force_refresh
+    ):
+        # Scans that attach to an in-flight run of the same domain add no load, so they skip admission control.
+        queued = await crud_scan_job.count_queued_scan_jobs(db)
+        if queued >= settings.SCAN_QUEUE_MAX_PENDING:
+            position = queued + 1
+            retry_after = await _estimate_queue_wait(db, position)
+            logger.warning(f"Rejecting scan for domain={scan_create.domain}: {queued} scans already queued")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail={
+                    "message": "Scan queue is full, retry later.",
+                    "queue_position": position,
+                    "retry_after_seconds": retry_after,
+                },
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    # The scan is committed together with its job, so a failure cannot leave a pending scan nothing will run.
+    db_scan = await crud_scan.create_scan(db, scan_create, created_by="api_user", commit=False)
     if not db_scan:
      logger.error("Failed to create scan record! Check DB and migrations.")
      raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create scan record.")
     if not db_scan:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create scan record.")
 
-    background_tasks.add_task(run_scan_task, db_scan.id)     
+    job = await crud_scan_job.enqueue_scan_job(
+        db,
+        db_scan.id,
+        domain=db_scan.domain,
+        priority=scan_create.priority,
+        max_attempts=settings.SCAN_JOB_MAX_ATTEMPTS,
+        force_refresh=scan_create.force_refresh,
+    )
+    if job.leader_job_id:
+        await db.refresh(db_scan)
+    logger.info(f"Scan {db_scan.id} queued for domain={db_scan.domain} (job={job.id}, leader={job.leader_job_id})")
     return ScanOut.model_validate(db_scan) 
 
 
 
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_overall_scan_stats(
+    db: AsyncSession = Depends(get_db),
+    user_id: Optional[int] = None
+):
+    """
+    Retrieve overall scanning statistics.
+    Declared before /{scan_id} so "stats" is not matched as a scan ID.
+    """
+    logger.info(f"Retrieving scan statistics for user_id={user_id}")
+    stats = await crud_scan.get_scan_stats(db, user_id=user_id)
+    return stats
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@router.get("/export")
+async def export_findings(
+    domain: List[str] = Query(..., min_length=1),
+    domain_match: str = Query("exact", pattern="^(exact|suffix|substring)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    kind: Optional[List[str]] = Query(None),
+    dedup: bool = False,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+):
+    """
+    Stream the findings of every scan of the given domains (repeat `domain` for
+    several) created in [since, until), as NDJSON or CSV. With `dedup` each
+    (kind, value) is exported once, with its first/last sighting and scan count.
+    Rows come from a server-side cursor, so exports of any size use constant memory.
+    """
+    unknown = [value for value in kind or [] if value not in KINDS]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown finding kinds: {unknown}")
+    logger.info(f"Exporting findings of {domain} ({domain_match}) since={since} until={until} dedup={dedup} as {export_format}")
+    filename = f"findings-{datetime.now():%Y%m%d-%H%M%S}.{export_format}"
+    return StreamingResponse(
+        _export_stream(domain, domain_match, since, until, kind, dedup, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def _export_stream(domains, domain_match, since, until, kinds, dedup, export_format, chunk_rows: int = 1000):
+    columns = crud_finding.DEDUP_EXPORT_COLUMNS if dedup else crud_finding.EXPORT_COLUMNS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    lines: List[bytes] = []
+    if export_format == "csv":
+        writer.writerow(columns)
+    try:
+        # The request's session is closed before a streamed body is sent, so the export has its own.
+        async with AsyncSessionLocal() as db:
+            async for row in crud_finding.stream_findings(
+                db, domains, domain_match, since, until, kinds, dedup, batch_size=chunk_rows
+            ):
+                values = [value.isoformat() if isinstance(value, datetime) else value for value in row]
+                if export_format == "csv":
+                    writer.writerow(values)
+                else:
+                    lines.append(dumps(dict(zip(columns, values))))
+                    lines.append(b"\n")
+                if len(lines) >= 2 * chunk_rows or buffer.tell() >= 64 * 1024:
+                    yield b"".join(lines) + buffer.getvalue().encode()
+                    lines.clear()
+                    buffer.seek(0)
+                    buffer.truncate()
+    except Exception:
+        logger.exception(f"Findings export of {domains} failed")
+        raise
+    yield b"".join(lines) + buffer.getvalue().encode()
+
+
+@router.get("/queue/stats", response_model=Dict[str, Any])
+async def get_queue_stats(db: AsyncSession = Depends(get_db)):
+    """
+    Queue depth, per-tool slot usage and result cache hits/misses summed over live workers.
+    """
+    jobs = await crud_scan_job.count_scan_jobs_by_status(db)
+    workers = await crud_scan_job.get_live_workers(db, settings.SCAN_JOB_STALE_SECONDS)
+
+    tools: Dict[str, Dict[str, int]] = {}
+    result_cache: Dict[str, Dict[str, int]] = {}
+    for worker in workers:
+        for tool, usage in ((worker.stats or {}).get("tools") or {}).items():
+            totals = tools.setdefault(tool, {"slots": 0, "in_use": 0, "waiting": 0})
+            for key in totals:
+                totals[key] += usage.get(key, 0)
+        for tool, counters in ((worker.stats or {}).get("result_cache") or {}).items():
+            totals = result_cache.setdefault(tool, {})
+            for key, value in counters.items():
+                totals[key] = totals.get(key, 0) + value
+
+    return {
+        "queued": jobs["queued"],
+        "running": jobs["running"],
+        "max_pending": settings.SCAN_QUEUE_MAX_PENDING,
+        "workers": [
+            {
+                "id": worker.id,
+                "concurrency": worker.concurrency,
+                "active_jobs": worker.active_jobs,
+                "heartbeat_at": worker.heartbeat_at.isoformat() if worker.heartbeat_at else None,
+                "stats": worker.stats,
+            }
+            for worker in workers
+        ],
+        "tools": tools,
+        "result_cache": result_cache,
+    }
+
+
+def _scan_response_headers(etag: str, encoding: Optional[str] = None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+async def _cached_scan_response(request: Request, kind: str, scan, encoding: Optional[str] = None) -> Optional[Response]:
+    """
+    304 or the cached bytes of a finished scan's payload; None when it has to be built.
+    Each content encoding is a separate representation with its own ETag.
+    """
+    if scan.status != ScanStatus.FINISHED.value:
+        return None
+    version = scan_version(scan.updated_date)
+    etag = make_etag(kind, scan.id, version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_scan_response_headers(etag))
+    body = await result_cache.get(kind, scan.id, version)
+    if body is None:
+        return None
+    return Response(body, media_type="application/json", headers=_scan_response_headers(etag, encoding))
+
+
+async def _scan_json_response(kind: str, scan, body: bytes, encoding: Optional[str] = None) -> Response:
+    """
+    JSON response of a freshly built payload, cached and tagged when the scan is finished.
+    """
+    if scan.status != ScanStatus.FINISHED.value:
+        return Response(body, media_type="application/json")
+    version = scan_version(scan.updated_date)
+    etag = make_etag(kind, scan.id, version)
+    await result_cache.put(kind, scan.id, version, body)
+    return Response(body, media_type="application/json", headers=_scan_response_headers(etag, encoding))
+
+
+def _results_document(scan, found: Dict[str, Dict[str, List[str]]]) -> dict:
+    return {
+        "scan_id": scan.id,
+        "status": scan.status,
+        "theHarvester": tool_results_response(scan.theharvester, found.get("theharvester")),
+        "amass": tool_results_response(scan.amass, found.get("amass")),
+        "subfinder": tool_results_response(scan.subfinder, found.get("subfinder")),
+        "summary": scan.summary,
+        "error": scan.error_message,
+        "started_at": scan.started_at.isoformat() if scan.started_at else None,
+        "finished_at": scan.finished_at.isoformat() if scan.finished_at else None,
+        "duration_seconds": scan.duration_seconds,
+        "domain": scan.domain,
+    }
+
+
+def scan_results_document(scan, found: Dict[str, Dict[str, List[str]]]) -> dict:
+    """
+    /results payload of a finished scan, with every findings list deduplicated and sorted.
+    """
+    return canonical_results_document(_results_document(scan, found))
+
+
+async def _store_results_document(db: AsyncSession, scan_id: str):
+    """
+    Builds and stores the compressed result document of a finished scan.
+    Returns None (and stores nothing) when the scan is not finished.
+    Big documents are canonicalised, serialised and compressed in the result process pool.
+    """
+    scan, found = await crud_finding.get_scan_with_findings(db, scan_id)
+    if not scan or scan.status != ScanStatus.FINISHED.value:
+        return None
+    document = _results_document(scan, found)
+    content, raw_size = await run_cpu_bound(
+        render_results_document, document, size=findings_size(scan.theharvester, scan.amass, scan.subfinder, *found.values())
+    )
+    return await crud_scan_document.store_result_document(db, scan.id, scan_version(scan.updated_date), content, raw_size)
+
+
+async def precompute_results_document(scan_id: str) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await _store_results_document(db, scan_id)
+    except Exception:
+        logger.exception(f"Failed to store the result document of scan {scan_id}")
+
+
+async def record_scan_assets(scan_id: str, domain: str) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await crud_asset.upsert_scan_assets(db, scan_id, domain)
+    except Exception:
+        logger.exception(f"Failed to update the asset inventory with scan {scan_id}")
+
+
 @router.get("/{scan_id}/results", response_model=Dict[str, Any])
 async def get_scan_results(
     scan_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
+    """
+    Results of a finished scan, or the findings flushed so far while it runs.
+    A finished scan's document is stored gzip-compressed: it is sent as is to
+    clients that accept gzip and decompressed for the others, and cached with
+    ETag/If-None-Match.
+    """
     logger.info(f"Retrieving results for scan_id={scan_id}")
-    scan = await crud_scan.get_scan_by_id(db, scan_id)
+    version = await crud_scan.get_scan_version(db, scan_id)
+    if not version or not version.is_active:
+        raise HTTPException(status_code=404, detail="Scan not found or soft-deleted.")
+
+    encoding = "gzip" if accepts_encoding(request.headers.get("accept-encoding"), "gzip") else None
+    kind = RESULTS_GZIP_KIND if encoding else RESULTS_KIND
+    cached = await _cached_scan_response(request, kind, version, encoding)
+    if cached is not None:
+        return cached
+
+    if version.status == ScanStatus.FINISHED.value:
+        document = await crud_scan_document.get_result_document(db, scan_id)
+        if document is None or document.version != scan_version(version.updated_date):
+            # Scans finished before documents existed, or attached to another scan's run.
+            document = await _store_results_document(db, scan_id)
+        if document is not None and document.version == scan_version(version.updated_date):
+            body = document.content if encoding else gzip.decompress(document.content)
+            return await _scan_json_response(kind, version, body, encoding)
+
+    scan, found = await crud_finding.get_scan_with_findings(db, scan_id)
     if not scan or not scan.is_active:
         raise HTTPException(status_code=404, detail="Scan not found or soft-deleted.")
 
     if scan.status != ScanStatus.FINISHED.value:
+        # Findings the tools have flushed so far, so a running scan is not empty for minutes.
         return {
         "scan_id": scan.id,
         "status": scan.status,
         "domain": scan.domain,  
+        "in_progress": {tool: {kind: found[tool].get(kind, []) for kind in KINDS} for tool in found},
     }
-         
-    return {
-        "scan_id": scan.id,
-        "status": scan.status,
-        "theHarvester": scan.theharvester,
-        "amass": scan.amass,
-        "subfinder": scan.subfinder,  
-        "summary": scan.summary,
-        "error": scan.error_message,
-        "started_at": scan.started_at.isoformat() if scan.started_at else None,
-        "finished_at": scan.finished_at.isoformat() if scan.finished_at else None,
-        "duration_seconds": scan.duration_seconds,
-        "domain": scan.domain,
-    }
+    # The scan changed while the document was being built; answer without caching.
+    body = await run_cpu_bound(
+        encode_results_document, _results_document(scan, found),
+        size=findings_size(scan.theharvester, scan.amass, scan.subfinder, *found.values()),
+    )
+    return Response(body, media_type="application/json")
     
     
+@router.get("/{scan_id}/diff", response_model=Dict[str, Any])
+async def get_scan_diff(
+    scan_id: str,
+    against: str = "previous",
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Findings added and removed in this scan compared to another scan of the same
+    domain (`against` is a scan ID, or "previous" for the latest earlier finished
+    scan), per tool and in total. Diffs of consecutive finished scans are stored
+    once computed.
+    """
+    logger.info(f"Diffing scan {scan_id} against {against}")
+    scan = await crud_scan.get_scan_by_id(db, scan_id)
+    if not scan or not scan.is_active:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scan not found or soft-deleted.")
+
+    previous = await crud_scan.get_previous_scan(db, scan)
+    if against == "previous":
+        other = previous
+        if other is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No earlier finished scan of {scan.domain}.")
+    else:
+        other = await crud_scan.get_scan_by_id(db, against)
+        if not other or not other.is_active:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scan to diff against not found or soft-deleted.")
+        if other.domain.lower() != scan.domain.lower():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only scans of the same domain can be compared.")
+
+    cacheable = (
+        previous is not None
+        and other.id == previous.id
+        and scan.status == ScanStatus.FINISHED.value
+        and other.status == ScanStatus.FINISHED.value
+    )
+    diff = await crud_scan_diff.get_scan_diff(db, scan.id, other.id) if cacheable else None
+    if diff is None:
+        diff = await crud_scan_diff.diff_findings(db, scan.id, other.id)
+        if cacheable:
+            await crud_scan_diff.store_scan_diff(db, scan.id, other.id, diff)
+    return {"domain": scan.domain, **diff}
+
+
+@router.get("/{scan_id}/events")
+async def stream_scan_events(
+    scan_id: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Server-Sent Events stream of a scan's progress: status changes, tool start and finish,
+    and batches of new findings as the tools stream them (truncated batches carry only their
+    first SCAN_EVENTS_MAX_FINDINGS values). Reconnecting clients send
+    Last-Event-ID and only receive newer events. The stream ends with the scan's final status.
+    """
+    scan = await crud_scan.get_scan_by_id(db, scan_id)
+    if not scan or not scan.is_active:
+        raise HTTPException(status_code=404, detail="Scan not found or soft-deleted.")
+
+    # A scan attached to another run of the same domain also shows that run's tool progress.
+    leader_scan_id = await crud_scan_job.get_leader_scan_id(db, scan_id)
+    scan_ids = [scan_id] + ([leader_scan_id] if leader_scan_id else [])
+    final_status = None
+    if scan.status in TERMINAL_STATUSES:
+        final_status = {"status": scan.status, "domain": scan.domain, "summary": scan.summary, "error": scan.error_message}
+    await db.close()
+
+    cursors = decode_event_cursor(scan_ids, last_event_id)
+    return StreamingResponse(
+        _scan_event_stream(request, scan_id, scan_ids, cursors, final_status),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _scan_event_stream(request: Request, scan_id: str, scan_ids: List[str], cursors: Dict[str, int], final_status: Optional[dict]):
+    listening = await broker.ensure_listening()
+    waiter = broker.subscribe(scan_ids)
+    page_size = 500
+    try:
+        yield f"retry: {settings.SCAN_EVENTS_RETRY_MS}\n\n"
+        pending = True
+        while True:
+            if pending or not broker.listening:
+                waiter.clear()
+                async with AsyncSessionLocal() as events_db:
+                    events = await crud_scan_event.get_scan_events_after(events_db, cursors, limit=page_size)
+                for event in events:
+                    cursors[event.scan_id] = event.seq
+                    if event.event == "status" and event.scan_id != scan_id:
+                        continue
+                    yield format_sse(encode_event_cursor(scan_ids, cursors), event.event, event.data)
+                    if event.event == "status" and event.scan_id == scan_id and event.data.get("status") in TERMINAL_STATUSES:
+                        return
+                if not events and final_status:
+                    # Finished before this connection and nothing left to replay.
+                    yield format_sse(None, "status", final_status)
+                    return
+                final_status = None
+                if len(events) == page_size:
+                    continue
+
+            if await request.is_disconnected():
+                return
+            timeout = settings.SCAN_EVENTS_KEEPALIVE_SECONDS if listening else settings.SCAN_EVENTS_POLL_INTERVAL
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=timeout)
+                pending = True
+            except asyncio.TimeoutError:
+                pending = False
+                yield ": keepalive\n\n"
+    finally:
+        broker.unsubscribe(scan_ids, waiter)
+
+
 @router.get("/{scan_id}", response_model=ScanOut)
 async def get_scan_details(
     scan_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get full scan details by scan ID.
+    Finished scans are served from the result cache, with ETag/If-None-Match.
     """
     logger.info(f"Retrieving full details for scan_id={scan_id}")
+    version = await crud_scan.get_scan_version(db, scan_id)
+    if not version or not version.is_active:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scan not found or soft-deleted.")
+    cached = await _cached_scan_response(request, SCAN_KIND, version)
+    if cached is not None:
+        return cached
+
     scan_data = await crud_scan.get_scan_by_id(db, scan_id)
 
     if not scan_data or not scan_data.is_active:
@@ -330,7 +868,9 @@ async def get_scan_details(
        
         pass 
     
-    return ScanOut.model_validate(scan_data) 
+    return await _scan_json_response(
+        SCAN_KIND, scan_data, ScanOut.model_validate(scan_data).model_dump_json(by_alias=True).encode()
+    )
 
 
 @router.get("/{scan_id}/status", response_model=Dict[str, Any]) 
@@ -369,50 +909,72 @@ async def delete_scan_record(
     success = await crud_scan.delete_scan(db, scan_id, deleted_by="api_user") # You might want to get actual user from auth
     if not success:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scan not found.")
+    await result_cache.invalidate(scan_id)
     return {} 
 
 
 
-@router.get("/", response_model=List[ScanOut])
+@router.get("/", response_model=List[ScanListItem])
 async def list_scans(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
     status: Optional[ScanStatus] = None, 
     domain: Optional[str] = None,
+    domain_match: str = Query("substring", pattern="^(exact|suffix|substring)$"),
     user_id: Optional[int] = None, 
     is_public: Optional[bool] = None,
+    min_subdomains: Optional[int] = Query(None, ge=0),
     order_by: str = "created_date",
     order_direction: str = "desc"
 ):
     """
-    List all scans with filtering and pagination.
+    List scans with filtering and pagination, without their tool results.
+    Pages in (created_date, id) order use keyset pagination: the next page's cursor
+    is returned in the X-Next-Cursor header (and a Link rel="next" header).
+    Other orderings fall back to skip/limit.
+    `domain_match` selects how `domain` is matched: exact, suffix (the domain and
+    its subdomains, e.g. "*.corp.example.com") or substring.
     """
     logger.info(f"Listing scans with filters: status={status}, domain={domain}, user_id={user_id}")
-    scans_from_db = await crud_scan.get_scans(
-        db, 
-        skip=skip, 
-        limit=limit, 
-        status=status.value if status else None,
-        domain=domain,
-        user_id=user_id,
-        is_public=is_public,
-        order_by=order_by,
-        order_direction=order_direction
-    )
-    return [ScanOut.model_validate(scan) for scan in scans_from_db] 
+    if order_by != "created_date" or (skip and not cursor):
+        scans_from_db = await crud_scan.get_scans(
+            db, 
+            skip=skip, 
+            limit=limit, 
+            status=status.value if status else None,
+            domain=domain,
+            domain_match=domain_match,
+            user_id=user_id,
+            is_public=is_public,
+            min_subdomains=min_subdomains,
+            order_by=order_by,
+            order_direction=order_direction
+        )
+        return [ScanListItem.model_validate(scan) for scan in scans_from_db]
 
-@router.get("/stats", response_model=Dict[str, Any])
-async def get_overall_scan_stats(
-    db: AsyncSession = Depends(get_db),
-    user_id: Optional[int] = None 
-):
-    """
-    Retrieve overall scanning statistics.
-    """
-    logger.info(f"Retrieving scan statistics for user_id={user_id}")
-    stats = await crud_scan.get_scan_stats(db, user_id=user_id)
-    return stats
+    try:
+        scans_from_db, next_cursor = await crud_scan.get_scans_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            status=status.value if status else None,
+            domain=domain,
+            domain_match=domain_match,
+            user_id=user_id,
+            is_public=is_public,
+            min_subdomains=min_subdomains,
+            order_direction=order_direction,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status_codes.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return [ScanListItem.model_validate(scan) for scan in scans_from_db]
 
 @router.get("/tools/health", response_model=Dict[str, Any])
 async def check_tools_health():
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class AssetOut(BaseModel):
+    """One entry of the asset inventory of a scanned domain."""
+    apex: str = Field(..., description="The scanned domain the asset was found for.")
+    kind: str = Field(..., description="Asset type: subdomains, emails, hosts or ips.")
+    value: str = Field(..., description="The asset itself.")
+    first_seen: datetime = Field(..., description="When a scan first found the asset.")
+    last_seen: datetime = Field(..., description="When a scan last found the asset.")
+    seen_count: int = Field(..., description="Number of scans that found the asset.")
+    last_scan_id: Optional[str] = Field(None, description="The latest scan that found the asset.")
+
+    class Config:
+        from_attributes = True
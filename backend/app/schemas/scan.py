@@ -23,7 +23,8 @@ class ScanBase(BaseModel):
 
 class ScanCreate(ScanBase):
     """Schema for creating a new scan."""
-    pass 
+    priority: int = Field(0, ge=-10, le=10, description="Queue priority; higher runs first when tool slots are scarce.")
+    force_refresh: bool = Field(False, description="Run every tool even if a recent cached result exists.")
 
 class ScanUpdate(BaseModel):
     """Schema for updating an existing scan."""
@@ -71,4 +72,26 @@ class ScanOut(ScanBase):
     class Config:
         from_attributes = True 
         
-        use_enum_values = True 
\ No newline at end of file
+        use_enum_values = True 
+
+class ScanListItem(BaseModel):
+    """Slim scan representation for list pages (no tool results)."""
+    scan_id: str = Field(..., alias="id", description="Unique identifier of the scan.")
+    domain: str = Field(..., description="The domain being scanned.")
+    status: ScanStatus = Field(..., description="Current status of the scan.")
+    created_date: datetime = Field(..., description="Timestamp when the scan record was created.")
+    started_at: Optional[datetime] = Field(None, description="Timestamp when the scan started.")
+    finished_at: Optional[datetime] = Field(None, description="Timestamp when the scan finished.")
+    duration_seconds: Optional[int] = Field(None, description="Duration of the scan in seconds.")
+    error: Optional[str] = Field(None, alias="error_message", description="Error message if the scan failed.")
+    total_subdomains: Optional[int] = Field(0, description="Total number of subdomains found.")
+    total_emails: Optional[int] = Field(0, description="Total number of emails found.")
+    total_ips: Optional[int] = Field(0, description="Total number of IPs found.")
+    total_hosts: Optional[int] = Field(0, description="Total number of hosts found.")
+    user_id: Optional[int] = Field(None, description="ID of the user who initiated the scan.")
+    is_public: Optional[bool] = Field(False, description="Whether the scan results can be publicly shared.")
+
+    class Config:
+        from_attributes = True
+        use_enum_values = True
+
@@ -0,0 +1,53 @@
+"""
+Response encoding helpers: JSON serialisation with orjson when it is installed
+(falling back to the stdlib encoder with the same compact output), and
+Accept-Encoding negotiation for precompressed bodies.
+"""
+import json
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class of the API; FastAPI has already made the content JSON-compatible.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def accepts_encoding(accept_encoding: Optional[str], coding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows `coding` (q=0 forbids it, * allows it).
+    """
+    if not accept_encoding:
+        return False
+    wildcard = False
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        name = name.strip().lower()
+        if name == coding:
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return wildcard
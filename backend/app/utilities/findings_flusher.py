@@ -0,0 +1,175 @@
+"""
+Incremental persistence of the findings a tool streams while it runs.
+
+A FindingsFlusher watches one (scan_id, tool) run in the partial results store
+and appends new findings to the `findings` table whenever `batch_size` of them
+have accumulated or `interval` seconds have passed, whichever comes first.
+Each flushed batch is also published as `findings` scan events, one per kind,
+with the new values (at most SCAN_EVENTS_MAX_FINDINGS, flagged as truncated
+beyond that), their count and their offset.
+
+A failed flush is retried with the next batch. After FINDINGS_FLUSH_MAX_FAILURES
+consecutive failures, and always on the final flush, the batch is stored by
+halves instead, so the rows that fail on their own are found and dropped
+(published as a `findings_dropped` event) rather than blocking the rest.
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.crud import finding as crud_finding
+from app.db.session import AsyncSessionLocal
+from app.utilities.logger import logger
+from app.utilities.scan_events import publish_scan_events
+from tools.partial_results import PartialResultsStore
+
+
+class FindingsFlusher:
+    def __init__(
+        self,
+        store: PartialResultsStore,
+        scan_id: str,
+        tool: str,
+        batch_size: int = None,
+        interval: float = None,
+        max_failures: int = None,
+        session_factory=None,
+    ):
+        self.store = store
+        self.scan_id = scan_id
+        self.tool = tool.lower()
+        self.batch_size = batch_size or settings.FINDINGS_FLUSH_BATCH_SIZE
+        self.interval = interval or settings.FINDINGS_FLUSH_INTERVAL_SECONDS
+        self.max_failures = max_failures or settings.FINDINGS_FLUSH_MAX_FAILURES
+        self._session_factory = session_factory or AsyncSessionLocal
+        self._offsets: Dict[str, int] = {}
+        self._unflushed = 0
+        self._batch_ready = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self.flushed = 0
+        self.dropped = 0
+        # Why findings were dropped, or why the last flush failed while its rows are still retried.
+        self.error: Optional[str] = None
+
+    def _on_finding(self, kind: str, value: str) -> None:
+        self._unflushed += 1
+        if self._unflushed >= self.batch_size:
+            self._batch_ready.set()
+
+    def start(self) -> "FindingsFlusher":
+        self.store.watch(self.scan_id, self.tool, self._on_finding)
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.shield(self.flush())
+
+    async def _store(self, rows: List[dict]) -> int:
+        async with self._session_factory() as db:
+            return await crud_finding.add_findings(db, rows)
+
+    async def _store_by_halves(self, rows: List[dict]) -> Tuple[int, int]:
+        """
+        Store a batch that failed as a whole half by half, splitting each half
+        that fails again; returns (stored, dropped).
+        """
+        stored = dropped = 0
+        middle = len(rows) // 2
+        for half in (rows[:middle], rows[middle:]):
+            if not half:
+                continue
+            try:
+                stored += await self._store(half)
+            except Exception as e:
+                if len(half) > 1:
+                    half_stored, half_dropped = await self._store_by_halves(half)
+                    stored += half_stored
+                    dropped += half_dropped
+                else:
+                    logger.warning(f"Dropping a {self.tool} {half[0]['kind']} finding of scan {self.scan_id} that cannot be stored: {e}")
+                    dropped += 1
+        return stored, dropped
+
+    async def flush(self, final: bool = False) -> int:
+        """
+        Append everything found since the last flush. If the insert fails the
+        findings stay unflushed and are retried with the next batch, until
+        `max_failures` consecutive failures or the `final` flush.
+        """
+        async with self._lock:
+            self._batch_ready.clear()
+            snapshot = self.store.get(self.scan_id, self.tool)
+            if snapshot is None:
+                if self._unflushed:
+                    # The run's findings left the store before they were written.
+                    logger.error(f"{self._unflushed} {self.tool} findings of scan {self.scan_id} vanished before they were flushed")
+                    self.dropped += self._unflushed
+                    self.error = f"Dropped {self.dropped} findings that could not be stored"
+                    self._unflushed = 0
+                return 0
+
+            now = datetime.now()
+            rows: List[dict] = []
+            events = []
+            for kind, count in snapshot.counts.items():
+                offset = self._offsets.get(kind, 0)
+                if count <= offset:
+                    continue
+                items = snapshot.items_since(kind, offset)
+                rows.extend(
+                    {"scan_id": self.scan_id, "tool": self.tool, "kind": kind, "value": value, "first_seen_at": now}
+                    for value in items
+                )
+                events.append((self.scan_id, "findings", {
+                    "tool": self.tool,
+                    "kind": kind,
+                    "offset": offset,
+                    "count": len(items),
+                    "items": items[:settings.SCAN_EVENTS_MAX_FINDINGS],
+                    "truncated": len(items) > settings.SCAN_EVENTS_MAX_FINDINGS,
+                }))
+            if not rows:
+                return 0
+
+            dropped = 0
+            try:
+                stored = await self._store(rows)
+            except Exception as e:
+                self._failures += 1
+                if not final and self._failures < self.max_failures:
+                    logger.exception(f"Failed to flush {len(rows)} {self.tool} findings of scan {self.scan_id}")
+                    self.error = f"Failed to store {len(rows)} findings: {e}"
+                    return 0
+                logger.error(f"Failed to flush {len(rows)} {self.tool} findings of scan {self.scan_id} ({e}), storing them by halves")
+                stored, dropped = await self._store_by_halves(rows)
+
+            self._failures = 0
+            if dropped:
+                self.dropped += dropped
+                self.error = f"Dropped {self.dropped} findings that could not be stored"
+                events.append((self.scan_id, "findings_dropped", {"tool": self.tool, "dropped": dropped}))
+            elif not self.dropped:
+                self.error = None
+            self._offsets.update(snapshot.counts)
+            self._unflushed = max(0, self._unflushed - len(rows))
+            self.flushed += stored
+            await publish_scan_events(events)
+            return stored
+
+    async def stop(self) -> int:
+        """
+        Stop the background loop and flush what is left. Nothing is left
+        unflushed afterwards; if findings had to be dropped, `error` says so.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        return await self.flush(final=True)
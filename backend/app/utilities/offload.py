@@ -0,0 +1,130 @@
+"""
+Process pool for CPU-heavy result processing.
+
+Decoding big tool reports, merging and canonicalising hundreds of thousands of
+findings and compressing the result document hold the GIL for seconds, which
+freezes every other request served by the same event loop. Work whose input is
+at least RESULT_OFFLOAD_MIN_ITEMS findings runs in a pool of
+RESULT_POOL_WORKERS processes instead; smaller inputs stay inline, where the
+round trip to another process would cost more than it saves.
+
+Pickling a few hundred thousand strings for the pool would itself hold the GIL
+for a few hundred milliseconds in one go, so long lists of strings are joined
+into one string each first, PACK_CHUNK_ITEMS at a time with the event loop
+getting a turn in between, and split again in the pool process.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, List, Optional
+
+from app.config import settings
+from app.utilities.logger import logger
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+SEPARATOR = "\x00"
+# Lists shorter than this are pickled as they are.
+PACK_MIN_ITEMS = 1000
+PACK_CHUNK_ITEMS = 20000
+
+
+class _PackedStrings:
+    __slots__ = ("joined",)
+
+    def __init__(self, joined: str):
+        self.joined = joined
+
+    def __getstate__(self):
+        return self.joined
+
+    def __setstate__(self, state):
+        self.joined = state
+
+
+async def _pack_list(values: List[Any]) -> Any:
+    if len(values) < PACK_MIN_ITEMS:
+        return None
+    parts = []
+    for start in range(0, len(values), PACK_CHUNK_ITEMS):
+        chunk = values[start:start + PACK_CHUNK_ITEMS]
+        if not all(type(value) is str for value in chunk):
+            return None
+        parts.append(SEPARATOR.join(chunk))
+        await asyncio.sleep(0)
+    joined = SEPARATOR.join(parts)
+    if joined.count(SEPARATOR) != len(values) - 1:
+        return None
+    return _PackedStrings(joined)
+
+
+async def _pack(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: await _pack(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        packed = await _pack_list(value) if isinstance(value, list) else None
+        if packed is not None:
+            return packed
+        items = [await _pack(item) for item in value]
+        return items if isinstance(value, list) else tuple(items)
+    return value
+
+
+def _unpack(value: Any) -> Any:
+    if isinstance(value, _PackedStrings):
+        return value.joined.split(SEPARATOR)
+    if isinstance(value, dict):
+        return {key: _unpack(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unpack(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_unpack(item) for item in value)
+    return value
+
+
+def _call_unpacked(func: Callable[..., Any], packed_args: tuple) -> Any:
+    return func(*_unpack(packed_args))
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None and settings.RESULT_POOL_WORKERS > 0:
+        # Forked children of a process with running threads can deadlock; forkserver starts them clean.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.RESULT_POOL_WORKERS,
+            mp_context=multiprocessing.get_context(method),
+            # Lower priority, so on a busy host the CPU goes to serving requests first.
+            initializer=os.nice,
+            initargs=(settings.RESULT_POOL_NICE,),
+        )
+    return _pool
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args: Any, size: int, threshold: Optional[int] = None) -> Any:
+    """
+    Run `func(*args)` in the result process pool when `size` reaches the
+    threshold (RESULT_OFFLOAD_MIN_ITEMS by default), inline otherwise.
+    `func` and its arguments must be picklable.
+    """
+    threshold = settings.RESULT_OFFLOAD_MIN_ITEMS if threshold is None else threshold
+    pool = get_pool() if size >= threshold else None
+    if pool is None:
+        return func(*args)
+    try:
+        packed_args = await _pack(args)
+        return await asyncio.get_running_loop().run_in_executor(pool, partial(_call_unpacked, func, packed_args))
+    except BrokenProcessPool:
+        logger.exception(f"Result process pool broke while running {func.__name__}, running it inline")
+        shutdown_pool()
+        return func(*args)
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
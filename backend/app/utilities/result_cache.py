@@ -0,0 +1,145 @@
+"""
+Response cache of finished scans.
+
+A finished scan's payloads only change when its row does, so the serialised
+bytes are cached under (kind, scan_id) together with the row's `updated_date`
+(its version); an entry whose version no longer matches the row is a miss.
+Entries live in a per-process LRU bounded by size and, when
+RESULT_CACHE_REDIS_URL is set, in Redis so every API process shares them.
+"""
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+from app.config import settings
+from app.utilities.logger import logger
+
+# Every cached representation of a scan; invalidate() drops them all, so put() accepts no other.
+SCAN_KIND = "scan"
+RESULTS_KIND = "results"
+RESULTS_GZIP_KIND = "results.gzip"
+KINDS = (SCAN_KIND, RESULTS_KIND, RESULTS_GZIP_KIND)
+
+Key = Tuple[str, str]
+
+
+def scan_version(updated_date: Optional[datetime]) -> str:
+    return updated_date.isoformat() if updated_date else ""
+
+
+def make_etag(kind: str, scan_id: str, version: str) -> str:
+    """
+    Strong ETag of a cached payload; the same version always serialises to the same bytes.
+    """
+    return '"' + hashlib.sha256(f"{kind}:{scan_id}:{version}".encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int, redis_url: str = "", ttl_seconds: int = 86400):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Key, Tuple[str, bytes]]" = OrderedDict()
+        self._size = 0
+        self._redis_url = redis_url
+        self._redis = None
+        self.hits = 0
+        self.misses = 0
+
+    def _shared(self):
+        if not self._redis_url:
+            return None
+        if self._redis is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                logger.warning("RESULT_CACHE_REDIS_URL is set but the redis package is not installed")
+                self._redis_url = ""
+                return None
+            self._redis = redis.from_url(self._redis_url)
+        return self._redis
+
+    @staticmethod
+    def _shared_key(kind: str, scan_id: str) -> str:
+        return f"scan-result:{kind}:{scan_id}"
+
+    async def get(self, kind: str, scan_id: str, version: str) -> Optional[bytes]:
+        key = (kind, scan_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        shared = self._shared()
+        if shared is not None:
+            try:
+                stored = await shared.get(self._shared_key(kind, scan_id))
+            except Exception:
+                logger.exception("Shared result cache read failed")
+                stored = None
+            if stored:
+                stored_version, _, body = stored.partition(b"\n")
+                if stored_version.decode() == version:
+                    self._store(key, version, body)
+                    self.hits += 1
+                    return body
+        self.misses += 1
+        return None
+
+    async def put(self, kind: str, scan_id: str, version: str, body: bytes) -> None:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown result cache kind {kind!r}, add it to KINDS so it is invalidated")
+        self._store((kind, scan_id), version, body)
+        shared = self._shared()
+        if shared is not None:
+            try:
+                await shared.set(self._shared_key(kind, scan_id), version.encode() + b"\n" + body, ex=self.ttl_seconds)
+            except Exception:
+                logger.exception("Shared result cache write failed")
+
+    async def invalidate(self, scan_id: str) -> None:
+        for kind in KINDS:
+            self._drop((kind, scan_id))
+        shared = self._shared()
+        if shared is not None:
+            try:
+                await shared.delete(*(self._shared_key(kind, scan_id) for kind in KINDS))
+            except Exception:
+                logger.exception("Shared result cache invalidation failed")
+
+    def _store(self, key: Key, version: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (version, body)
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _drop(self, key: Key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def bytes_used(self) -> int:
+        return self._size
+
+
+result_cache = ResultCache(
+    settings.RESULT_CACHE_MAX_BYTES, settings.RESULT_CACHE_REDIS_URL, settings.RESULT_CACHE_TTL_SECONDS
+)
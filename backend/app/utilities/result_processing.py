@@ -0,0 +1,78 @@
+"""
+CPU-heavy processing of scan results: merging the tools' findings into totals
+and canonicalising, serialising and compressing result documents.
+
+These are plain module-level functions over plain data so they can run in the
+result process pool (see app.utilities.offload) as well as inline.
+"""
+import gzip
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.utilities.encoding import dumps
+from tools.findings import KINDS, NORMALIZERS
+
+RESULT_TOOLS = ("theHarvester", "amass", "subfinder")
+
+
+def findings_size(*results: Optional[Dict[str, Any]]) -> int:
+    """
+    Number of findings in tool results or findings groups, the measure the
+    offload threshold is expressed in.
+    """
+    return sum(
+        len(value)
+        for result in results if isinstance(result, dict)
+        for value in result.values() if isinstance(value, list)
+    )
+
+
+def aggregate_totals(tool_results: Iterable[Optional[Dict[str, Any]]]) -> Dict[str, int]:
+    """
+    Totals of the deduplicated union of all tools' findings, built in one pass.
+    A subdomain found by several tools is counted once.
+    """
+    union = {kind: set() for kind in KINDS}
+    for tool in tool_results:
+        if not tool or not isinstance(tool, dict):
+            continue
+        for kind in KINDS:
+            normalize = NORMALIZERS[kind]
+            union[kind].update(normalize(value) for value in tool.get(kind) or [] if isinstance(value, str))
+
+    return {f"total_{kind}": len(values - {""}) for kind, values in union.items()}
+
+
+def canonical_tool_results(results: Optional[dict]) -> Optional[dict]:
+    if not results:
+        return results
+    return {
+        key: sorted(set(value)) if key in KINDS and isinstance(value, list) else value
+        for key, value in results.items()
+    }
+
+
+def canonical_results_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """A /results document with every findings list deduplicated and sorted."""
+    return {
+        key: canonical_tool_results(value) if key in RESULT_TOOLS else value
+        for key, value in document.items()
+    }
+
+
+def compress_result_document(body: bytes) -> bytes:
+    """
+    A document is written once per scan, so the slower, denser compression level is worth it.
+    mtime=0 keeps the bytes, and with them the ETag, stable.
+    """
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def encode_results_document(document: Dict[str, Any]) -> bytes:
+    return dumps(canonical_results_document(document))
+
+
+def render_results_document(document: Dict[str, Any]) -> Tuple[bytes, int]:
+    """Compressed canonical body of a /results document and its uncompressed size."""
+    body = encode_results_document(document)
+    return compress_result_document(body), len(body)
+
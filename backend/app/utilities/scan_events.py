@@ -0,0 +1,144 @@
+"""
+Scan progress events.
+
+Workers append events to the `scan_events` table; on Postgres every insert is
+followed by a NOTIFY on the `scan_events` channel. API processes keep one
+LISTEN connection and wake up the SSE streams of the notified scan, which then
+read only the events after their cursor. Without Postgres (or if the LISTEN
+connection is lost) streams fall back to polling the table.
+
+A stream's cursor is the last seq it delivered of each of its scans; the SSE
+event id carries these seqs, dash-separated in the stream's scan order.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.crud import scan_event as crud_scan_event
+from app.db.session import AsyncSessionLocal
+from app.utilities.logger import logger
+
+TERMINAL_STATUSES = {"finished", "error", "cancelled"}
+LISTEN_RETRY_SECONDS = 30
+
+
+async def publish_scan_events(events: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+    """
+    Stores events in their own short session. Progress events are best effort:
+    a failure is logged and never interrupts the scan.
+    """
+    events = list(events)
+    if not events:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await crud_scan_event.add_scan_events(db, events)
+    except Exception:
+        logger.exception(f"Failed to publish {len(events)} scan events")
+    broker.notify(event[0] for event in events)
+
+
+async def publish_scan_event(scan_id: str, event: str, data: Dict[str, Any]) -> None:
+    await publish_scan_events([(scan_id, event, data)])
+
+
+def encode_event_cursor(scan_ids: List[str], cursors: Dict[str, int]) -> str:
+    return "-".join(str(cursors.get(scan_id, 0)) for scan_id in scan_ids)
+
+
+def decode_event_cursor(scan_ids: List[str], value: Optional[str]) -> Dict[str, int]:
+    """
+    Per-scan cursors from a Last-Event-ID; anything unreadable starts from the beginning.
+    """
+    parts = (value or "").split("-")
+    if len(parts) > len(scan_ids) or not all(part.isdigit() for part in parts):
+        parts = []
+    return {scan_id: int(parts[i]) if i < len(parts) else 0 for i, scan_id in enumerate(scan_ids)}
+
+
+def format_sse(event_id: Optional[str], event: str, data: Dict[str, Any]) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class ScanEventBroker:
+    """
+    Wakes up local SSE streams when events for their scans arrive.
+    """
+
+    def __init__(self):
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+        self._connection = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._retry_at = 0.0
+
+    @property
+    def listening(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    def subscribe(self, scan_ids: List[str]) -> asyncio.Event:
+        waiter = asyncio.Event()
+        for scan_id in scan_ids:
+            self._waiters.setdefault(scan_id, set()).add(waiter)
+        return waiter
+
+    def unsubscribe(self, scan_ids: List[str], waiter: asyncio.Event) -> None:
+        for scan_id in scan_ids:
+            waiters = self._waiters.get(scan_id)
+            if waiters is None:
+                continue
+            waiters.discard(waiter)
+            if not waiters:
+                del self._waiters[scan_id]
+
+    def notify(self, scan_ids: Iterable[str]) -> None:
+        for scan_id in set(scan_ids):
+            for waiter in self._waiters.get(scan_id, ()):
+                waiter.set()
+
+    def _on_notification(self, connection, pid, channel, payload):
+        self.notify([payload])
+
+    async def ensure_listening(self) -> bool:
+        """
+        Opens the shared LISTEN connection on first use (Postgres only).
+        """
+        if self.listening or settings.DB_TYPE == "mysql":
+            return self.listening
+        loop = asyncio.get_running_loop()
+        if loop.time() < self._retry_at:
+            return False
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.listening or loop.time() < self._retry_at:
+                return self.listening
+            try:
+                import asyncpg
+                self._connection = await asyncpg.connect(
+                    user=settings.DB_USER,
+                    password=settings.DB_PASS,
+                    host=settings.DB_HOST,
+                    port=settings.DB_PORT,
+                    database=settings.DB_NAME,
+                )
+                await self._connection.add_listener(crud_scan_event.SCAN_EVENTS_CHANNEL, self._on_notification)
+                logger.info("Listening for scan events")
+            except Exception as e:
+                logger.warning(f"Scan event LISTEN unavailable, SSE streams will poll: {e}")
+                self._connection = None
+                self._retry_at = loop.time() + LISTEN_RETRY_SECONDS
+        return self.listening
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+broker = ScanEventBroker()
@@ -0,0 +1,97 @@
+"""
+Write-behind persistence of a running scan's row.
+
+Tool tasks and the scan orchestrator hand their column updates to one
+ScanPersister per scan instead of sharing an AsyncSession. Updates that arrive
+within `delay` seconds of each other are merged into a single UPDATE, which
+runs in its own short-lived session.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.crud import scan as crud_scan
+from app.db.session import AsyncSessionLocal
+from app.utilities.logger import logger
+
+
+class ScanPersister:
+    def __init__(self, scan_id: str, delay: float = None, session_factory=None):
+        self.scan_id = scan_id
+        self.delay = settings.SCAN_PERSIST_DELAY_SECONDS if delay is None else delay
+        self._session_factory = session_factory or AsyncSessionLocal
+        self._pending: Dict[str, Any] = {}
+        self._status: Optional[Dict[str, Any]] = None
+        self._started_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self.flushes = 0
+
+    def update(self, updated_by: Optional[str] = None, **values) -> None:
+        """
+        Queue column values; later values for the same column win.
+        """
+        self._pending.update(values)
+        self._pending["updated_by"] = updated_by
+        self._schedule()
+
+    def set_status(self, status: str, error_message: Optional[str] = None, updated_by: Optional[str] = None) -> None:
+        """
+        Queue a status change. Its timestamps are computed when the UPDATE runs.
+        """
+        now = datetime.now()
+        if status == "running" and self._started_at is None:
+            self._started_at = now
+        self._status = {"status": status, "error_message": error_message, "now": now}
+        self._pending["updated_by"] = updated_by
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.delay)
+        # Updates queued from here on need a new timer.
+        self._timer = None
+        # Shielded so close() cannot cancel an UPDATE that is already in flight.
+        await asyncio.shield(self._safe_flush())
+
+    async def _safe_flush(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception(f"Failed to persist updates of scan {self.scan_id}")
+
+    async def flush(self, returning: bool = False):
+        """
+        Write everything queued so far in one UPDATE.
+        """
+        async with self._lock:
+            if not self._pending and not self._status:
+                return None
+            values, status = self._pending, self._status
+            self._pending, self._status = {}, None
+            async with self._session_factory() as db:
+                if status:
+                    values.update(crud_scan.scan_status_values(
+                        db.bind.dialect.name,
+                        status["status"],
+                        status["now"],
+                        status["error_message"],
+                        started_at=self._started_at,
+                    ))
+                values["updated_date"] = datetime.now()
+                scan = await crud_scan.update_scan_fields(db, self.scan_id, values, returning=returning)
+            self.flushes += 1
+            return scan
+
+    async def close(self, returning: bool = False):
+        """
+        Cancel the pending timer and write whatever is still queued.
+        """
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+        return await self.flush(returning=returning)
@@ -0,0 +1,151 @@
+"""
+Scan worker entry point.
+
+Claims jobs from the durable `scan_jobs` queue and runs the scan tools for
+them. Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so the worker
+can run as any number of processes on any number of nodes:
+
+    python -m app.worker --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import uuid
+from typing import Any, Dict
+
+from app.config import settings
+from app.crud import scan_job as crud_scan_job
+from app.crud import scan_event as crud_scan_event
+from app.crud import scan_stats as crud_scan_stats
+from app.crud import tool_result_cache as crud_tool_cache
+from app.db.session import AsyncSessionLocal, init_db
+from app.routers.domain.domain import run_scan_task, security_tools, tool_scheduler
+from app.utilities.offload import shutdown_pool
+from app.utilities.logger import logger
+
+
+class ScanWorker:
+    def __init__(self, concurrency: int, poll_interval: float, shutdown_grace_seconds: int = 30):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.shutdown_grace_seconds = shutdown_grace_seconds
+        self.active: Dict[int, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+        self._slot_freed = asyncio.Event()
+
+    def stop(self):
+        logger.info(f"Worker {self.worker_id} stopping, no new jobs will be claimed")
+        self._stopping.set()
+
+    async def _wait(self, event: asyncio.Event, timeout: float):
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        logger.info(f"Worker {self.worker_id} started with concurrency={self.concurrency}")
+        heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        try:
+            while not self._stopping.is_set():
+                if len(self.active) >= self.concurrency:
+                    self._slot_freed.clear()
+                    await self._wait(self._slot_freed, self.poll_interval)
+                    continue
+
+                try:
+                    async with AsyncSessionLocal() as db:
+                        job = await crud_scan_job.claim_next_scan_job(db, self.worker_id)
+                except Exception:
+                    logger.exception("Failed to claim scan job")
+                    job = None
+
+                if job is None:
+                    await self._wait(self._stopping, self.poll_interval)
+                    continue
+
+                logger.info(f"Worker {self.worker_id} claimed job {job.id} for scan {job.scan_id} (attempt {job.attempts})")
+                self.active[job.id] = asyncio.create_task(self._run_job(job.id, job.scan_id, job.priority, job.attempts))
+        finally:
+            await self._drain()
+            # Cancelled scans stop their tools; anything still running in the tools container goes now.
+            await security_tools.terminate_all()
+            shutdown_pool()
+            heartbeat_task.cancel()
+            async with AsyncSessionLocal() as db:
+                await crud_scan_job.delete_worker_heartbeat(db, self.worker_id)
+
+    async def _run_job(self, job_id: int, scan_id: str, priority: int, attempt: int):
+        try:
+            await run_scan_task(scan_id, priority=priority, attempt=attempt)
+            async with AsyncSessionLocal() as db:
+                await crud_scan_job.complete_scan_job(db, job_id)
+        except asyncio.CancelledError:
+            async with AsyncSessionLocal() as db:
+                await crud_scan_job.release_scan_job(db, job_id)
+            raise
+        except Exception as e:
+            logger.exception(f"Job {job_id} for scan {scan_id} failed")
+            async with AsyncSessionLocal() as db:
+                await crud_scan_job.fail_scan_job(db, job_id, str(e))
+        finally:
+            self.active.pop(job_id, None)
+            self._slot_freed.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tools": tool_scheduler.snapshot(),
+            "batches": security_tools.batch_snapshot(),
+            "partial_results": security_tools.partial_results.memory_usage(),
+            "result_cache": crud_tool_cache.cache_metrics.snapshot(),
+        }
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await crud_scan_job.upsert_worker_heartbeat(
+                        db, self.worker_id, socket.gethostname(), os.getpid(),
+                        self.concurrency, len(self.active), self.stats(),
+                    )
+                    await crud_scan_job.heartbeat_scan_jobs(db, list(self.active), self.worker_id)
+                    await crud_scan_job.requeue_stale_scan_jobs(db, settings.SCAN_JOB_STALE_SECONDS)
+                    await crud_tool_cache.purge_expired_tool_results(db)
+                    await crud_scan_event.purge_scan_events(db, settings.SCAN_EVENTS_RETENTION_SECONDS)
+                    await crud_scan_stats.purge_hour_buckets(db)
+            except Exception:
+                logger.exception("Scan job heartbeat failed")
+            await asyncio.sleep(settings.SCAN_JOB_HEARTBEAT_SECONDS)
+
+    async def _drain(self):
+        """
+        Give running jobs a grace period, then cancel them so they go back on the queue.
+        """
+        if not self.active:
+            return
+        logger.info(f"Waiting up to {self.shutdown_grace_seconds}s for {len(self.active)} running jobs")
+        _, pending = await asyncio.wait(list(self.active.values()), timeout=self.shutdown_grace_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def main(concurrency: int, poll_interval: float):
+    await init_db()
+    worker = ScanWorker(concurrency, poll_interval)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a scan queue worker")
+    parser.add_argument("--concurrency", type=int, default=settings.SCAN_WORKER_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=settings.SCAN_WORKER_POLL_INTERVAL)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.poll_interval))
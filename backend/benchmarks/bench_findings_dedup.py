@@ -0,0 +1,74 @@
+"""
+Compare the old list-membership dedup used by the amass/subfinder readers
+with FindingsAccumulator at 10k, 100k and 1M streamed lines.
+
+Lines are generated with ~10% duplicates, like real tool output. The list
+approach is quadratic, so above --legacy-max lines its time is extrapolated
+from the largest measured size instead of being run.
+
+    python -m benchmarks.bench_findings_dedup
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from tools.findings import FindingsAccumulator
+
+
+def make_lines(n: int) -> List[str]:
+    rng = random.Random(n)
+    unique = int(n * 0.9)
+    lines = [f"host{i}.example.com" for i in range(unique)]
+    lines += [lines[rng.randrange(unique)] for _ in range(n - unique)]
+    rng.shuffle(lines)
+    return lines
+
+
+def legacy_dedup(lines: List[str]) -> List[str]:
+    found = []
+    for line in lines:
+        decoded = line.strip()
+        if decoded and decoded not in found:
+            found.append(decoded)
+    return found
+
+
+def accumulator_dedup(lines: List[str]) -> List[str]:
+    findings = FindingsAccumulator()
+    for line in lines:
+        findings.add("subdomains", line)
+    return findings.to_dict()["subdomains"]
+
+
+def timed(func, lines: List[str]) -> float:
+    start = time.perf_counter()
+    func(lines)
+    return time.perf_counter() - start
+
+
+def main(sizes: List[int], legacy_max: int):
+    print(f"{'lines':>10} {'list (s)':>14} {'accumulator (s)':>16} {'speedup':>10}")
+    measured = None
+    for n in sizes:
+        lines = make_lines(n)
+        new = timed(accumulator_dedup, lines)
+        if n <= legacy_max:
+            old = timed(legacy_dedup, lines)
+            measured = (n, old)
+            label = f"{old:14.3f}"
+        else:
+            base_n, base_t = measured
+            old = base_t * (n / base_n) ** 2
+            label = f"{old:13.1f}*"
+        print(f"{n:>10} {label} {new:16.3f} {old / new:9.0f}x")
+    if any(n > legacy_max for n in sizes):
+        print("* extrapolated quadratically from the largest measured size")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.sizes, args.legacy_max)
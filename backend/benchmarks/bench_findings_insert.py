@@ -0,0 +1,90 @@
+"""
+Insert throughput of incremental findings persistence.
+
+Streams N findings into the database in flushes of --batch-size and compares:
+
+  append   one batched INSERT into `findings` per flush (what the tool runners do)
+  rewrite  rewriting the tool's whole JSON column on `scans` per flush
+
+The rewrite cost grows with everything found so far, so it is quadratic in N.
+Runs against the configured database, or an in-memory SQLite one with --sqlite:
+
+    python -m benchmarks.bench_findings_insert --findings 100000 --batch-size 500
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.crud import finding as crud_finding
+from app.db.base import Base
+from app.db.models import user, scan, finding  # noqa: F401  (register tables)
+from app.db.models.finding import Finding
+from app.db.models.scan import Scan
+
+
+async def bench_append(session_factory, scan_id: str, total: int, batch_size: int) -> float:
+    start = time.perf_counter()
+    for offset in range(0, total, batch_size):
+        now = datetime.now()
+        rows = [
+            {"scan_id": scan_id, "tool": "amass", "kind": "subdomains", "value": f"host{i}.example.com", "first_seen_at": now}
+            for i in range(offset, min(offset + batch_size, total))
+        ]
+        async with session_factory() as db:
+            await crud_finding.add_findings(db, rows)
+    return time.perf_counter() - start
+
+
+async def bench_rewrite(session_factory, scan_id: str, total: int, batch_size: int) -> float:
+    found = []
+    start = time.perf_counter()
+    for offset in range(0, total, batch_size):
+        found.extend(f"host{i}.example.com" for i in range(offset, min(offset + batch_size, total)))
+        async with session_factory() as db:
+            await db.execute(update(Scan).where(Scan.id == scan_id).values(amass={"subdomains": found}))
+            await db.commit()
+    return time.perf_counter() - start
+
+
+async def main(database_url: str, total: int, batch_size: int, rewrite_max: int):
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    scan_id = str(uuid.uuid4())
+    async with session_factory() as db:
+        db.add(Scan(id=scan_id, domain="bench.example.com", status="running"))
+        await db.commit()
+
+    try:
+        append = await bench_append(session_factory, scan_id, total, batch_size)
+        print(f"append : {total} findings in {append:.2f}s ({total / append:,.0f} rows/s)")
+        if total <= rewrite_max:
+            rewrite = await bench_rewrite(session_factory, scan_id, total, batch_size)
+            print(f"rewrite: {total} findings in {rewrite:.2f}s ({total / rewrite:,.0f} rows/s, {rewrite / append:.1f}x slower)")
+        else:
+            print(f"rewrite: skipped above --rewrite-max={rewrite_max}")
+    finally:
+        async with session_factory() as db:
+            await db.execute(delete(Finding).where(Finding.scan_id == scan_id))
+            await db.execute(delete(Scan).where(Scan.id == scan_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--findings", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=settings.FINDINGS_FLUSH_BATCH_SIZE)
+    parser.add_argument("--rewrite-max", type=int, default=200_000)
+    parser.add_argument("--sqlite", action="store_true", help="use an in-memory SQLite database")
+    args = parser.parse_args()
+    url = "sqlite+aiosqlite://" if args.sqlite else settings.DATABASE_URL
+    asyncio.run(main(url, args.findings, args.batch_size, args.rewrite_max))
@@ -0,0 +1,113 @@
+"""
+Ingest and read cost of one scan's findings at 1M rows:
+
+  table  bulk ingest into `findings` (COPY on Postgres, executemany elsewhere)
+         in flushes of --batch-size, then the single-query /results read
+  blob   the previous layout: the whole list written into the tool's JSON
+         column on `scans`, then the row read back
+
+Runs against the configured database, or an in-memory SQLite one with --sqlite:
+
+    python -m benchmarks.bench_findings_table --findings 1000000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.crud import finding as crud_finding
+from app.crud import scan as crud_scan
+from app.db.base import Base
+from app.db.models import user, scan, finding  # noqa: F401  (register tables)
+from app.db.models.finding import Finding
+from app.db.models.scan import Scan
+
+KINDS = ("subdomains", "subdomains", "subdomains", "hosts", "ips", "emails")
+
+
+def make_value(i: int) -> tuple:
+    kind = KINDS[i % len(KINDS)]
+    if kind == "ips":
+        return kind, f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+    if kind == "emails":
+        return kind, f"user{i}@example.com"
+    return kind, f"host{i}.example.com"
+
+
+async def bench_table(session_factory, scan_id: str, total: int, batch_size: int):
+    start = time.perf_counter()
+    for offset in range(0, total, batch_size):
+        now = datetime.now()
+        rows = []
+        for i in range(offset, min(offset + batch_size, total)):
+            kind, value = make_value(i)
+            rows.append({"scan_id": scan_id, "tool": "amass", "kind": kind, "value": value, "first_seen_at": now})
+        async with session_factory() as db:
+            await crud_finding.add_findings(db, rows)
+    ingest = time.perf_counter() - start
+
+    start = time.perf_counter()
+    async with session_factory() as db:
+        _, found = await crud_finding.get_scan_with_findings(db, scan_id)
+    read = time.perf_counter() - start
+    assert sum(len(values) for values in found["amass"].values()) == total
+    return ingest, read
+
+
+async def bench_blob(session_factory, scan_id: str, total: int):
+    blob = {}
+    for i in range(total):
+        kind, value = make_value(i)
+        blob.setdefault(kind, []).append(value)
+
+    start = time.perf_counter()
+    async with session_factory() as db:
+        await db.execute(update(Scan).where(Scan.id == scan_id).values(amass=blob))
+        await db.commit()
+    ingest = time.perf_counter() - start
+
+    start = time.perf_counter()
+    async with session_factory() as db:
+        await crud_scan.get_scan_by_id(db, scan_id)
+    read = time.perf_counter() - start
+    return ingest, read
+
+
+async def main(database_url: str, total: int, batch_size: int):
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    table_scan, blob_scan = str(uuid.uuid4()), str(uuid.uuid4())
+    async with session_factory() as db:
+        db.add_all([Scan(id=scan_id, domain="bench.example.com", status="finished") for scan_id in (table_scan, blob_scan)])
+        await db.commit()
+
+    try:
+        print(f"{total:,} findings, {engine.dialect.name}")
+        ingest, read = await bench_table(session_factory, table_scan, total, batch_size)
+        print(f"table: ingest {ingest:7.2f}s ({total / ingest:>10,.0f} rows/s)  read {read:6.2f}s")
+        ingest, read = await bench_blob(session_factory, blob_scan, total)
+        print(f"blob : ingest {ingest:7.2f}s ({total / ingest:>10,.0f} rows/s)  read {read:6.2f}s")
+    finally:
+        async with session_factory() as db:
+            await db.execute(delete(Finding).where(Finding.scan_id == table_scan))
+            await db.execute(delete(Scan).where(Scan.id.in_([table_scan, blob_scan])))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--findings", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--sqlite", action="store_true", help="use an in-memory SQLite database")
+    args = parser.parse_args()
+    url = "sqlite+aiosqlite://" if args.sqlite else settings.DATABASE_URL
+    asyncio.run(main(url, args.findings, args.batch_size))
@@ -0,0 +1,127 @@
+"""
+Latency of an unrelated endpoint while a huge scan finalises.
+
+A probe requests GET /health every --interval seconds (in-process, through the
+ASGI app, latency counted from when each request was due) while the
+finalisation work of a scan with --hosts findings per tool runs on the same
+event loop: merging the tool results into totals and building
+the canonical, compressed /results document. It is run three ways:
+
+    idle     no finalisation, the probe alone
+    inline   the processing runs on the event loop (below the offload threshold)
+    pool     the processing runs in the result process pool
+
+    python -m benchmarks.bench_result_offload --hosts 300000
+"""
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+from app.main import app
+from app.utilities.offload import get_pool, run_cpu_bound, shutdown_pool
+from app.utilities.result_processing import aggregate_totals, findings_size, render_results_document
+
+
+def make_tool_results(hosts: int) -> Dict[str, dict]:
+    rng = random.Random(hosts)
+    names = [f"host{i}.corp{i % 97}.example.com" for i in range(hosts)]
+    return {
+        "amass": {"subdomains": rng.sample(names, int(hosts * 0.8))},
+        "subfinder": {"subdomains": rng.sample(names, int(hosts * 0.7))},
+        "theHarvester": {
+            "hosts": rng.sample(names, int(hosts * 0.5)),
+            "emails": [f"user{i}@example.com" for i in range(hosts // 10)],
+            "ips": [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(hosts // 5)],
+        },
+    }
+
+
+async def finalise(tools: Dict[str, dict], threshold: int):
+    size = findings_size(*tools.values())
+    await run_cpu_bound(aggregate_totals, list(tools.values()), size=size, threshold=threshold)
+    document = {"scan_id": "bench", "status": "finished", "domain": "example.com", **tools}
+    await run_cpu_bound(render_results_document, document, size=size, threshold=threshold)
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> List[float]:
+    """
+    Latency of each request counted from when it was due, not from when it was
+    sent, so requests a blocked event loop could not even send are not lost.
+    """
+    samples = []
+    loop = asyncio.get_running_loop()
+    due = loop.time()
+    while not stop.is_set():
+        response = await client.get("/health")
+        response.raise_for_status()
+        samples.append(loop.time() - due)
+        due += interval
+        while due < loop.time() and not stop.is_set():
+            # Requests that fell due while the loop was busy, answered no earlier than now.
+            samples.append(loop.time() - due)
+            due += interval
+        await asyncio.sleep(max(0.0, due - loop.time()))
+    return samples
+
+
+async def run_case(mode: str, tools: Dict[str, dict], interval: float, idle_seconds: float) -> List[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop, interval))
+        # Let the probe settle before and keep running briefly after, so a blocked loop shows up in its samples.
+        await asyncio.sleep(0.2)
+        if mode == "idle":
+            await asyncio.sleep(idle_seconds)
+        else:
+            threshold = 0 if mode == "pool" else findings_size(*tools.values()) + 1
+            await finalise(tools, threshold)
+        await asyncio.sleep(0.2)
+        stop.set()
+        return await probe_task
+
+
+def percentile(samples: List[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+async def main(hosts: int, interval: float):
+    tools = make_tool_results(hosts)
+    # The synthetic results stay alive for the whole run; keep the collector from rescanning them.
+    gc.freeze()
+    # Start the pool's processes up front; their startup is not part of finalising.
+    await asyncio.gather(*(
+        asyncio.get_running_loop().run_in_executor(get_pool(), sum, [1])
+        for _ in range(4)
+    ))
+
+    start = time.perf_counter()
+    await finalise(tools, threshold=0)
+    duration = time.perf_counter() - start
+    print(f"{findings_size(*tools.values())} findings, finalisation takes ~{duration:.2f}s in the pool\n")
+
+    print(f"{'mode':<8} {'requests':>9} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10} {'wall (s)':>9}")
+    for mode in ("idle", "inline", "pool"):
+        start = time.perf_counter()
+        samples = await run_case(mode, tools, interval, idle_seconds=duration)
+        wall = time.perf_counter() - start
+        print(
+            f"{mode:<8} {len(samples):>9} {statistics.median(samples) * 1000:>10.1f} "
+            f"{percentile(samples, 0.99) * 1000:>10.1f} {max(samples) * 1000:>10.1f} {wall:>9.2f}"
+        )
+    shutdown_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=300_000)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between probe requests")
+    args = parser.parse_args()
+    asyncio.run(main(args.hosts, args.interval))
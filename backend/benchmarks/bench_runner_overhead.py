@@ -0,0 +1,92 @@
+"""
+Compare the fixed per-job overhead of the two tool execution paths:
+`docker exec security-tools ...` versus a job sent to the runner agent.
+
+Both paths run trivial commands so the numbers are pure spawn/transport cost.
+The `python` case shows the effect of the runner's warm interpreter pool.
+
+Run from the api container (it needs the docker socket and the shared volume):
+
+    python -m benchmarks.bench_runner_overhead --jobs 50
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from app.config import settings
+from tools.runner_client import RunnerClient
+
+CASES: Dict[str, List[str]] = {
+    "true": ["true"],
+    "echo": ["echo", "hello"],
+}
+
+
+async def run_docker_exec(argv: List[str]) -> float:
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        "docker", "exec", settings.TOOLS_CONTAINER_NAME, *argv,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    await process.communicate()
+    return time.perf_counter() - start
+
+
+async def run_agent(client: RunnerClient, argv: List[str]) -> float:
+    start = time.perf_counter()
+    process = await client.spawn(argv)
+    await process.communicate()
+    return time.perf_counter() - start
+
+
+def report(name: str, samples: List[float]):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(
+        f"{name:<28} n={len(samples):<4} mean={statistics.mean(samples) * 1000:8.1f}ms "
+        f"p50={statistics.median(samples) * 1000:8.1f}ms p95={p95 * 1000:8.1f}ms"
+    )
+
+
+async def main(jobs: int, concurrency: int, python_script: str):
+    client = RunnerClient(settings.TOOLS_RUNNER_SOCKET, pool_size=concurrency)
+    cases = dict(CASES)
+    cases["python"] = ["python3", python_script]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(coro_factory):
+        async with semaphore:
+            return await coro_factory()
+
+    for name, argv in cases.items():
+        docker = await asyncio.gather(*[timed(lambda: run_docker_exec(argv)) for _ in range(jobs)])
+        report(f"docker exec / {name}", docker)
+        if client.available():
+            # The agent's warm pool refills in the background, so pace the
+            # python case the way real scans arrive rather than all at once.
+            agent = await asyncio.gather(*[timed(lambda: run_agent(client, argv)) for _ in range(jobs)])
+            report(f"runner agent / {name}", agent)
+        else:
+            print(f"runner agent socket {settings.TOOLS_RUNNER_SOCKET} not found, skipping agent path")
+    await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--python-script",
+        default="/home/tools/shared/bench_noop.py",
+        help="Path (inside the tools container) of a no-op script for the interpreter case",
+    )
+    args = parser.parse_args()
+
+    # The no-op script lives on the shared volume so both containers can see it.
+    with open(f"{settings.TOOLS_SHARED_DIR}/bench_noop.py", "w") as f:
+        f.write("pass\n")
+    asyncio.run(main(args.jobs, args.concurrency, args.python_script))
@@ -1,7 +1,9 @@
 import asyncio
+from contextlib import asynccontextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -58,4 +60,26 @@ def client(override_get_db):
     """Create test client"""
     app.dependency_overrides[get_db] = override_get_db
     yield TestClient(app)
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+def sqlite_db():
+    """
+    Fresh in-memory SQLite database with every table created, for tests that run
+    their own event loop with asyncio.run():
+
+        async with sqlite_db() as session_factory:
+            ...
+
+    The engine is `session_factory.kw["bind"]` and is disposed when the block exits.
+    """
+    @asynccontextmanager
+    async def open_db():
+        test_engine = create_async_engine("sqlite+aiosqlite://")
+        async with test_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            yield async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        finally:
+            await test_engine.dispose()
+    return open_db
@@ -0,0 +1,44 @@
+import asyncio
+from datetime import datetime
+
+from app.crud import asset as crud_asset
+from app.db.models.finding import Finding
+from app.db.models.scan import Scan
+
+
+def test_scan_assets_are_merged_into_the_inventory(sqlite_db):
+    """Test first/last seen and seen_count across scans, idempotent re-upserts and keyset pages"""
+    async def run():
+        async with sqlite_db() as session_factory, session_factory() as db:
+            db.add_all([Scan(id=scan_id, domain="Example.com", status="finished") for scan_id in ("first", "second")])
+            rows = [
+                ("first", "amass", "a.example.com", datetime(2024, 1, 1)),
+                ("first", "subfinder", "a.example.com", datetime(2024, 1, 2)),
+                ("first", "amass", "b.example.com", datetime(2024, 1, 1)),
+                ("second", "amass", "a.example.com", datetime(2024, 2, 1)),
+                ("second", "amass", "c.example.com", datetime(2024, 2, 1)),
+            ]
+            db.add_all([Finding(scan_id=s, tool=t, kind="subdomains", value=v, first_seen_at=at) for s, t, v, at in rows])
+            await db.commit()
+            await crud_asset.upsert_scan_assets(db, "first", "Example.com")
+            await crud_asset.upsert_scan_assets(db, "second", "Example.com")
+            await crud_asset.upsert_scan_assets(db, "second", "Example.com")
+
+            pages, cursor = [], None
+            while True:
+                assets, cursor = await crud_asset.get_assets_page(db, "example.com", limit=2, cursor=cursor)
+                pages.append([(a.value, a.first_seen, a.last_seen, a.seen_count) for a in assets])
+                if not cursor:
+                    break
+            recent, _ = await crud_asset.get_assets_page(db, "example.com", seen_since=datetime(2024, 1, 15))
+        return pages, [asset.value for asset in recent]
+
+    pages, recent = asyncio.run(run())
+    assert pages == [
+        [
+            ("a.example.com", datetime(2024, 1, 1), datetime(2024, 2, 1), 2),
+            ("b.example.com", datetime(2024, 1, 1), datetime(2024, 1, 1), 1),
+        ],
+        [("c.example.com", datetime(2024, 2, 1), datetime(2024, 2, 1), 1)],
+    ]
+    assert recent == ["a.example.com", "c.example.com"]
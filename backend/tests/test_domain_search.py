@@ -0,0 +1,105 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.crud import scan as crud_scan
+from app.db.base import Base
+from app.db.models import user  # noqa: F401
+from app.db.models.scan import Scan
+
+DOMAINS = ["example.com", "corp.example.com", "vpn.corp.example.com", "corp-example.com", "other.org"]
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN" if compiler.dialect.name == "sqlite" else "EXPLAIN"
+    return f"{prefix} {compiler.process(element.stmt, **kw)}"
+
+
+async def _explain(conn, domain: str, match: str) -> str:
+    stmt = select(Scan.id).where(crud_scan.domain_filter(conn.dialect.name, domain, match))
+    result = await conn.execute(Explain(stmt))
+    return "\n".join(str(row[-1]) for row in result.all())
+
+
+def test_domain_match_modes(sqlite_db):
+    """Test exact, suffix and substring domain search"""
+    async def run():
+        async with sqlite_db() as session_factory, session_factory() as db:
+            db.add_all([Scan(domain=domain, status="finished") for domain in DOMAINS])
+            await db.commit()
+            found = {}
+            for domain, match in [("Corp.Example.com", "exact"), ("*.corp.example.com", "suffix"), ("corp", "substring")]:
+                scans = await crud_scan.get_scans(db, domain=domain, domain_match=match)
+                found[match] = sorted(scan.domain for scan in scans)
+        return found
+
+    found = asyncio.run(run())
+    assert found["exact"] == ["corp.example.com"]
+    assert found["suffix"] == ["corp.example.com", "vpn.corp.example.com"]
+    assert found["substring"] == ["corp-example.com", "corp.example.com", "vpn.corp.example.com"]
+
+
+def test_exact_and_suffix_search_use_index_on_sqlite(sqlite_db):
+    """Test that EXPLAIN QUERY PLAN shows the domain_reversed index for exact and suffix search"""
+    async def run():
+        async with sqlite_db() as session_factory, session_factory() as db:
+            conn = await db.connection()
+            return [
+                await _explain(conn, "corp.example.com", "exact"),
+                await _explain(conn, "*.corp.example.com", "suffix"),
+            ]
+
+    for plan in asyncio.run(run()):
+        assert "ix_scans_domain_reversed" in plan
+        assert "SCAN scans" not in plan
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="set TEST_POSTGRES_URL to run against PostgreSQL")
+def test_every_search_mode_uses_index_on_postgres():
+    """Test that EXPLAIN shows an index for every mode, including the trigram index for substring search"""
+    async def run():
+        schema = "test_domain_search"
+        admin = create_async_engine(POSTGRES_URL)
+        async with admin.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {schema}"))
+        engine = create_async_engine(POSTGRES_URL, connect_args={"server_settings": {"search_path": f"{schema},public"}})
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(Scan.__table__.insert(), [
+                    {"id": f"scan-{i}", "domain": f"host{i}.{DOMAINS[i % len(DOMAINS)]}", "status": "finished"}
+                    for i in range(2000)
+                ])
+                await conn.execute(text("ANALYZE scans"))
+                await conn.execute(text("SET LOCAL enable_seqscan = off"))
+                return {
+                    "exact": await _explain(conn, "corp.example.com", "exact"),
+                    "suffix": await _explain(conn, "*.corp.example.com", "suffix"),
+                    "substring": await _explain(conn, "corp", "substring"),
+                }
+        finally:
+            await engine.dispose()
+            async with admin.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+            await admin.dispose()
+
+    plans = asyncio.run(run())
+    assert "ix_scans_domain_reversed" in plans["exact"]
+    assert "ix_scans_domain_reversed" in plans["suffix"]
+    assert "ix_scans_domain_trgm" in plans["substring"]
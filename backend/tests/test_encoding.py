@@ -0,0 +1,31 @@
+import json
+from types import SimpleNamespace
+
+from app.routers.domain.domain import scan_results_document
+from app.utilities.encoding import accepts_encoding, dumps
+
+
+def test_accept_encoding_negotiation():
+    """Test q-values and wildcards of Accept-Encoding"""
+    assert accepts_encoding("gzip, deflate, br", "gzip")
+    assert accepts_encoding("br;q=1.0, *;q=0.5", "gzip")
+    assert not accepts_encoding("gzip;q=0, *", "gzip")
+    assert not accepts_encoding("identity", "gzip")
+    assert not accepts_encoding(None, "gzip")
+
+
+def test_results_document_is_canonical():
+    """Test that the stored result document has deduplicated, sorted findings and compact JSON"""
+    scan = SimpleNamespace(
+        id="s1", status="finished", domain="example.com", summary=None, error_message=None,
+        started_at=None, finished_at=None, duration_seconds=None,
+        theharvester={"emails": ["b@example.com", "a@example.com", "b@example.com"]},
+        amass={"tool": "amass"}, subfinder=None,
+    )
+    found = {"amass": {"subdomains": ["b.example.com", "a.example.com"]}}
+    document = scan_results_document(scan, found)
+    assert document["theHarvester"]["emails"] == ["a@example.com", "b@example.com"]
+    assert document["amass"]["subdomains"] == ["a.example.com", "b.example.com"]
+    assert document["amass"]["tool"] == "amass"
+    assert json.loads(dumps(document)) == document
+    assert dumps(document) == json.dumps(document, separators=(",", ":")).encode()
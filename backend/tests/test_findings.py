@@ -0,0 +1,41 @@
+from tools.findings import FindingsAccumulator
+
+def test_accumulator_dedupes_and_keeps_order():
+    """Test that findings keep first-seen order without duplicates"""
+    findings = FindingsAccumulator()
+    for value in ["b.example.com", "a.example.com", "b.example.com", "c.example.com"]:
+        findings.add("subdomains", value)
+
+    assert findings.to_dict()["subdomains"] == ["b.example.com", "a.example.com", "c.example.com"]
+    assert findings.count("subdomains") == 3
+
+def test_accumulator_normalises_hostnames():
+    """Test that hostnames are lowercased and lose their trailing dot"""
+    findings = FindingsAccumulator()
+    assert findings.add("subdomains", " WWW.Example.com. \n")
+    assert not findings.add("subdomains", "www.example.com")
+    assert not findings.add("subdomains", "")
+    assert findings.add("emails", "Admin@Example.com")
+    assert not findings.add("emails", "admin@example.com")
+
+    assert findings.to_dict()["subdomains"] == ["www.example.com"]
+    assert findings.to_dict()["emails"] == ["admin@example.com"]
+
+def test_snapshot_is_stable_while_streaming():
+    """Test that a snapshot does not change when more findings arrive"""
+    findings = FindingsAccumulator.from_dict({"subdomains": ["a.example.com"], "ips": ["1.1.1.1", "1.1.1.1"]})
+    snapshot = findings.snapshot()
+    findings.add("subdomains", "b.example.com")
+
+    assert snapshot["subdomains"] == ["a.example.com"]
+    assert snapshot["ips"] == ["1.1.1.1"]
+    assert findings.items_since("subdomains", snapshot.counts["subdomains"]) == ["b.example.com"]
+
+def test_snapshot_items_since_returns_only_new_findings():
+    """Test that a snapshot yields the findings after an offset, up to its own counts"""
+    findings = FindingsAccumulator.from_dict({"subdomains": ["a.example.com", "b.example.com"]})
+    snapshot = findings.snapshot()
+    findings.add("subdomains", "c.example.com")
+
+    assert snapshot.items_since("subdomains", 1) == ["b.example.com"]
+    assert findings.snapshot().items_since("subdomains", 2) == ["c.example.com"]
@@ -0,0 +1,36 @@
+import asyncio
+from datetime import datetime
+
+from app.crud import finding as crud_finding
+from app.db.models.finding import Finding
+from app.db.models.scan import Scan
+
+
+def test_stream_findings_filters_and_dedup(sqlite_db):
+    """Test that exports are filtered by domain and date and can be deduplicated"""
+    async def run():
+        async with sqlite_db() as session_factory, session_factory() as db:
+            db.add_all([
+                Scan(id="old", domain="example.com", status="finished", created_date=datetime(2024, 1, 1)),
+                Scan(id="new", domain="vpn.example.com", status="finished", created_date=datetime(2024, 3, 1)),
+                Scan(id="other", domain="example.org", status="finished", created_date=datetime(2024, 3, 1)),
+            ])
+            for scan_id, seen in (("old", datetime(2024, 1, 1)), ("new", datetime(2024, 3, 1)), ("other", datetime(2024, 3, 1))):
+                db.add(Finding(scan_id=scan_id, tool="amass", kind="subdomains", value="a.example.com", first_seen_at=seen))
+            db.add(Finding(scan_id="new", tool="subfinder", kind="ips", value="10.0.0.1", first_seen_at=datetime(2024, 3, 1)))
+            await db.commit()
+
+            rows = [row async for row in crud_finding.stream_findings(db, ["example.com"], "suffix", batch_size=1)]
+            recent = [
+                row async for row in crud_finding.stream_findings(
+                    db, ["example.com"], "suffix", since=datetime(2024, 2, 1), kinds=["ips"]
+                )
+            ]
+            unique = [row async for row in crud_finding.stream_findings(db, ["example.com"], "suffix", dedup=True)]
+        return rows, recent, unique
+
+    rows, recent, unique = asyncio.run(run())
+    assert [(row.scan_id, row.value) for row in rows] == [("old", "a.example.com"), ("new", "a.example.com"), ("new", "10.0.0.1")]
+    assert [(row.scan_id, row.kind) for row in recent] == [("new", "ips")]
+    assert [(row.kind, row.value, row.scans) for row in unique] == [("ips", "10.0.0.1", 1), ("subdomains", "a.example.com", 2)]
+    assert unique[1].first_seen_at == datetime(2024, 1, 1) and unique[1].last_seen_at == datetime(2024, 3, 1)
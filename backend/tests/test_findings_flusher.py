@@ -0,0 +1,146 @@
+import asyncio
+
+from app.crud import finding as crud_finding
+from app.db.models.scan import Scan
+from app.utilities import findings_flusher
+from app.utilities.findings_flusher import FindingsFlusher
+from tools.partial_results import PartialResultsStore
+
+
+async def _add_scan(session_factory):
+    async with session_factory() as db:
+        db.add(Scan(id="scan-1", domain="example.com", status="running"))
+        await db.commit()
+
+
+def test_flusher_appends_a_batch_as_soon_as_it_is_full(sqlite_db, monkeypatch):
+    """Test that a full batch is written before the interval and the rest on stop"""
+    events = []
+
+    async def publish(batch):
+        events.extend(batch)
+
+    monkeypatch.setattr(findings_flusher, "publish_scan_events", publish)
+    monkeypatch.setattr(findings_flusher.settings, "SCAN_EVENTS_MAX_FINDINGS", 2)
+
+    async def run():
+        async with sqlite_db() as session_factory:
+            await _add_scan(session_factory)
+            store = PartialResultsStore(max_bytes=10**6, ttl_seconds=60)
+            flusher = FindingsFlusher(store, "scan-1", "amass", batch_size=3, interval=60, session_factory=session_factory).start()
+            findings = store.open("scan-1", "amass")
+            for name in ["a", "b", "c", "c"]:
+                findings.add("subdomains", f"{name}.example.com")
+            await asyncio.sleep(0.1)
+            findings.add("subdomains", "d.example.com")
+
+            assert flusher.flushed == 3
+            async with session_factory() as db:
+                assert (await crud_finding.get_findings_by_tool(db, "scan-1"))["amass"]["subdomains"] == [
+                    "a.example.com", "b.example.com", "c.example.com"
+                ]
+
+            await flusher.stop()
+            async with session_factory() as db:
+                found = await crud_finding.get_findings_by_tool(db, "scan-1")
+            assert found["amass"]["subdomains"][-1] == "d.example.com"
+            assert [event[2]["offset"] for event in events] == [0, 3]
+            assert [(event[2]["count"], event[2]["items"], event[2]["truncated"]) for event in events] == [
+                (3, ["a.example.com", "b.example.com"], True),
+                (1, ["d.example.com"], False),
+            ]
+
+    asyncio.run(run())
+
+
+def test_overlong_value_is_dropped_not_the_batch(sqlite_db, monkeypatch):
+    """Test that a value longer than the column is dropped while the rest of its batch is stored"""
+    async def publish(batch):
+        pass
+
+    monkeypatch.setattr(findings_flusher, "publish_scan_events", publish)
+
+    async def run():
+        async with sqlite_db() as session_factory:
+            await _add_scan(session_factory)
+            store = PartialResultsStore(max_bytes=10**6, ttl_seconds=60)
+            flusher = FindingsFlusher(store, "scan-1", "amass", batch_size=100, interval=60, session_factory=session_factory).start()
+            findings = store.open("scan-1", "amass")
+            findings.add("subdomains", "a.example.com")
+            findings.add("subdomains", "x" * (crud_finding.VALUE_MAX_LENGTH + 1))
+            findings.add("subdomains", "b.example.com")
+            await flusher.stop()
+            async with session_factory() as db:
+                found = await crud_finding.get_findings_by_tool(db, "scan-1")
+        return flusher, found
+
+    flusher, found = asyncio.run(run())
+    assert found["amass"]["subdomains"] == ["a.example.com", "b.example.com"]
+    assert flusher.flushed == 2
+    assert flusher.error is None
+
+
+def test_poison_row_is_dropped_after_repeated_failures(sqlite_db, monkeypatch):
+    """Test that a row failing every flush is isolated and dropped after max_failures, and the rest stored"""
+    events = []
+    add_findings = crud_finding.add_findings
+
+    async def publish(batch):
+        events.extend(batch)
+
+    async def reject_poison(db, rows):
+        if any(row["value"] == "poison.example.com" for row in rows):
+            raise RuntimeError("invalid byte sequence")
+        return await add_findings(db, rows)
+
+    monkeypatch.setattr(findings_flusher, "publish_scan_events", publish)
+    monkeypatch.setattr(crud_finding, "add_findings", reject_poison)
+
+    async def run():
+        async with sqlite_db() as session_factory:
+            await _add_scan(session_factory)
+            store = PartialResultsStore(max_bytes=10**6, ttl_seconds=60)
+            flusher = FindingsFlusher(store, "scan-1", "amass", batch_size=100, interval=60, max_failures=2, session_factory=session_factory)
+            findings = store.open("scan-1", "amass")
+            for name in ["a", "poison", "b"]:
+                findings.add("subdomains", f"{name}.example.com")
+            first = await flusher.flush()
+            findings.add("subdomains", "c.example.com")
+            second = await flusher.flush()
+            findings.add("subdomains", "d.example.com")
+            await flusher.stop()
+            async with session_factory() as db:
+                found = await crud_finding.get_findings_by_tool(db, "scan-1")
+        return flusher, first, second, found
+
+    flusher, first, second, found = asyncio.run(run())
+    assert (first, second) == (0, 3)
+    assert found["amass"]["subdomains"] == ["a.example.com", "b.example.com", "c.example.com", "d.example.com"]
+    assert flusher.dropped == 1
+    assert flusher.error == "Dropped 1 findings that could not be stored"
+    assert [event[2] for event in events if event[1] == "findings_dropped"] == [{"tool": "amass", "dropped": 1}]
+
+
+def test_failed_final_flush_is_reported(sqlite_db, monkeypatch):
+    """Test that stop() drops what the final flush cannot store and reports it in error"""
+    async def publish(batch):
+        pass
+
+    async def fail(db, rows):
+        raise RuntimeError("database is gone")
+
+    monkeypatch.setattr(findings_flusher, "publish_scan_events", publish)
+    monkeypatch.setattr(crud_finding, "add_findings", fail)
+
+    async def run():
+        async with sqlite_db() as session_factory:
+            await _add_scan(session_factory)
+            store = PartialResultsStore(max_bytes=10**6, ttl_seconds=60)
+            flusher = FindingsFlusher(store, "scan-1", "amass", batch_size=100, interval=60, session_factory=session_factory).start()
+            store.open("scan-1", "amass").add("subdomains", "a.example.com")
+            await flusher.stop()
+        return flusher
+
+    flusher = asyncio.run(run())
+    assert (flusher.flushed, flusher.dropped) == (0, 1)
+    assert flusher.error == "Dropped 1 findings that could not be stored"
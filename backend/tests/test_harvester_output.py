@@ -0,0 +1,56 @@
+import json
+
+from tools.findings import FindingsAccumulator
+from tools.harvester import HarvesterOutputParser, load_output_file
+
+OUTPUT = """
+*******************************************************************
+*  theHarvester 4.6.0                                             *
+*******************************************************************
+
+[*] Target: example.com
+
+[*] Searching Bing.
+
+[*] ASNS found: 1
+--------------------
+AS15133
+
+[*] No IPs found.
+
+[*] Emails found: 2
+----------------------
+Admin@Example.com
+info@example.com
+
+[*] Hosts found: 3
+---------------------
+mail.example.com:192.0.2.10
+WWW.example.com
+not a host name
+
+[*] Interesting Urls found: 1
+--------------------
+https://www.example.com/login
+"""
+
+
+def test_parser_picks_findings_out_of_console_output():
+    """Test that only the emails, hosts and IPs sections of theHarvester's stdout become findings"""
+    findings = FindingsAccumulator()
+    parser = HarvesterOutputParser(findings)
+    for line in OUTPUT.splitlines():
+        parser.feed(line)
+
+    assert findings.to_dict(["emails", "hosts", "ips"]) == {
+        "emails": ["admin@example.com", "info@example.com"],
+        "hosts": ["mail.example.com:192.0.2.10", "www.example.com"],
+        "ips": [],
+    }
+
+
+def test_load_output_file(tmp_path):
+    """Test that the JSON report is reduced to its findings lists"""
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps({"hosts": ["a.example.com"], "ips": ["192.0.2.1"], "asns": ["AS1"]}))
+    assert load_output_file(str(path)) == {"emails": [], "hosts": ["a.example.com"], "ips": ["192.0.2.1"]}
@@ -0,0 +1,42 @@
+import asyncio
+import os
+
+from app.utilities.offload import PACK_CHUNK_ITEMS, _pack, _unpack, run_cpu_bound, shutdown_pool
+from app.utilities.result_processing import render_results_document
+
+
+def test_pack_round_trip():
+    """Test that long string lists are packed and come back unchanged, and anything else passes through"""
+    hosts = [f"host{i}.example.com" for i in range(PACK_CHUNK_ITEMS * 2 + 5)]
+    mixed = ["a.example.com"] * 1500 + [None]
+    value = ({"subdomains": hosts, "mixed": mixed, "short": ["x"], "empty": [""] * 2000}, 3)
+
+    packed = asyncio.run(_pack(value))
+    assert not isinstance(packed[0]["subdomains"], list)
+    assert packed[0]["mixed"] == mixed
+    assert _unpack(packed) == value
+
+
+def test_run_cpu_bound_offloads_above_threshold():
+    """Test that work below the threshold runs inline and work above it runs in the pool with the same result"""
+    document = {
+        "scan_id": "s1",
+        "domain": "example.com",
+        "amass": {"subdomains": [f"h{i % 3000}.example.com" for i in range(5000)]},
+        "subfinder": None,
+    }
+
+    async def run():
+        inline_pid = await run_cpu_bound(os.getpid, size=0, threshold=1)
+        pool_pid = await run_cpu_bound(os.getpid, size=1, threshold=1)
+        inline = await run_cpu_bound(render_results_document, document, size=0, threshold=1)
+        pooled = await run_cpu_bound(render_results_document, document, size=1, threshold=1)
+        return inline_pid, pool_pid, inline, pooled
+
+    try:
+        inline_pid, pool_pid, inline, pooled = asyncio.run(run())
+    finally:
+        shutdown_pool()
+    assert inline_pid == os.getpid()
+    assert pool_pid != os.getpid()
+    assert inline == pooled
@@ -0,0 +1,62 @@
+from tools.partial_results import PartialResultsStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_are_scoped_by_scan_and_tool():
+    """Test that concurrent tools and scans of the same domain do not overwrite each other"""
+    store = PartialResultsStore(max_bytes=10**6, ttl_seconds=60)
+    store.open("scan-1", "amass").add("subdomains", "a.example.com")
+    store.open("scan-1", "subfinder").add("subdomains", "b.example.com")
+    store.open("scan-2", "amass").add("subdomains", "c.example.com")
+
+    assert store.get("scan-1", "amass")["subdomains"] == ["a.example.com"]
+    assert store.get("scan-1", "subfinder")["subdomains"] == ["b.example.com"]
+    assert store.get("scan-2", "AMASS")["subdomains"] == ["c.example.com"]
+
+    store.discard("scan-1", "amass")
+    assert store.get("scan-1", "amass") is None
+
+def test_entries_expire_after_ttl():
+    """Test TTL eviction of untouched entries"""
+    clock = FakeClock()
+    store = PartialResultsStore(max_bytes=10**6, ttl_seconds=60, clock=clock)
+    store.open("scan-1", "amass")
+    clock.now = 61
+    store.open("scan-2", "amass")
+
+    assert store.get("scan-1", "amass") is None
+    assert store.memory_usage()["entries"] == 1
+
+def test_least_recently_used_entry_is_evicted_over_memory_ceiling():
+    """Test that the memory ceiling evicts the least recently used entry first"""
+    store = PartialResultsStore(max_bytes=2000, ttl_seconds=60)
+    old = store.open("scan-1", "amass")
+    old.extend("subdomains", [f"host{i}.example.com" for i in range(10)])
+    store.open("scan-2", "amass").extend("subdomains", [f"host{i}.example.com" for i in range(10)])
+    store.get("scan-1", "amass")
+    store.open("scan-3", "amass").extend("subdomains", [f"host{i}.example.com" for i in range(10)])
+    store.open("scan-4", "amass")
+
+    assert store.get("scan-2", "amass") is None
+    assert store.memory_usage()["bytes"] <= 2000
+
+def test_watched_runs_are_never_evicted():
+    """Test that a run still being watched survives both the memory ceiling and the TTL"""
+    clock = FakeClock()
+    store = PartialResultsStore(max_bytes=500, ttl_seconds=60, clock=clock)
+    store.watch("scan-1", "amass", lambda kind, value: None)
+    store.open("scan-1", "amass").extend("subdomains", [f"host{i}.example.com" for i in range(10)])
+    store.open("scan-2", "amass").extend("subdomains", [f"host{i}.example.com" for i in range(10)])
+    clock.now = 61
+    store.open("scan-3", "amass")
+
+    assert len(store.get("scan-1", "amass")["subdomains"]) == 10
+    assert store.get("scan-2", "amass") is None
+
+    store.discard("scan-1", "amass")
+    assert store.get("scan-1", "amass") is None
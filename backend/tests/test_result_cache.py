@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app.utilities.result_cache import KINDS, ResultCache, etag_matches, make_etag
+
+
+def test_result_cache_versions_eviction_and_invalidation():
+    """Test that entries are keyed by version, bounded in bytes and dropped on invalidation"""
+    async def run():
+        cache = ResultCache(max_bytes=10)
+        await cache.put("scan", "a", "v1", b"aaaa")
+        await cache.put("results", "a", "v1", b"bbbb")
+        stale = await cache.get("scan", "a", "v2")
+        fresh = await cache.get("scan", "a", "v1")
+        await cache.put("scan", "b", "v1", b"cccc")
+        evicted = await cache.get("results", "a", "v1")
+        await cache.invalidate("a")
+        invalidated = await cache.get("scan", "a", "v1")
+        return stale, fresh, evicted, invalidated, await cache.get("scan", "b", "v1"), cache.bytes_used()
+
+    stale, fresh, evicted, invalidated, other, used = asyncio.run(run())
+    assert stale is None
+    assert fresh == b"aaaa"
+    assert evicted is None
+    assert invalidated is None
+    assert other == b"cccc"
+    assert used == 4
+
+
+def test_invalidation_drops_every_representation():
+    """Test that invalidating a scan drops each cached kind, the gzip copy included, and unknown kinds are refused"""
+    async def run():
+        cache = ResultCache(max_bytes=10**6)
+        for kind in KINDS:
+            await cache.put(kind, "a", "v1", kind.encode())
+        await cache.invalidate("a")
+        return [await cache.get(kind, "a", "v1") for kind in KINDS]
+
+    assert "results.gzip" in KINDS
+    assert asyncio.run(run()) == [None] * len(KINDS)
+    with pytest.raises(ValueError):
+        asyncio.run(ResultCache(max_bytes=10).put("results.br", "a", "v1", b"x"))
+
+
+def test_etag_matching():
+    """Test If-None-Match lists, weak tags and wildcards"""
+    etag = make_etag("results", "a", "2024-01-01T00:00:00")
+    assert etag == make_etag("results", "a", "2024-01-01T00:00:00")
+    assert etag != make_etag("scan", "a", "2024-01-01T00:00:00")
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
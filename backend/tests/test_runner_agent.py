@@ -0,0 +1,120 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from tools import runner_agent
+from tools.runner_client import RunnerClient
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="process tags are read from /proc")
+
+# A tool that ignores SIGTERM and has a child of its own.
+STUBBORN_TOOL = ["sh", "-c", "trap '' TERM; sleep 60 & echo started; wait"]
+
+
+def _job_processes(job_id: str):
+    return [p for p in runner_agent.tool_processes() if p["job_id"] == job_id]
+
+
+def test_terminate_kills_the_whole_process_group(tmp_path):
+    """Test that terminating a job SIGKILLs its process tree after the grace period"""
+    async def run():
+        agent = runner_agent.RunnerAgent(str(tmp_path / "runner.sock"), runner_agent.WarmPool(0, ""), kill_grace=0.5)
+        server = asyncio.create_task(agent.serve())
+        while not os.path.exists(agent.socket_path):
+            await asyncio.sleep(0.01)
+        client = RunnerClient(agent.socket_path)
+        try:
+            process = await client.spawn(STUBBORN_TOOL, job_id="stubborn", timeout=60)
+            assert await process.stdout.readline() == b"started\n"
+            running = len(_job_processes("stubborn"))
+            started = time.monotonic()
+            await process.terminate(0.5)
+            return running, time.monotonic() - started, _job_processes("stubborn")
+        finally:
+            await client.close()
+            agent.stop()
+            await server
+
+    running, elapsed, left = asyncio.run(run())
+    assert running == 2
+    assert elapsed >= 0.5
+    assert left == []
+
+
+def test_overlong_output_line_is_cut_and_the_job_still_exits(tmp_path):
+    """Test that a line longer than the stream limit is truncated, later lines still arrive and the exit is sent"""
+    tool = ["sh", "-c", f"head -c {3 * runner_agent.STREAM_LIMIT} /dev/zero | tr '\\0' x; echo; echo after; exit 3"]
+
+    async def run():
+        agent = runner_agent.RunnerAgent(str(tmp_path / "runner.sock"), runner_agent.WarmPool(0, ""))
+        server = asyncio.create_task(agent.serve())
+        while not os.path.exists(agent.socket_path):
+            await asyncio.sleep(0.01)
+        client = RunnerClient(agent.socket_path)
+        try:
+            process = await client.spawn(tool, job_id="long-line", timeout=60)
+            lines = [await process.stdout.readline(), await process.stdout.readline()]
+            return lines, await asyncio.wait_for(process.wait(), timeout=10)
+        finally:
+            await client.close()
+            agent.stop()
+            await server
+
+    (long_line, after), returncode = asyncio.run(run())
+    assert long_line == b"x" * runner_agent.MAX_LINE_BYTES + b"\n"
+    assert after == b"after\n"
+    assert returncode == 3
+
+
+def test_warm_interpreter_stays_live_while_handed_out():
+    """Test that a warm interpreter counts as live from take() until it is handed over to its job"""
+    async def run():
+        pool = runner_agent.WarmPool(1, "json")
+        await pool._refill()
+        # No replacement is started by take().
+        pool.size = 0
+        process = pool._ready[0]
+        drain = process.stdin.drain
+        live_during_handshake = []
+
+        async def checked_drain():
+            live_during_handshake.append(process.pid in pool.pgids())
+            await drain()
+
+        process.stdin.drain = checked_drain
+        try:
+            taken = await pool.take(["-c", "pass"])
+            live_before_registration = process.pid in pool.pgids()
+            pool.handed_over(taken)
+            return taken is process, live_during_handshake, live_before_registration, process.pid in pool.pgids()
+        finally:
+            await process.wait()
+            pool.close()
+
+    assert asyncio.run(run()) == (True, [True], True, False)
+
+
+def test_reaper_kills_exec_jobs_past_their_deadline():
+    """Test that tagged processes outliving their deadline are found as orphans and killed"""
+    env = {
+        **os.environ,
+        runner_agent.JOB_ENV: "orphan",
+        runner_agent.OWNER_ENV: "exec",
+        runner_agent.DEADLINE_ENV: str(time.time() - 1),
+    }
+    orphan = subprocess.Popen(["sleep", "60"], env=env, start_new_session=True)
+    try:
+        while not _job_processes("orphan"):
+            time.sleep(0.01)
+        orphans = runner_agent.find_orphans(runner_agent.AGENT_ID, set(), min_age=0)
+        assert orphan.pid in orphans
+        assert orphan.pid not in runner_agent.find_orphans(runner_agent.AGENT_ID, {orphan.pid}, min_age=0)
+        assert asyncio.run(runner_agent.kill_tagged_job("orphan", grace=1)) == [orphan.pid]
+        assert orphan.wait(timeout=5) == -15
+    finally:
+        if orphan.poll() is None:
+            orphan.kill()
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime
+
+from app.crud import scan as crud_scan
+from app.crud import scan_diff as crud_scan_diff
+from app.db.models.finding import Finding
+from app.db.models.scan import Scan
+
+
+def test_diff_per_tool_and_total(sqlite_db):
+    """Test added/removed findings per tool and over all tools, and the previous-scan lookup"""
+    async def run():
+        async with sqlite_db() as session_factory, session_factory() as db:
+            db.add_all([
+                Scan(id="first", domain="example.com", status="finished", created_date=datetime(2024, 1, 1)),
+                Scan(id="second", domain="example.com", status="finished", created_date=datetime(2024, 2, 1)),
+            ])
+            rows = [
+                ("first", "amass", "subdomains", "a.example.com"),
+                ("first", "amass", "subdomains", "old.example.com"),
+                ("first", "subfinder", "subdomains", "b.example.com"),
+                ("second", "amass", "subdomains", "a.example.com"),
+                ("second", "amass", "subdomains", "b.example.com"),
+                ("second", "amass", "ips", "10.0.0.1"),
+            ]
+            db.add_all([Finding(scan_id=s, tool=t, kind=k, value=v) for s, t, k, v in rows])
+            await db.commit()
+            second = await crud_scan.get_scan_by_id(db, "second")
+            previous = await crud_scan.get_previous_scan(db, second)
+            diff = await crud_scan_diff.diff_findings(db, "second", previous.id)
+        return previous.id, diff
+
+    previous, diff = asyncio.run(run())
+    assert previous == "first"
+    assert diff["tools"]["amass"] == {
+        "ips": {"added": ["10.0.0.1"], "removed": []},
+        "subdomains": {"added": ["b.example.com"], "removed": ["old.example.com"]},
+    }
+    assert diff["tools"]["subfinder"] == {"subdomains": {"added": [], "removed": ["b.example.com"]}}
+    # b.example.com moved from subfinder to amass, so it is not a change overall.
+    assert diff["total"] == {
+        "ips": {"added": ["10.0.0.1"], "removed": []},
+        "subdomains": {"added": [], "removed": ["old.example.com"]},
+    }
+    assert (diff["added"], diff["removed"]) == (1, 1)
@@ -0,0 +1,32 @@
+import asyncio
+
+from app.crud import scan_event as crud_scan_event
+from app.db.models.scan import Scan
+from app.utilities.scan_events import decode_event_cursor, encode_event_cursor
+
+
+def test_events_are_numbered_and_read_per_scan(sqlite_db):
+    """Test that each scan's events get consecutive seqs and are read after that scan's own cursor"""
+    async def run():
+        async with sqlite_db() as session_factory:
+            async with session_factory() as db:
+                db.add_all([Scan(id=scan_id, domain="example.com", status="running") for scan_id in ("scan-1", "scan-2")])
+                await db.commit()
+                await crud_scan_event.add_scan_events(db, [("scan-1", "tool_started", {}), ("scan-2", "tool_started", {})])
+                await crud_scan_event.add_scan_events(db, [("scan-1", "findings", {"count": 1}), ("scan-1", "tool_finished", {})])
+                everything = await crud_scan_event.get_scan_events_after(db, {"scan-1": 0, "scan-2": 0})
+                newer = await crud_scan_event.get_scan_events_after(db, {"scan-1": 2, "scan-2": 1})
+        return everything, newer
+
+    everything, newer = asyncio.run(run())
+    assert [(event.scan_id, event.seq) for event in everything] == [("scan-1", 1), ("scan-2", 1), ("scan-1", 2), ("scan-1", 3)]
+    assert [(event.scan_id, event.seq, event.event) for event in newer] == [("scan-1", 3, "tool_finished")]
+
+
+def test_event_cursor_round_trip():
+    """Test that a Last-Event-ID restores each scan's cursor and an unreadable one starts over"""
+    scan_ids = ["scan-1", "leader"]
+    assert decode_event_cursor(scan_ids, encode_event_cursor(scan_ids, {"scan-1": 4, "leader": 9})) == {"scan-1": 4, "leader": 9}
+    assert decode_event_cursor(scan_ids, "4") == {"scan-1": 4, "leader": 0}
+    assert decode_event_cursor(scan_ids, "1-2-3") == {"scan-1": 0, "leader": 0}
+    assert decode_event_cursor(scan_ids, None) == {"scan-1": 0, "leader": 0}
@@ -0,0 +1,35 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.crud import scan as crud_scan
+from app.db.models.scan import Scan
+
+
+def test_keyset_pages_cover_every_scan_once(sqlite_db):
+    """Test that following next_cursor visits each scan once, even with equal created_date values"""
+    async def run():
+        async with sqlite_db() as session_factory:
+            start = datetime(2024, 1, 1)
+            async with session_factory() as db:
+                for i in range(7):
+                    db.add(Scan(id=f"scan-{i}", domain="example.com", status="finished", created_date=start + timedelta(minutes=i // 2)))
+                await db.commit()
+
+            seen, cursor = [], None
+            async with session_factory() as db:
+                while True:
+                    scans, cursor = await crud_scan.get_scans_page(db, limit=3, cursor=cursor)
+                    seen.extend(scan.id for scan in scans)
+                    if not cursor:
+                        break
+        return seen
+
+    assert asyncio.run(run()) == [f"scan-{i}" for i in range(6, -1, -1)]
+
+
+def test_invalid_cursor_is_rejected():
+    """Test that a cursor that was not issued by the API raises ValueError"""
+    with pytest.raises(ValueError):
+        crud_scan.decode_scan_cursor("not-a-cursor")
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.db.models.scan import Scan
+from app.utilities.scan_persister import ScanPersister
+
+
+async def _add_scan(session_factory):
+    statements = []
+    event.listen(session_factory.kw["bind"].sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    async with session_factory() as db:
+        db.add(Scan(id="scan-1", domain="example.com", status="pending"))
+        await db.commit()
+    statements.clear()
+    return statements
+
+
+def test_persister_coalesces_tool_results_into_one_update(sqlite_db):
+    """Test that updates queued within the delay are written by a single UPDATE"""
+    async def run():
+        async with sqlite_db() as session_factory:
+            statements = await _add_scan(session_factory)
+            persister = ScanPersister("scan-1", delay=0.05, session_factory=session_factory)
+            persister.update(amass={"subdomains": ["a.example.com"]}, updated_by="amass")
+            persister.update(subfinder={"subdomains": ["b.example.com"]}, updated_by="subfinder")
+            await asyncio.sleep(0.2)
+
+            assert persister.flushes == 1
+            assert [sql for sql in statements if sql.startswith("UPDATE")] == [statements[0]]
+            assert not any(sql.startswith("SELECT") for sql in statements)
+            async with session_factory() as db:
+                scan = await db.get(Scan, "scan-1")
+            assert scan.amass == {"subdomains": ["a.example.com"]}
+            assert scan.subfinder == {"subdomains": ["b.example.com"]}
+
+    asyncio.run(run())
+
+
+def test_persister_computes_timestamps_in_sql(sqlite_db):
+    """Test that started_at is kept and duration is derived from it when the scan finishes"""
+    async def run():
+        async with sqlite_db() as session_factory:
+            await _add_scan(session_factory)
+            started = datetime.now() - timedelta(seconds=42)
+            async with session_factory() as db:
+                scan = await db.get(Scan, "scan-1")
+                scan.started_at = started
+                await db.commit()
+
+            persister = ScanPersister("scan-1", delay=10, session_factory=session_factory)
+            persister.set_status("running")
+            persister.update(summary={"total_subdomains": 1})
+            persister.set_status("finished")
+            scan = await persister.close(returning=True)
+
+            assert scan.status == "finished"
+            assert scan.started_at == started
+            assert scan.finished_at is not None
+            assert 41 <= scan.duration_seconds <= 43
+            assert scan.summary == {"total_subdomains": 1}
+
+    asyncio.run(run())
@@ -0,0 +1,53 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from app.crud import scan as crud_scan
+from app.crud import scan_event as crud_scan_event
+from app.crud import scan_job as crud_scan_job
+from app.db.models.scan import Scan
+from app.db.models.scan_job import ScanJob
+from app.schemas.scan import ScanCreate
+
+
+def test_scan_is_committed_only_with_its_job(sqlite_db):
+    """Test that a scan created with commit=False disappears if its job is not enqueued and is stored with it otherwise"""
+    async def count(session_factory, model):
+        async with session_factory() as db:
+            return (await db.execute(select(func.count()).select_from(model))).scalar()
+
+    async def run():
+        async with sqlite_db() as session_factory:
+            async with session_factory() as db:
+                await crud_scan.create_scan(db, ScanCreate(domain="example.com"), commit=False)
+                await db.rollback()
+            abandoned = await count(session_factory, Scan)
+
+            async with session_factory() as db:
+                scan = await crud_scan.create_scan(db, ScanCreate(domain="example.com"), commit=False)
+                job = await crud_scan_job.enqueue_scan_job(db, scan.id, domain=scan.domain)
+            return abandoned, await count(session_factory, Scan), await count(session_factory, ScanJob), job.scan_id == scan.id
+
+    assert asyncio.run(run()) == (0, 1, 1, True)
+
+
+def test_last_failed_attempt_ends_the_scan(sqlite_db):
+    """Test that a job out of attempts moves its running scan to error, with stats and a status event"""
+    async def run():
+        async with sqlite_db() as session_factory, session_factory() as db:
+            scan = await crud_scan.create_scan(db, ScanCreate(domain="example.com"), commit=False)
+            await crud_scan_job.enqueue_scan_job(db, scan.id, domain=scan.domain, max_attempts=1)
+            job = await crud_scan_job.claim_next_scan_job(db, "worker-1")
+            await crud_scan.update_scan_status(db, scan.id, "running")
+            await crud_scan_job.fail_scan_job(db, job.id, "worker crashed")
+            await db.refresh(scan)
+            events = await crud_scan_event.get_scan_events_after(db, {scan.id: 0})
+            stats = await crud_scan.get_scan_stats(db)
+        return scan, events, stats
+
+    scan, events, stats = asyncio.run(run())
+    assert scan.status == "error"
+    assert scan.finished_at is not None
+    assert "worker crashed" in scan.error_message
+    assert events[-1].event == "status" and events[-1].data["status"] == "error"
+    assert stats["status_counts"] == {"error": 1}
@@ -0,0 +1,38 @@
+import asyncio
+
+from app.crud import scan as crud_scan
+from app.crud import scan_stats as crud_scan_stats
+from app.schemas.scan import ScanCreate
+
+
+def test_rollup_follows_transitions_and_matches_rebuild(sqlite_db):
+    """Test that the incrementally maintained stats equal a rebuild from the scans table"""
+    async def run():
+        async with sqlite_db() as session_factory, session_factory() as db:
+            first = await crud_scan.create_scan(db, ScanCreate(domain="example.com", user_id=1))
+            second = await crud_scan.create_scan(db, ScanCreate(domain="example.com"))
+            third = await crud_scan.create_scan(db, ScanCreate(domain="example.org", user_id=1))
+            await crud_scan.update_scan_status(db, first.id, "running")
+            await crud_scan.update_scan_status(db, first.id, "finished")
+            await crud_scan.update_scan_status(db, second.id, "running")
+            await crud_scan.delete_scan(db, third.id)
+            incremental = (
+                await crud_scan.get_scan_stats(db),
+                await crud_scan.get_scan_stats(db, user_id=1),
+            )
+            await crud_scan_stats.rebuild_scan_stats(db)
+            rebuilt = (
+                await crud_scan.get_scan_stats(db),
+                await crud_scan.get_scan_stats(db, user_id=1),
+            )
+        return incremental, rebuilt
+
+    (overall, user_stats), rebuilt = asyncio.run(run())
+    assert (overall, user_stats) == rebuilt
+    assert overall["total_scans"] == 2
+    assert overall["status_counts"] == {"finished": 1, "running": 1}
+    assert overall["recent_scans_24h"] == 2
+    assert overall["top_domains"] == {"example.com": 2}
+    assert overall["average_duration_seconds"] is not None
+    assert user_stats["total_scans"] == 1
+    assert user_stats["status_counts"] == {"finished": 1}
@@ -0,0 +1,48 @@
+import asyncio
+
+from sqlalchemy import inspect, select
+
+from app.crud import scan as crud_scan
+from app.db.models.scan import Scan
+from app.db.upgrade import ADDED_COLUMNS, ADDED_INDEXES, upgrade_schema
+
+
+def _schema(sync_conn):
+    inspector = inspect(sync_conn)
+    return (
+        {column["name"] for column in inspector.get_columns("scans")},
+        {index["name"] for index in inspector.get_indexes("scans")},
+    )
+
+
+def test_upgrade_adds_what_an_earlier_release_lacks(sqlite_db):
+    """Test that a scans table from before the added columns and indexes is brought up to date and backfilled, and a rerun changes nothing"""
+    sqlite_indexes = {name for _, name, only_on in ADDED_INDEXES if only_on in (None, "sqlite")}
+
+    async def run():
+        async with sqlite_db() as session_factory:
+            engine = session_factory.kw["bind"]
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql("INSERT INTO scans (id, domain, status) VALUES ('old', 'example.com', 'finished')")
+                for name in sqlite_indexes:
+                    await conn.exec_driver_sql(f"DROP INDEX {name}")
+                for table, column in ADDED_COLUMNS:
+                    await conn.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN {column}")
+                before = await conn.run_sync(_schema)
+
+            await upgrade_schema(engine)
+            await upgrade_schema(engine)
+
+            async with engine.connect() as conn:
+                after = await conn.run_sync(_schema)
+            async with session_factory() as db:
+                await crud_scan.backfill_domain_reversed(db)
+                scans = (await db.execute(select(Scan))).scalars().all()
+        return before, after, scans
+
+    (columns_before, indexes_before), (columns, indexes), scans = asyncio.run(run())
+    added_columns = {column for _, column in ADDED_COLUMNS}
+    assert not added_columns & columns_before and not sqlite_indexes & indexes_before
+    assert added_columns <= columns
+    assert sqlite_indexes <= indexes
+    assert [(scan.id, scan.force_refresh, scan.domain_reversed) for scan in scans] == [("old", None, "com.example")]
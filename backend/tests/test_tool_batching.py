@@ -0,0 +1,102 @@
+import asyncio
+
+from app.config import settings
+from tools.batching import ToolBatcher, apex_suffixes
+from tools.findings import FindingsAccumulator
+from tools.security_tools import SecurityTools
+
+
+def test_batch_attributes_lines_by_apex_suffix():
+    """Test that one process runs the batch's domains and each line reaches the scans it falls under"""
+    runs = []
+
+    async def run_batch(domains, timeout, on_line):
+        runs.append((domains, timeout))
+        for line in ("www.a.com", "A.com.", "deep.sub.b.com", "b.com.evil.net", "other.org"):
+            on_line(line)
+        return 0, "warning"
+
+    async def run():
+        batcher = ToolBatcher("amass", run_batch, batch_size=2, max_wait=30)
+        scans = [FindingsAccumulator() for _ in range(3)]
+        # The second scan of a.com shares the batch; b.com fills it.
+        results = await asyncio.gather(
+            batcher.submit("a.com", scans[0], timeout=120),
+            batcher.submit("a.com", scans[1], timeout=60),
+            batcher.submit("B.com", scans[2], timeout=120),
+        )
+        return batcher, scans, results
+
+    batcher, scans, results = asyncio.run(run())
+    assert runs == [(["a.com", "b.com"], 60)]
+    assert results == [(0, "warning", 2)] * 3
+    assert scans[0].to_dict()["subdomains"] == ["www.a.com", "a.com"]
+    assert scans[1].to_dict()["subdomains"] == ["www.a.com", "a.com"]
+    assert scans[2].to_dict()["subdomains"] == ["deep.sub.b.com"]
+    assert batcher.snapshot()["batches"] == 1
+    assert apex_suffixes("a.b.com") == ["a.b.com", "b.com", "com"]
+
+
+def test_batch_starts_after_max_wait_and_stops_when_all_scans_cancel():
+    """Test that a partial batch runs after max_wait and its process is cancelled with its last scan"""
+    started = []
+
+    async def run():
+        stopped = asyncio.Event()
+
+        async def run_batch(domains, timeout, on_line):
+            started.append(domains)
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+            return 0, ""
+
+        batcher = ToolBatcher("subfinder", run_batch, batch_size=50, max_wait=0.05)
+        scan = asyncio.create_task(batcher.submit("example.com", FindingsAccumulator(), timeout=120))
+        await asyncio.sleep(0.2)
+        assert started == [["example.com"]]
+        scan.cancel()
+        await asyncio.wait_for(stopped.wait(), timeout=5)
+
+    asyncio.run(run())
+
+
+def test_security_tools_batched_commands(tmp_path, monkeypatch):
+    """Test that batched amass passes every domain with -d and subfinder reads them from a -dL file"""
+    monkeypatch.setattr(settings, "TOOL_BATCH_SIZES", "amass=2,subfinder=2,theharvester=5")
+    monkeypatch.setattr(settings, "TOOL_BATCH_MAX_WAIT_SECONDS", 30)
+    monkeypatch.setattr(settings, "TOOLS_SHARED_DIR", str(tmp_path))
+    tools = SecurityTools(settings)
+    commands = []
+
+    async def stream_tool(cmd, timeout, on_line):
+        if cmd[0] == "subfinder":
+            commands.append((cmd, (tmp_path / cmd[2].rsplit("/", 1)[1]).read_text()))
+        else:
+            commands.append((cmd, None))
+        on_line("api.example.com")
+        on_line("www.example.org")
+        return None, ""
+
+    tools._stream_tool = stream_tool
+
+    async def run():
+        return await asyncio.gather(
+            tools.run_amass("example.com", timeout=5, scan_id="s1"),
+            tools.run_amass("example.org", timeout=5, scan_id="s2"),
+            tools.run_subfinder("example.com", timeout=5, scan_id="s1"),
+            tools.run_subfinder("example.org", timeout=5, scan_id="s2"),
+        )
+
+    amass_com, amass_org, subfinder_com, _ = asyncio.run(run())
+    assert not tools.batched("theharvester")
+    assert commands[0] == (["amass", "enum", "-passive", "-d", "example.com", "-d", "example.org"], None)
+    assert commands[1][0][:2] == ["subfinder", "-dL"]
+    assert commands[1][1] == "example.com\nexample.org\n"
+    assert list(tmp_path.iterdir()) == []
+    assert amass_com["subdomains"] == ["api.example.com"]
+    assert amass_org["subdomains"] == ["www.example.org"]
+    assert amass_com["batch_domains"] == 2
+    assert subfinder_com["timeout"] and subfinder_com["partial"]
@@ -0,0 +1,53 @@
+import asyncio
+from tools.scheduler import ToolScheduler, parse_tool_config
+
+def test_parse_tool_config():
+    """Test parsing of per-tool slot configuration"""
+    assert parse_tool_config("amass=2, Subfinder=4,") == {"amass": 2, "subfinder": 4}
+
+def test_scheduler_limits_slots_and_serves_by_priority():
+    """Test that waiters beyond the slot limit run by priority, then FIFO"""
+    order = []
+
+    async def run():
+        scheduler = ToolScheduler({"amass": 1})
+        release_first = asyncio.Event()
+
+        async def job(name, priority, hold=None):
+            async with scheduler.slot("amass", priority):
+                order.append(name)
+                if hold:
+                    await hold.wait()
+
+        first = asyncio.create_task(job("first", 0, release_first))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(job("low", 0)),
+            asyncio.create_task(job("high", 5)),
+            asyncio.create_task(job("low2", 0)),
+        ]
+        await asyncio.sleep(0)
+        snapshot = scheduler.snapshot()["amass"]
+        assert snapshot["in_use"] == 1
+        assert snapshot["waiting"] == 3
+
+        release_first.set()
+        await asyncio.gather(first, *waiters)
+        assert scheduler.snapshot()["amass"]["in_use"] == 0
+
+    asyncio.run(run())
+    assert order == ["first", "high", "low", "low2"]
+
+def test_scheduler_cancelled_waiter_does_not_leak_slot():
+    """Test that cancelling a waiting caller leaves the slot count intact"""
+    async def run():
+        scheduler = ToolScheduler({}, default_slots=1)
+        await scheduler.acquire("subfinder")
+        waiter = asyncio.create_task(scheduler.acquire("subfinder"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        scheduler.release("subfinder")
+        assert scheduler.snapshot()["subfinder"]["in_use"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,53 @@
+import asyncio
+import sys
+
+from tools.streams import StderrTail, drain_process, iter_lines
+
+
+def test_iter_lines_across_chunks_and_stderr_tail():
+    """Test that lines split over chunks are rebuilt and the stderr tail keeps whole last lines"""
+    async def run():
+        stream = asyncio.StreamReader()
+        stream.feed_data(b"a.example.com\nb.exam")
+        stream.feed_data(b"ple.com\n\n  c.example.com  \nd.example.com")
+        stream.feed_eof()
+        return [line async for line in iter_lines(stream, chunk_size=4)]
+
+    assert asyncio.run(run()) == ["a.example.com", "b.example.com", "c.example.com", "d.example.com"]
+
+    tail = StderrTail(max_bytes=16)
+    for i in range(10):
+        tail.feed(f"warning {i}\n".encode())
+    assert tail.truncated
+    assert tail.total_bytes == 100
+    assert tail.text() == "warning 9"
+
+
+def test_drain_process_reads_stdout_and_stderr_concurrently():
+    """Test that a tool writing more stderr than a pipe holds still runs to completion"""
+    script = (
+        "import sys\n"
+        "for i in range(2000):\n"
+        "    sys.stderr.write('noise ' * 100 + '\\n')\n"
+        "    if i % 100 == 0:\n"
+        "        print(f'host{i}.example.com', flush=True)\n"
+        "sys.stderr.write('last words\\n')\n"
+    )
+
+    async def run():
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", script,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        lines = []
+        stderr = StderrTail(max_bytes=1024)
+        returncode = await asyncio.wait_for(drain_process(process, lines.append, stderr), timeout=30)
+        return returncode, lines, stderr
+
+    returncode, lines, stderr = asyncio.run(run())
+    assert returncode == 0
+    assert lines == [f"host{i}.example.com" for i in range(0, 2000, 100)]
+    assert stderr.total_bytes > 1024 * 1024
+    assert len(stderr.text()) <= 1024
+    assert stderr.text().endswith("last words")
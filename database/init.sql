@@ -13,3 +13,4 @@ $do$;
 GRANT ALL ON SCHEMA public TO postgres;
 ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON TABLES TO postgres;
 
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
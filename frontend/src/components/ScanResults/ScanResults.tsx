@@ -9,26 +9,26 @@ const ScanResults: React.FC = () => {
   const [loading, setLoading] = useState(true);
   const [progress, setProgress] = useState(0);
   const [scannedDomain, setScannedDomain] = useState<string | null>(null);
+  const [findingsCount, setFindingsCount] = useState(0);
   const [showDetails, setShowDetails] = useState<"theHarvester" | "amass" | "subfinder" | null>(null);
   const navigate = useNavigate();
 
   const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
 
   useEffect(() => {
-    let interval: NodeJS.Timeout;
-    let progressInterval: NodeJS.Timeout;
-
-    
-    progressInterval = setInterval(() => {
-      setProgress((prev) => {
-        if (prev >= 95) return prev; 
-        return Math.min(prev + 0.316, 95); 
-      });
-    }, 600);
+    let closed = false;
+    const tools = new Set<string>();
+    const startedTools = new Set<string>();
+    const finishedTools = new Set<string>();
+
+    const updateProgress = () => {
+      if (tools.size === 0) return;
+      const done = finishedTools.size + 0.5 * (startedTools.size - finishedTools.size);
+      setProgress(Math.min((done / tools.size) * 100, 95));
+    };
 
-    interval = setInterval(async () => {
+    const loadResults = async () => {
       const token = localStorage.getItem("token");
-      console.log("Sending request for results with token:", token);
       const res = await fetch(`${API_BASE_URL}/scan/${scan_id}/results`, {
         headers: {
           'Authorization': `Bearer ${token}`,
@@ -38,25 +38,57 @@ const ScanResults: React.FC = () => {
       if (res.ok) {
         const data = await res.json();
         if (data.domain) setScannedDomain(data.domain);
-        console.log("Received scan results:", data);
-        setResults(data);
         if (data.status && data.status.toLowerCase() === 'finished') {
-          clearInterval(interval);
-          clearInterval(progressInterval);
-          setProgress(100);
-          setLoading(false);
+          setResults(data);
         }
       } else if (res.status === 401) {
-        setLoading(false);
-        clearInterval(interval);
-        clearInterval(progressInterval);
         navigate("/login");
       }
-    }, 4000);
+      setProgress(100);
+      setLoading(false);
+    };
+
+    // The server pushes progress; the browser resends Last-Event-ID when it reconnects.
+    const events = new EventSource(`${API_BASE_URL}/scan/${scan_id}/events`);
+
+    events.addEventListener("status", (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      if (data.domain) setScannedDomain(data.domain);
+      (data.tools || []).forEach((tool: string) => tools.add(tool.toLowerCase()));
+      updateProgress();
+      if (["finished", "error", "cancelled"].includes(data.status)) {
+        closed = true;
+        events.close();
+        loadResults();
+      }
+    });
+
+    events.addEventListener("tool_started", (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      startedTools.add(data.tool.toLowerCase());
+      updateProgress();
+    });
+
+    events.addEventListener("tool_finished", (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      startedTools.add(data.tool.toLowerCase());
+      finishedTools.add(data.tool.toLowerCase());
+      updateProgress();
+    });
+
+    events.addEventListener("findings", (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setFindingsCount((prev) => prev + data.count);
+    });
+
+    events.onerror = () => {
+      if (closed) return;
+      console.log("Scan event stream interrupted, reconnecting...");
+    };
 
     return () => {
-      clearInterval(interval);
-      clearInterval(progressInterval);
+      closed = true;
+      events.close();
     };
   }, [scan_id, API_BASE_URL, navigate]);
   
@@ -80,6 +112,7 @@ return (
 
             <p className="text-app-secondary text-sm">
               Scanning... Please wait while the scan completes.
+              {findingsCount > 0 && ` ${findingsCount} findings so far.`}
             </p>
           </div>
         ) : results ? (
@@ -0,0 +1,187 @@
+"""
+Batched tool runs: one process enumerates the domains of several scans.
+
+Organisations queue scans of many apex domains at once, and amass and subfinder
+both take several target domains per process, so starting one process per
+domain mostly pays the tools' startup again and again. A ToolBatcher collects
+the domains submitted for a tool until it has `batch_size` of them or the
+first one has waited `max_wait` seconds, runs them as one process and hands
+every line it prints to the scans whose apex domain it falls under.
+"""
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from tools.findings import FindingsAccumulator, normalize_hostname
+from tools.logger import logger
+
+# run_batch(domains, timeout, on_line) -> (exit code or None on timeout, stderr tail)
+RunBatch = Callable[[List[str], float, Callable[[str], None]], Awaitable[Tuple[Optional[int], str]]]
+
+
+def apex_suffixes(hostname: str) -> List[str]:
+    """
+    `hostname` and every parent domain of it, most specific first:
+    "a.b.example.com" -> ["a.b.example.com", "b.example.com", "example.com", "com"].
+    """
+    labels = hostname.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels))]
+
+
+class _Member:
+    __slots__ = ("domain", "findings", "timeout", "priority", "future")
+
+    def __init__(self, domain: str, findings: FindingsAccumulator, timeout: float, priority: int, future: asyncio.Future):
+        self.domain = domain
+        self.findings = findings
+        self.timeout = timeout
+        self.priority = priority
+        self.future = future
+
+
+class _Batch:
+    def __init__(self):
+        self.members: List[_Member] = []
+        self.domains: Set[str] = set()
+        self.full = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.started = False
+
+
+class ToolBatcher:
+    """
+    Groups the domains submitted for one tool into shared runs of at most
+    `batch_size` distinct domains. A batch starts when it is full or `max_wait`
+    seconds after its first domain was submitted, whichever comes first, and
+    takes one `slot(tool, priority)` for its process at the highest priority of
+    its scans.
+
+    Each scan's findings go to its own accumulator, so partial results and
+    findings flushing work as for a single-domain run. A line is added to every
+    scan whose domain is the line's hostname or one of its parents; lines
+    outside all of them are dropped. The process runs for the shortest timeout
+    of its scans and is stopped once every scan waiting for it has been
+    cancelled. `stop_margin` is how much longer run_batch may take to stop it
+    before the batch gives up on it.
+    """
+
+    def __init__(
+        self,
+        tool: str,
+        run_batch: RunBatch,
+        batch_size: int,
+        max_wait: float,
+        slot: Optional[Callable[..., Any]] = None,
+        stop_margin: float = 15,
+    ):
+        self.tool = tool
+        self.run_batch = run_batch
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.slot = slot
+        self.stop_margin = stop_margin
+        self._pending: Optional[_Batch] = None
+        self._running: Set[_Batch] = set()
+        self.batches = 0
+        self.domains = 0
+
+    async def submit(
+        self, domain: str, findings: FindingsAccumulator, timeout: float, priority: int = 0
+    ) -> Tuple[Optional[int], str, int]:
+        """
+        Queue `domain` for the next batch and wait for that batch's process.
+        Returns its exit code (None when it timed out), its stderr tail and the
+        number of domains it ran. Like for a single-domain run, `timeout`
+        limits the process, not the wait for the batch and a tool slot.
+        """
+        member = _Member(normalize_hostname(domain), findings, timeout, priority, asyncio.get_running_loop().create_future())
+        batch = self._pending
+        if batch is None:
+            batch = self._pending = _Batch()
+            batch.task = asyncio.create_task(self._dispatch(batch))
+        batch.members.append(member)
+        batch.domains.add(member.domain)
+        if len(batch.domains) >= self.batch_size:
+            # Later domains go to a new batch; this one starts now.
+            self._pending = None
+            batch.full.set()
+
+        try:
+            return await member.future
+        except asyncio.CancelledError:
+            member.future.cancel()
+            if not batch.started:
+                batch.members.remove(member)
+                batch.domains = {m.domain for m in batch.members}
+            elif all(m.future.done() for m in batch.members):
+                batch.task.cancel()
+            raise
+
+    async def _dispatch(self, batch: _Batch) -> None:
+        try:
+            await asyncio.wait_for(batch.full.wait(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        if self._pending is batch:
+            self._pending = None
+        if not batch.members:
+            return
+
+        priority = max(m.priority for m in batch.members)
+        self._running.add(batch)
+        try:
+            async with self.slot(self.tool, priority) if self.slot else nullcontext():
+                await self._run(batch)
+        except asyncio.CancelledError:
+            for member in batch.members:
+                member.future.cancel()
+        finally:
+            self._running.discard(batch)
+
+    async def _run(self, batch: _Batch) -> None:
+        members = [m for m in batch.members if not m.future.done()]
+        if not members:
+            return
+        batch.started = True
+        by_domain: Dict[str, List[_Member]] = {}
+        for member in members:
+            by_domain.setdefault(member.domain, []).append(member)
+        domains = sorted(by_domain)
+        timeout = min(m.timeout for m in members)
+
+        def on_line(line: str):
+            hostname = normalize_hostname(line)
+            matched = False
+            for suffix in apex_suffixes(hostname):
+                for member in by_domain.get(suffix, ()):
+                    member.findings.add("subdomains", hostname)
+                    matched = True
+            if not matched:
+                logger.debug(f"{self.tool} printed {line!r}, which is under none of its domains")
+
+        self.batches += 1
+        self.domains += len(domains)
+        logger.info(f"Running {self.tool} for {len(domains)} domains of {len(members)} scans in one process")
+        try:
+            returncode, stderr = await asyncio.wait_for(
+                self.run_batch(domains, timeout, on_line), timeout=timeout + self.stop_margin
+            )
+        except Exception as e:
+            for member in members:
+                if not member.future.done():
+                    member.future.set_exception(e)
+            return
+        for member in members:
+            if not member.future.done():
+                member.future.set_result((returncode, stderr, len(domains)))
+
+    def snapshot(self) -> Dict[str, Any]:
+        pending = self._pending
+        return {
+            "batch_size": self.batch_size,
+            "max_wait_seconds": self.max_wait,
+            "pending_domains": len(pending.domains) if pending else 0,
+            "running_batches": len(self._running),
+            "batches": self.batches,
+            "avg_domains_per_batch": round(self.domains / self.batches, 2) if self.batches else 0.0,
+        }
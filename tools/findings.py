@@ -0,0 +1,119 @@
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+KINDS = ("subdomains", "emails", "hosts", "ips")
+
+# Approximate bookkeeping cost of one finding: a list slot plus a set entry.
+ITEM_OVERHEAD_BYTES = 64
+
+
+def normalize_hostname(value: str) -> str:
+    return value.strip().lower().rstrip(".")
+
+
+def normalize_email(value: str) -> str:
+    return value.strip().lower()
+
+
+def normalize_ip(value: str) -> str:
+    return value.strip()
+
+
+NORMALIZERS: Dict[str, Callable[[str], str]] = {
+    "subdomains": normalize_hostname,
+    "hosts": normalize_hostname,
+    "emails": normalize_email,
+    "ips": normalize_ip,
+}
+
+
+class FindingsSnapshot:
+    """
+    Point-in-time view of a FindingsAccumulator.
+
+    Taking a snapshot is O(1): the accumulator's lists are append-only, so
+    remembering their current lengths is enough to keep the view consistent.
+    Lists are only copied when a kind is actually read.
+    """
+
+    __slots__ = ("_items", "counts")
+
+    def __init__(self, items: Dict[str, List[str]], counts: Dict[str, int]):
+        self._items = items
+        self.counts = counts
+
+    def __getitem__(self, kind: str) -> List[str]:
+        return self._items[kind][:self.counts[kind]]
+
+    def items_since(self, kind: str, offset: int) -> List[str]:
+        """Findings of `kind` in this view after the first `offset` ones."""
+        return self._items[kind][offset:self.counts[kind]]
+
+    def get(self, kind: str, default=None):
+        if kind not in self._items:
+            return default
+        return self[kind]
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        return {kind: self[kind] for kind in self._items}
+
+
+class FindingsAccumulator:
+    """
+    Ordered, deduplicating collector for streamed tool findings.
+
+    Keeps first-seen order per kind, dedupes in O(1) per item and normalises
+    values (hostnames are lowercased and lose their trailing dot).
+    """
+
+    def __init__(self, kinds: Iterable[str] = KINDS):
+        self._items: Dict[str, List[str]] = {kind: [] for kind in kinds}
+        self._seen: Dict[str, Set[str]] = {kind: set() for kind in self._items}
+        self.nbytes = 0
+        # Called with (kind, value) for every new finding.
+        self.listeners: List[Callable[[str, str], None]] = []
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Iterable[str]], kinds: Iterable[str] = KINDS) -> "FindingsAccumulator":
+        findings = cls(kinds)
+        for kind in findings._items:
+            findings.extend(kind, data.get(kind) or [])
+        return findings
+
+    def add(self, kind: str, value: str) -> bool:
+        """Add one finding; returns True if it was new."""
+        if not isinstance(value, str):
+            return False
+        value = NORMALIZERS.get(kind, str.strip)(value)
+        seen = self._seen[kind]
+        if not value or value in seen:
+            return False
+        seen.add(value)
+        self._items[kind].append(value)
+        self.nbytes += sys.getsizeof(value) + ITEM_OVERHEAD_BYTES
+        for listener in self.listeners:
+            listener(kind, value)
+        return True
+
+    def extend(self, kind: str, values: Iterable[str]) -> int:
+        """Add many findings; returns how many were new."""
+        return sum(1 for value in values if self.add(kind, value))
+
+    def count(self, kind: str) -> int:
+        return len(self._items[kind])
+
+    def counts(self) -> Dict[str, int]:
+        return {kind: len(items) for kind, items in self._items.items()}
+
+    def items_since(self, kind: str, offset: int) -> List[str]:
+        """Findings of `kind` added after the first `offset` ones."""
+        return self._items[kind][offset:]
+
+    def snapshot(self) -> FindingsSnapshot:
+        return FindingsSnapshot(self._items, self.counts())
+
+    def to_dict(self, kinds: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        return {kind: list(self._items[kind]) for kind in (kinds or self._items)}
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._items.values())
@@ -0,0 +1,72 @@
+"""
+Incremental parsing of theHarvester's console output.
+
+theHarvester prints each result section as a header followed by a dashed rule
+and one value per line:
+
+    [*] Hosts found: 2
+    ---------------------
+    mail.example.com:192.0.2.10
+    www.example.com
+
+Lines are fed to HarvesterOutputParser as they arrive, so findings show up in
+the partial results while the tool runs instead of only after it exits.
+"""
+import ipaddress
+import json
+import re
+from typing import Any, Dict, Optional
+
+from tools.findings import FindingsAccumulator
+
+HARVESTER_KINDS = ("emails", "hosts", "ips")
+
+SECTION_HEADER = re.compile(r"^\[\*\]\s+(?P<name>[A-Za-z ]+?)\s+found:?\s*\d*\s*$", re.IGNORECASE)
+HOSTNAME = re.compile(r"^[a-z0-9_*]([a-z0-9_*-]*[a-z0-9_])?(\.[a-z0-9_]([a-z0-9_-]*[a-z0-9_])?)+\.?$", re.IGNORECASE)
+
+
+def _valid(kind: str, value: str) -> bool:
+    if kind == "emails":
+        return "@" in value and " " not in value
+    if kind == "ips":
+        try:
+            ipaddress.ip_address(value)
+        except ValueError:
+            return False
+        return True
+    # Hosts are printed as "host" or "host:ip[, ip...]", the same strings the JSON report holds.
+    return bool(HOSTNAME.match(value.partition(":")[0]))
+
+
+class HarvesterOutputParser:
+    """
+    Feeds the emails, hosts and IPs of theHarvester's stdout into `findings`
+    line by line. Anything outside those sections (banner, progress, other
+    result sections) is ignored.
+    """
+
+    def __init__(self, findings: FindingsAccumulator):
+        self.findings = findings
+        self.section: Optional[str] = None
+
+    def feed(self, line: str) -> None:
+        line = line.strip()
+        if not line or set(line) <= {"-", "*", "="}:
+            return
+        if line.startswith("["):
+            header = SECTION_HEADER.match(line)
+            name = header.group("name").strip().lower() if header else None
+            self.section = name if name in HARVESTER_KINDS else None
+            return
+        if self.section is not None and _valid(self.section, line):
+            self.findings.add(self.section, line)
+
+
+def load_output_file(path: str) -> Dict[str, Any]:
+    """
+    Findings lists of theHarvester's JSON report. Plain function so large files
+    can be parsed in the result process pool.
+    """
+    with open(path, "r") as f:
+        report = json.load(f)
+    return {kind: report.get(kind) or [] for kind in HARVESTER_KINDS}
@@ -0,0 +1,100 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tools.findings import FindingsAccumulator, FindingsSnapshot
+from tools.logger import logger
+
+Key = Tuple[str, str]
+
+
+class PartialResultsStore:
+    """
+    Findings of running (or just interrupted) tool runs, keyed by (scan_id, tool).
+
+    Entries are kept in least-recently-used order and are evicted when they
+    have not been touched for `ttl_seconds`, or oldest first once the
+    estimated size of all entries exceeds `max_bytes`. Runs that are being
+    watched (still running, see watch()) are never evicted: their tool keeps
+    the accumulator alive anyway, and the watcher reads its findings from here.
+    Reads return an O(1) FindingsSnapshot of the live accumulator.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Key, Tuple[FindingsAccumulator, float]]" = OrderedDict()
+        self._watchers: Dict[Key, List[Callable[[str, str], None]]] = {}
+        self.evictions = 0
+
+    def watch(self, scan_id: str, tool: str, listener: Callable[[str, str], None]) -> None:
+        """
+        Call `listener(kind, value)` for every new finding of the run, including
+        runs opened after this call. Watchers are dropped by discard().
+        """
+        key = (scan_id, tool.lower())
+        self._watchers.setdefault(key, []).append(listener)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[0].listeners.append(listener)
+
+    def open(self, scan_id: str, tool: str) -> FindingsAccumulator:
+        """Start a fresh accumulator for a tool run, replacing any previous one."""
+        key = (scan_id, tool.lower())
+        findings = FindingsAccumulator()
+        findings.listeners.extend(self._watchers.get(key, ()))
+        self._entries[key] = (findings, self._clock())
+        self._entries.move_to_end(key)
+        self._evict()
+        return findings
+
+    def get(self, scan_id: str, tool: str) -> Optional[FindingsSnapshot]:
+        key = (scan_id, tool.lower())
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries[key] = (entry[0], self._clock())
+        self._entries.move_to_end(key)
+        return entry[0].snapshot()
+
+    def discard(self, scan_id: str, tool: str) -> None:
+        self._entries.pop((scan_id, tool.lower()), None)
+        self._watchers.pop((scan_id, tool.lower()), None)
+
+    def _evict(self) -> None:
+        now = self._clock()
+        expired = [
+            key for key, (_, touched) in self._entries.items()
+            if now - touched > self.ttl_seconds and key not in self._watchers
+        ]
+        for key in expired:
+            del self._entries[key]
+            self.evictions += 1
+
+        total = self.bytes_used()
+        # Oldest first; the newest entry always stays.
+        for key in list(self._entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            if key in self._watchers:
+                continue
+            findings, _ = self._entries.pop(key)
+            total -= findings.nbytes
+            self.evictions += 1
+            logger.warning(f"Partial results for scan {key[0]} ({key[1]}) evicted to stay under {self.max_bytes} bytes")
+
+    def bytes_used(self) -> int:
+        return sum(findings.nbytes for findings, _ in self._entries.values())
+
+    def memory_usage(self) -> Dict[str, Any]:
+        self._evict()
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes_used(),
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
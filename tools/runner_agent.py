@@ -0,0 +1,576 @@
+"""
+Long-lived tool runner agent for the security-tools container.
+
+The API talks to this agent over a Unix socket on the shared volume instead of
+starting a new `docker exec` client for every tool run. The protocol is
+newline-delimited JSON; a connection runs one job at a time and is reused by
+the client's connection pool for the next one.
+
+Requests:
+    {"op": "run", "job_id": "...", "argv": ["subfinder", "-d", "example.com"], "timeout": 300}
+    {"op": "kill", "job_id": "...", "grace": 5}
+    {"op": "reap"}
+    {"op": "ping"}
+
+Responses for a job:
+    {"job_id": "...", "event": "started", "pid": 1234, "warm": false}
+    {"job_id": "...", "stream": "stdout", "line": "a.example.com"}
+    {"job_id": "...", "stream": "stderr", "line": "..."}
+    {"job_id": "...", "event": "exit", "returncode": 0}
+
+Every job runs in its own process group and carries MYOSINT_JOB_* tags in its
+environment, so the whole process tree can be terminated (SIGTERM, then SIGKILL
+after a grace period) and tool processes nobody is waiting for any more are
+found and killed by the reaper. Tools started with `docker exec` (when the
+socket is unavailable) are tagged the same way and killed with:
+
+    python3 runner_agent.py --kill-job <job_id> --grace 5
+
+This file runs inside the tools container and only depends on the stdlib.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+logging.basicConfig(
+    stream=sys.stdout,
+    level=logging.INFO,
+    format="[%(asctime)s] %(levelname)s [runner.%(funcName)s:%(lineno)d] %(message)s",
+    datefmt="%d/%b/%Y %H:%M:%S",
+)
+logger = logging.getLogger("runner")
+
+DEFAULT_SOCKET = os.getenv("RUNNER_SOCKET", "/home/tools/shared/runner.sock")
+WARM_POOL_SIZE = int(os.getenv("RUNNER_WARM_POOL_SIZE", "2"))
+WARM_PRELOAD = os.getenv("RUNNER_WARM_PRELOAD", "theHarvester.__main__")
+KILL_GRACE_SECONDS = float(os.getenv("RUNNER_KILL_GRACE_SECONDS", "5"))
+REAP_INTERVAL_SECONDS = float(os.getenv("RUNNER_REAP_INTERVAL_SECONDS", "30"))
+# Processes younger than this are never reaped, they may still be registering as a job.
+REAP_MIN_AGE_SECONDS = float(os.getenv("RUNNER_REAP_MIN_AGE_SECONDS", "10"))
+STREAM_LIMIT = 1024 * 1024
+# Longer output lines are cut to this: relayed as JSON a byte can take six characters,
+# and the client reads messages with STREAM_LIMIT too.
+MAX_LINE_BYTES = STREAM_LIMIT // 8
+
+JOB_ENV = "MYOSINT_JOB_ID"
+OWNER_ENV = "MYOSINT_JOB_OWNER"
+DEADLINE_ENV = "MYOSINT_JOB_DEADLINE"
+AGENT_ID = f"agent:{os.getpid()}:{int(time.time())}"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+# Runs in a pre-started interpreter: import the heavy modules up front, then
+# block until the agent hands over the argv of the script to execute.
+WARM_BOOTSTRAP = """
+import importlib, json, runpy, sys
+for name in sys.argv[1].split(","):
+    if name:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+argv = json.loads(sys.stdin.readline())
+sys.stdin.close()
+sys.argv = argv
+runpy.run_path(argv[0], run_name="__main__")
+"""
+
+
+def _proc_stat(pid: int) -> Optional[Tuple[str, int, float]]:
+    """State, process group and start time (seconds after boot) of a process."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            data = f.read()
+    except OSError:
+        return None
+    fields = data[data.rindex(")") + 2:].split()
+    return fields[0], int(fields[2]), int(fields[19]) / CLOCK_TICKS
+
+
+def _proc_tags(pid: int) -> Optional[Dict[str, str]]:
+    try:
+        with open(f"/proc/{pid}/environ", "rb") as f:
+            environ = f.read()
+    except OSError:
+        return None
+    tags = {}
+    for item in environ.split(b"\0"):
+        if item.startswith(b"MYOSINT_JOB_"):
+            name, _, value = item.decode(errors="replace").partition("=")
+            tags[name] = value
+    return tags if JOB_ENV in tags else None
+
+
+def _pids() -> Iterator[int]:
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            yield int(entry)
+
+
+def tool_processes() -> List[Dict[str, Any]]:
+    """Live (non-zombie) processes that carry job tags."""
+    with open("/proc/uptime") as f:
+        uptime = float(f.read().split()[0])
+    processes = []
+    for pid in _pids():
+        if pid == os.getpid():
+            continue
+        tags = _proc_tags(pid)
+        stat = _proc_stat(pid) if tags else None
+        if stat is None or stat[0] == "Z":
+            continue
+        deadline = tags.get(DEADLINE_ENV)
+        processes.append({
+            "pid": pid,
+            "pgid": stat[1],
+            "age": uptime - stat[2],
+            "job_id": tags[JOB_ENV],
+            "owner": tags.get(OWNER_ENV, ""),
+            "deadline": float(deadline) if deadline else None,
+        })
+    return processes
+
+
+def find_orphans(owner: Optional[str], live_pgids: Set[int], min_age: float = REAP_MIN_AGE_SECONDS) -> Set[int]:
+    """
+    Process groups of tool processes nobody waits for: groups of this agent that
+    are not a running job, groups left by another (dead) agent, and groups
+    started with `docker exec` that outlived their deadline.
+    """
+    now = time.time()
+    orphans = set()
+    for process in tool_processes():
+        if process["age"] < min_age or process["pgid"] in live_pgids:
+            continue
+        if process["owner"] == owner or process["owner"].startswith("agent:"):
+            orphans.add(process["pgid"])
+        elif process["deadline"] is not None and now > process["deadline"]:
+            orphans.add(process["pgid"])
+    return orphans
+
+
+def group_alive(pgid: int) -> bool:
+    for pid in _pids():
+        stat = _proc_stat(pid)
+        if stat is not None and stat[1] == pgid and stat[0] != "Z":
+            return True
+    return False
+
+
+def _signal_group(pgid: int, sig: int) -> bool:
+    if pgid <= 1 or pgid == os.getpgid(0):
+        return False
+    try:
+        os.killpg(pgid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+async def terminate_group(pgid: int, grace: float = KILL_GRACE_SECONDS) -> bool:
+    """
+    SIGTERM a process group, then SIGKILL whatever is left of it after `grace`
+    seconds. Returns False if the group was already gone.
+    """
+    if not _signal_group(pgid, signal.SIGTERM):
+        return False
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + grace
+    while group_alive(pgid):
+        if loop.time() >= deadline:
+            logger.warning(f"Process group {pgid} still running {grace}s after SIGTERM, sending SIGKILL")
+            _signal_group(pgid, signal.SIGKILL)
+            break
+        await asyncio.sleep(0.1)
+    return True
+
+
+async def kill_tagged_job(job_id: str, grace: float = KILL_GRACE_SECONDS) -> List[int]:
+    """Terminate every process group that carries the tags of `job_id`."""
+    pgids = sorted({p["pgid"] for p in tool_processes() if p["job_id"] == job_id})
+    await asyncio.gather(*(terminate_group(pgid, grace) for pgid in pgids))
+    return pgids
+
+
+async def read_line(stream: asyncio.StreamReader) -> bytes:
+    """
+    Next line of `stream` (b"" at EOF). A line longer than MAX_LINE_BYTES is cut
+    to that length and the rest of it skipped, however long it is.
+    """
+    try:
+        line = await stream.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        line = e.partial
+    except asyncio.LimitOverrunError:
+        line = await stream.read(MAX_LINE_BYTES)
+        while True:
+            try:
+                await stream.readuntil(b"\n")
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as e:
+                await stream.read(e.consumed)
+    return line[:MAX_LINE_BYTES]
+
+
+def is_python_script(argv: List[str]) -> bool:
+    return (
+        len(argv) >= 2
+        and os.path.basename(argv[0]) in ("python", "python3")
+        and argv[1].endswith(".py")
+    )
+
+
+class WarmPool:
+    """
+    Keeps a few interpreters started with the preload modules already imported.
+    Each interpreter serves exactly one job and is replaced in the background.
+    """
+
+    def __init__(self, size: int, preload: str):
+        self.size = size
+        self.preload = preload
+        self.env = {**os.environ, JOB_ENV: "warm", OWNER_ENV: AGENT_ID}
+        self._ready: Deque[asyncio.subprocess.Process] = deque()
+        # Taken from _ready but not yet registered as a job; still live for the reaper.
+        self._handing_out: Set[asyncio.subprocess.Process] = set()
+        self._refill_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    async def _start_one(self) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_exec(
+            sys.executable, "-u", "-c", WARM_BOOTSTRAP, self.preload,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT,
+            env=self.env,
+            start_new_session=True,
+        )
+
+    async def _refill(self):
+        while len(self._ready) < self.size:
+            try:
+                self._ready.append(await self._start_one())
+            except Exception:
+                logger.exception("Failed to start warm interpreter")
+                return
+
+    def refill(self):
+        if self.size <= 0:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def take(self, script_argv: List[str]) -> Optional[asyncio.subprocess.Process]:
+        """
+        Hand `script_argv` to a warm interpreter, or return None if none is ready.
+        The caller calls handed_over() once it has registered the process as a job.
+        """
+        while self._ready:
+            process = self._ready.popleft()
+            if process.returncode is not None:
+                continue
+            self._handing_out.add(process)
+            try:
+                process.stdin.write((json.dumps(script_argv) + "\n").encode())
+                await process.stdin.drain()
+            except Exception:
+                self._handing_out.discard(process)
+                raise
+            process.stdin.close()
+            self.hits += 1
+            self.refill()
+            return process
+        self.misses += 1
+        self.refill()
+        return None
+
+    def handed_over(self, process: asyncio.subprocess.Process):
+        self._handing_out.discard(process)
+
+    def pgids(self) -> Set[int]:
+        return {process.pid for process in self._ready} | {process.pid for process in self._handing_out}
+
+    def close(self):
+        for process in self._ready:
+            if process.returncode is None:
+                _signal_group(process.pid, signal.SIGKILL)
+        self._ready.clear()
+
+
+class RunnerAgent:
+    def __init__(
+        self,
+        socket_path: str,
+        warm_pool: WarmPool,
+        kill_grace: float = KILL_GRACE_SECONDS,
+        reap_interval: float = REAP_INTERVAL_SECONDS,
+    ):
+        self.socket_path = socket_path
+        self.warm_pool = warm_pool
+        self.kill_grace = kill_grace
+        self.reap_interval = reap_interval
+        self.jobs: Dict[str, asyncio.subprocess.Process] = {}
+        self._terminations: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = await asyncio.start_unix_server(
+            self.handle_connection, path=self.socket_path, limit=STREAM_LIMIT
+        )
+        os.chmod(self.socket_path, 0o666)
+        self.warm_pool.refill()
+        reaper = asyncio.create_task(self._reap_loop())
+        logger.info(f"Runner agent listening on {self.socket_path}")
+        try:
+            async with server:
+                await self._stopping.wait()
+        finally:
+            reaper.cancel()
+            await self.shutdown()
+
+    async def shutdown(self):
+        """Terminate every running job, e.g. when the container is stopped."""
+        if self.jobs:
+            logger.info(f"Terminating {len(self.jobs)} running jobs")
+        await asyncio.gather(*(self.terminate_job(job_id) for job_id in list(self.jobs)))
+        self.warm_pool.close()
+
+    async def reap(self) -> List[int]:
+        """Kill tool process groups that no running job owns."""
+        live = {process.pid for process in self.jobs.values()} | self.warm_pool.pgids()
+        orphans = sorted(find_orphans(AGENT_ID, live))
+        if orphans:
+            logger.warning(f"Reaping orphaned tool process groups: {orphans}")
+            await asyncio.gather(*(terminate_group(pgid, self.kill_grace) for pgid in orphans))
+        return orphans
+
+    async def _reap_loop(self):
+        while True:
+            try:
+                await self.reap()
+            except Exception:
+                logger.exception("Reaping orphaned tool processes failed")
+            await asyncio.sleep(self.reap_interval)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        current: Dict[str, Any] = {}
+
+        async def send(message: Dict[str, Any]):
+            async with write_lock:
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                try:
+                    request = json.loads(raw)
+                except ValueError:
+                    await send({"event": "error", "error": "invalid JSON request"})
+                    continue
+
+                op = request.get("op")
+                if op == "ping":
+                    await send({
+                        "event": "pong",
+                        "jobs": len(self.jobs),
+                        "warm_ready": len(self.warm_pool._ready),
+                        "warm_hits": self.warm_pool.hits,
+                        "warm_misses": self.warm_pool.misses,
+                    })
+                elif op == "run":
+                    task = current.get("task")
+                    if task is not None and not task.done():
+                        await send({"job_id": request.get("job_id"), "event": "error", "error": "connection busy"})
+                        continue
+                    current["job_id"] = request.get("job_id")
+                    current["task"] = asyncio.create_task(self.run_job(request, send))
+                elif op == "kill":
+                    self.kill_job(request.get("job_id"), request.get("grace"))
+                elif op == "reap":
+                    await send({"event": "reaped", "pgids": await self.reap()})
+                else:
+                    await send({"event": "error", "error": f"unknown op {op!r}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # A client that goes away mid-job no longer wants the output.
+            if current.get("job_id"):
+                self.kill_job(current["job_id"])
+            task = current.get("task")
+            if task is not None:
+                try:
+                    await task
+                except Exception:
+                    pass
+            writer.close()
+
+    async def run_job(self, request: Dict[str, Any], send):
+        job_id = request.get("job_id")
+        argv = request.get("argv") or []
+        try:
+            process = None
+            warm = False
+            if is_python_script(argv):
+                process = await self.warm_pool.take(argv[1:])
+                warm = process is not None
+            if process is None:
+                # Unbuffered, so Python tools stream their output instead of writing it in blocks.
+                env = {**os.environ, JOB_ENV: job_id, OWNER_ENV: AGENT_ID, "PYTHONUNBUFFERED": "1"}
+                if request.get("timeout"):
+                    env[DEADLINE_ENV] = str(time.time() + float(request["timeout"]))
+                process = await asyncio.create_subprocess_exec(
+                    *argv,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    limit=STREAM_LIMIT,
+                    env=env,
+                    start_new_session=True,
+                )
+        except Exception as e:
+            logger.warning(f"Failed to start job {job_id}: {e}")
+            await send({"job_id": job_id, "event": "exit", "returncode": 127, "error": str(e)})
+            return
+
+        self.jobs[job_id] = process
+        if warm:
+            self.warm_pool.handed_over(process)
+        logger.info(f"Job {job_id} started (pid={process.pid}, warm={warm}): {' '.join(argv)}")
+        exit_message = {"job_id": job_id, "event": "exit"}
+        try:
+            await send({"job_id": job_id, "event": "started", "pid": process.pid, "warm": warm})
+
+            async def pump(stream: asyncio.StreamReader, name: str):
+                while True:
+                    line = await read_line(stream)
+                    if not line:
+                        break
+                    await send({"job_id": job_id, "stream": name, "line": line.decode(errors="replace").rstrip("\n")})
+
+            await asyncio.gather(pump(process.stdout, "stdout"), pump(process.stderr, "stderr"))
+            await process.wait()
+        except (ConnectionError, RuntimeError):
+            pass
+        except Exception as e:
+            logger.exception(f"Failed to relay the output of job {job_id}")
+            exit_message["error"] = str(e)
+        finally:
+            # A job whose output can no longer be relayed is stopped.
+            if process.returncode is None:
+                await terminate_group(process.pid, self.kill_grace)
+                await process.wait()
+            # Children the tool left behind when it exited go with it.
+            if group_alive(process.pid):
+                await terminate_group(process.pid, self.kill_grace)
+            self.jobs.pop(job_id, None)
+            logger.info(f"Job {job_id} finished (returncode={process.returncode})")
+            # Always sent, so the client never waits for its timeout; lost if the client is gone.
+            try:
+                await send({**exit_message, "returncode": process.returncode})
+            except (ConnectionError, RuntimeError):
+                pass
+
+    async def terminate_job(self, job_id: Optional[str], grace: Optional[float] = None):
+        process = self.jobs.get(job_id)
+        if process is None:
+            return
+        grace = self.kill_grace if grace is None else float(grace)
+        logger.info(f"Terminating job {job_id} (pgid={process.pid}, grace={grace}s)")
+        await terminate_group(process.pid, grace)
+
+    def kill_job(self, job_id: Optional[str], grace: Optional[float] = None):
+        task = asyncio.create_task(self.terminate_job(job_id, grace))
+        self._terminations.add(task)
+        task.add_done_callback(self._terminations.discard)
+
+
+async def reap(socket_path: str) -> List[int]:
+    """
+    Ask the running agent to reap orphans; without a reachable agent every
+    tool process left by an agent is an orphan.
+    """
+    try:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    except OSError:
+        orphans = sorted(find_orphans(None, set()))
+        await asyncio.gather(*(terminate_group(pgid) for pgid in orphans))
+        return orphans
+    try:
+        writer.write(b'{"op": "reap"}\n')
+        await writer.drain()
+        message = json.loads(await asyncio.wait_for(reader.readline(), timeout=KILL_GRACE_SECONDS + 30))
+        return message.get("pgids", [])
+    finally:
+        writer.close()
+
+
+async def ping(socket_path: str) -> Dict[str, Any]:
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    try:
+        writer.write(b'{"op": "ping"}\n')
+        await writer.drain()
+        return json.loads(await asyncio.wait_for(reader.readline(), timeout=5))
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Security tools runner agent")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--warm-pool-size", type=int, default=WARM_POOL_SIZE)
+    parser.add_argument("--warm-preload", default=WARM_PRELOAD)
+    parser.add_argument("--ping", action="store_true", help="Ping a running agent and exit (healthcheck)")
+    parser.add_argument("--kill-job", metavar="JOB_ID", help="Terminate the processes of a job and exit")
+    parser.add_argument("--grace", type=float, default=KILL_GRACE_SECONDS, help="Seconds between SIGTERM and SIGKILL")
+    parser.add_argument("--reap", action="store_true", help="Kill orphaned tool processes and exit")
+    args = parser.parse_args()
+
+    if args.kill_job:
+        print(json.dumps({"job_id": args.kill_job, "pgids": asyncio.run(kill_tagged_job(args.kill_job, args.grace))}))
+        return
+
+    if args.reap:
+        print(json.dumps({"pgids": asyncio.run(reap(args.socket))}))
+        return
+
+    if args.ping:
+        try:
+            print(json.dumps(asyncio.run(ping(args.socket))))
+        except Exception as e:
+            print(f"Runner agent not reachable: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    warm_pool = WarmPool(args.warm_pool_size, args.warm_preload)
+    agent = RunnerAgent(args.socket, warm_pool, kill_grace=args.grace)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, agent.stop)
+        await agent.serve()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
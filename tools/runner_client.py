@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.logger import logger
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+STREAM_LIMIT = 1024 * 1024
+
+
+class RunnerUnavailable(Exception):
+    """Raised when the runner agent socket cannot be reached."""
+
+
+class _FlowControl(asyncio.ReadTransport):
+    """
+    Stands in for the transport of a fed StreamReader. The reader pauses it once
+    more than twice its limit is buffered, and the pump waits for it to resume
+    before reading on, so a slow consumer makes the agent (and through it the
+    tool) block instead of output piling up in memory.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.resumed = asyncio.Event()
+        self.resumed.set()
+
+    def pause_reading(self):
+        self.resumed.clear()
+
+    def resume_reading(self):
+        self.resumed.set()
+
+    def is_reading(self) -> bool:
+        return self.resumed.is_set()
+
+
+class RunnerProcess:
+    """
+    A job running in the runner agent, exposed with the same surface as
+    `asyncio.subprocess.Process` (stdout/stderr readers, wait, kill, communicate) plus `terminate`
+    so the tool runners can treat both execution paths alike.
+    """
+
+    def __init__(self, client: "RunnerClient", connection: Connection, job_id: str):
+        self._client = client
+        self._reader, self._writer = connection
+        self.job_id = job_id
+        self.pid: Optional[int] = None
+        self.warm = False
+        self.returncode: Optional[int] = None
+        self.stdout = asyncio.StreamReader(limit=STREAM_LIMIT)
+        self.stderr = asyncio.StreamReader(limit=STREAM_LIMIT)
+        self._flows = {"stdout": _FlowControl(), "stderr": _FlowControl()}
+        self.stdout.set_transport(self._flows["stdout"])
+        self.stderr.set_transport(self._flows["stderr"])
+        # Set once the output is no longer wanted; the pump then only waits for the exit.
+        self._discard = False
+        self._started = asyncio.get_running_loop().create_future()
+        self._exited = asyncio.Event()
+        self._pump_task = asyncio.create_task(self._pump())
+
+    async def _pump(self):
+        reusable = False
+        try:
+            while True:
+                raw = await self._reader.readline()
+                if not raw:
+                    break
+                message = json.loads(raw)
+                if message.get("job_id") != self.job_id:
+                    continue
+                stream = message.get("stream")
+                if stream in self._flows:
+                    if not self._discard:
+                        getattr(self, stream).feed_data((message["line"] + "\n").encode())
+                        await self._flows[stream].resumed.wait()
+                elif message.get("event") == "started":
+                    self.pid = message.get("pid")
+                    self.warm = message.get("warm", False)
+                    if not self._started.done():
+                        self._started.set_result(None)
+                elif message.get("event") in ("exit", "error"):
+                    self.returncode = message.get("returncode", 1)
+                    reusable = message.get("event") == "exit"
+                    break
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Lost connection to runner agent during job {self.job_id}: {e}")
+        finally:
+            if self.returncode is None:
+                self.returncode = -9
+            if not self._started.done():
+                self._started.set_result(None)
+            self.stdout.feed_eof()
+            self.stderr.feed_eof()
+            self._exited.set()
+            self._client._release((self._reader, self._writer), reusable)
+
+    async def wait(self) -> int:
+        await self._exited.wait()
+        return self.returncode
+
+    def kill(self, grace: Optional[float] = None):
+        if self._exited.is_set():
+            return
+        self._discard = True
+        for flow in self._flows.values():
+            flow.resume_reading()
+        message: Dict[str, Any] = {"op": "kill", "job_id": self.job_id}
+        if grace is not None:
+            message["grace"] = grace
+        try:
+            self._writer.write((json.dumps(message) + "\n").encode())
+        except Exception:
+            self._writer.close()
+
+    async def terminate(self, grace: float) -> int:
+        """
+        Have the agent SIGTERM the job's process group and SIGKILL it after
+        `grace` seconds, then wait for the job to exit.
+        """
+        self.kill(grace)
+        try:
+            await asyncio.wait_for(self._exited.wait(), timeout=grace + self._client.connect_timeout + 5)
+        except asyncio.TimeoutError:
+            # The agent also terminates the job of a connection that goes away.
+            logger.warning(f"Runner agent did not confirm termination of job {self.job_id}, dropping the connection")
+            self._writer.close()
+        return await self.wait()
+
+    async def communicate(self) -> Tuple[bytes, bytes]:
+        stdout, stderr = await asyncio.gather(self.stdout.read(), self.stderr.read())
+        await self.wait()
+        return stdout, stderr
+
+
+class RunnerClient:
+    """
+    Connection-pooled client for the runner agent in the tools container.
+    """
+
+    def __init__(self, socket_path: str, pool_size: int = 8, connect_timeout: float = 2.0):
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self._idle: List[Connection] = []
+
+    def available(self) -> bool:
+        return os.path.exists(self.socket_path)
+
+    async def _acquire(self) -> Connection:
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+        try:
+            return await asyncio.wait_for(
+                asyncio.open_unix_connection(self.socket_path, limit=1024 * 1024),
+                timeout=self.connect_timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise RunnerUnavailable(f"Cannot connect to runner agent at {self.socket_path}: {e}") from e
+
+    def _release(self, connection: Connection, reusable: bool):
+        reader, writer = connection
+        if reusable and len(self._idle) < self.pool_size and not writer.is_closing():
+            self._idle.append(connection)
+        else:
+            writer.close()
+
+    async def _send(self, connection: Connection, message: Dict[str, Any]):
+        _, writer = connection
+        writer.write((json.dumps(message) + "\n").encode())
+        await writer.drain()
+
+    async def spawn(self, argv: List[str], job_id: Optional[str] = None, timeout: Optional[float] = None) -> RunnerProcess:
+        """
+        Start `argv` in the tools container and return a process-like handle.
+        `timeout` lets the agent's reaper recognise the job's processes once they outlive it.
+        """
+        connection = await self._acquire()
+        job_id = job_id or uuid.uuid4().hex
+        request: Dict[str, Any] = {"op": "run", "job_id": job_id, "argv": argv}
+        if timeout:
+            request["timeout"] = timeout
+        try:
+            await self._send(connection, request)
+        except (ConnectionError, OSError) as e:
+            connection[1].close()
+            raise RunnerUnavailable(f"Runner agent connection failed: {e}") from e
+        process = RunnerProcess(self, connection, job_id)
+        await process._started
+        return process
+
+    async def ping(self) -> Dict[str, Any]:
+        connection = await self._acquire()
+        try:
+            await self._send(connection, {"op": "ping"})
+            message = json.loads(await asyncio.wait_for(connection[0].readline(), timeout=self.connect_timeout))
+        except Exception:
+            connection[1].close()
+            raise
+        self._release(connection, True)
+        return message
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
@@ -0,0 +1,99 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Tuple
+
+from tools.logger import logger
+
+
+def parse_tool_config(value: str) -> Dict[str, int]:
+    """
+    Parse a per-tool integer setting such as "amass=2,subfinder=4,theharvester=2".
+    """
+    slots = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        tool, _, count = item.partition("=")
+        slots[tool.strip().lower()] = int(count)
+    return slots
+
+
+class _ToolSlots:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.granted = 0
+        self.total_wait_seconds = 0.0
+
+
+class ToolScheduler:
+    """
+    Limits how many processes of each tool run at once.
+    Callers waiting for a slot are served by priority (higher first), then FIFO.
+    """
+
+    def __init__(self, slots: Dict[str, int], default_slots: int = 2):
+        self.default_slots = default_slots
+        self._tools: Dict[str, _ToolSlots] = {
+            tool.lower(): _ToolSlots(limit) for tool, limit in slots.items()
+        }
+        self._counter = itertools.count()
+
+    def _get(self, tool: str) -> _ToolSlots:
+        tool = tool.lower()
+        if tool not in self._tools:
+            self._tools[tool] = _ToolSlots(self.default_slots)
+        return self._tools[tool]
+
+    async def acquire(self, tool: str, priority: int = 0) -> None:
+        slots = self._get(tool)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        if slots.in_use < slots.limit and not slots.waiters:
+            slots.in_use += 1
+        else:
+            future = loop.create_future()
+            heapq.heappush(slots.waiters, (-priority, next(self._counter), future))
+            logger.debug(f"Waiting for a {tool} slot ({len(slots.waiters)} waiting, {slots.in_use}/{slots.limit} in use)")
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just as we were cancelled.
+                    self.release(tool)
+                raise
+        slots.granted += 1
+        slots.total_wait_seconds += loop.time() - started
+
+    def release(self, tool: str) -> None:
+        slots = self._get(tool)
+        while slots.waiters:
+            _, _, future = heapq.heappop(slots.waiters)
+            if not future.done():
+                # Hand the slot straight to the next waiter; in_use stays the same.
+                future.set_result(None)
+                return
+        slots.in_use -= 1
+
+    @asynccontextmanager
+    async def slot(self, tool: str, priority: int = 0):
+        await self.acquire(tool, priority)
+        try:
+            yield
+        finally:
+            self.release(tool)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            tool: {
+                "slots": slots.limit,
+                "in_use": slots.in_use,
+                "waiting": sum(1 for _, _, f in slots.waiters if not f.done()),
+                "granted": slots.granted,
+                "avg_wait_seconds": round(slots.total_wait_seconds / slots.granted, 3) if slots.granted else 0.0,
+            }
+            for tool, slots in self._tools.items()
+        }
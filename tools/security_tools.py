@@ -1,332 +1,389 @@
 import subprocess
-import json
 import os
 import asyncio
-from typing import List, Dict, Any
+import glob
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple
 from tools.logger import logger
+from tools.runner_client import RunnerClient, RunnerProcess, RunnerUnavailable
+from tools.batching import ToolBatcher
+from tools.findings import FindingsAccumulator
+from tools.harvester import HARVESTER_KINDS, HarvesterOutputParser, load_output_file
+from tools.partial_results import PartialResultsStore
+from tools.scheduler import parse_tool_config
+from tools.streams import StderrTail, drain_process
+
+# Path of the runner agent inside the tools container; its CLI kills `docker exec` jobs.
+RUNNER_AGENT_PATH = "/opt/runner/runner_agent.py"
+# The shared directory as the tools container mounts it.
+TOOLS_CONTAINER_SHARED_DIR = "/home/tools/shared"
+# Tools that take several target domains per process.
+BATCHABLE_TOOLS = ("amass", "subfinder")
+
+
+async def offload_to_thread(func, *args, size: int, threshold: int = 0):
+    """
+    Default `offload` of SecurityTools: run `func(*args)` in a worker thread
+    when `size` reaches `threshold`, inline otherwise.
+    """
+    if size >= threshold:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
 
 class SecurityTools:
-    def __init__(self):
-        self.shared_dir = "/home/app/shared"
-        self.tools_container = "security-tools"
+    def __init__(self, settings, tool_slot=None, offload=offload_to_thread):
+        """
+        `settings` carries the TOOLS_*, PARTIAL_RESULTS_* and TOOL_BATCH_* options
+        (the backend passes its app.config settings). `tool_slot(tool, priority)`
+        is the async context manager batched runs hold for their process (see
+        ToolScheduler.slot); unbatched runs leave slots to the caller.
+        `offload(func, *args, size=, threshold=)` runs CPU-heavy result parsing
+        off the event loop (the backend passes its process pool's run_cpu_bound).
+        """
+        self.shared_dir = settings.TOOLS_SHARED_DIR
+        self.tools_container = settings.TOOLS_CONTAINER_NAME
+        self.runner = RunnerClient(
+            settings.TOOLS_RUNNER_SOCKET,
+            pool_size=settings.TOOLS_RUNNER_POOL_SIZE,
+            connect_timeout=settings.TOOLS_RUNNER_CONNECT_TIMEOUT,
+        )
+        self.kill_grace_seconds = settings.TOOLS_KILL_GRACE_SECONDS
+        self.stderr_tail_bytes = settings.TOOLS_STDERR_TAIL_BYTES
+        self.output_offload_bytes = settings.TOOLS_OUTPUT_OFFLOAD_BYTES
+        self.offload = offload
+        # Tool processes started by this instance that have not exited yet, by job id.
+        self.processes: Dict[str, Any] = {}
       
-        self.partial_results = {}
+        self.partial_results = PartialResultsStore(
+            max_bytes=settings.PARTIAL_RESULTS_MAX_BYTES,
+            ttl_seconds=settings.PARTIAL_RESULTS_TTL_SECONDS,
+        )
+
+        run_batch = {"amass": self._run_amass_batch, "subfinder": self._run_subfinder_batch}
+        self.batchers: Dict[str, ToolBatcher] = {}
+        for tool, batch_size in parse_tool_config(settings.TOOL_BATCH_SIZES).items():
+            if tool not in BATCHABLE_TOOLS:
+                logger.warning(f"{tool} cannot run several domains per process, TOOL_BATCH_SIZES ignores it")
+            elif batch_size > 1:
+                self.batchers[tool] = ToolBatcher(
+                    tool, run_batch[tool], batch_size, settings.TOOL_BATCH_MAX_WAIT_SECONDS,
+                    slot=tool_slot, stop_margin=self.kill_grace_seconds + 10,
+                )
+
+    def batched(self, tool: str) -> bool:
+        """Whether runs of `tool` are batched, and so take their tool slot themselves."""
+        return tool.lower() in self.batchers
+
+    def batch_snapshot(self) -> Dict[str, Any]:
+        return {tool: batcher.snapshot() for tool, batcher in self.batchers.items()}
+
+    async def _spawn(self, argv: List[str], timeout: Optional[float] = None):
+        """
+        Start a tool inside the tools container. Goes through the runner agent
+        when its socket is available and falls back to `docker exec` otherwise.
+        Either way the tool runs in its own process group, tagged with a job id
+        (`process.job_id`) that terminate() and the agent's reaper go by.
+        """
+        job_id = uuid.uuid4().hex
+        if self.runner.available():
+            try:
+                return await self.runner.spawn(argv, job_id=job_id, timeout=timeout)
+            except RunnerUnavailable as e:
+                logger.warning(f"Runner agent unavailable, falling back to docker exec: {e}")
+
+        tags = ["-e", f"MYOSINT_JOB_ID={job_id}", "-e", "MYOSINT_JOB_OWNER=exec", "-e", "PYTHONUNBUFFERED=1"]
+        if timeout:
+            tags += ["-e", f"MYOSINT_JOB_DEADLINE={time.time() + timeout + self.kill_grace_seconds}"]
+        cmd = ["docker", "exec", *tags, self.tools_container, "setsid", "-w", *argv]
+        logger.debug(f"Executing command: {' '.join(cmd)}")
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        process.job_id = job_id
+        return process
+
+    @asynccontextmanager
+    async def _tool_process(self, argv: List[str], timeout: Optional[float] = None):
+        """
+        Spawn a tool and make sure its process tree is gone when the block is
+        left, including when the caller is cancelled or times out.
+        """
+        process = await self._spawn(argv, timeout)
+        self.processes[process.job_id] = process
+        try:
+            yield process
+        finally:
+            if process.returncode is None:
+                # Shielded so a second cancellation cannot leave the tool running.
+                await asyncio.shield(self.terminate(process))
+            self.processes.pop(process.job_id, None)
+
+    async def terminate(self, process, grace: Optional[float] = None) -> None:
+        """
+        SIGTERM the tool's process group inside the tools container, SIGKILL it
+        after the grace period and wait for the process handle to exit.
+        """
+        grace = self.kill_grace_seconds if grace is None else grace
+        if isinstance(process, RunnerProcess):
+            await process.terminate(grace)
+            return
+
+        # Killing the local `docker exec` client would leave the tool running in the container.
+        try:
+            killer = await asyncio.create_subprocess_exec(
+                "docker", "exec", self.tools_container,
+                "python3", RUNNER_AGENT_PATH, "--kill-job", process.job_id, "--grace", str(grace),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            await asyncio.wait_for(killer.wait(), timeout=grace + 30)
+        except Exception as e:
+            logger.warning(f"Failed to terminate job {process.job_id} in the tools container: {e}")
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
+    async def terminate_all(self) -> None:
+        """Terminate every tool process still running, e.g. on worker shutdown."""
+        if self.processes:
+            logger.info(f"Terminating {len(self.processes)} running tool processes")
+        await asyncio.gather(
+            *(self.terminate(process) for process in list(self.processes.values())),
+            return_exceptions=True,
+        )
+
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        Report whether the runner agent and the tools container are reachable.
+        """
+        runner_status: Dict[str, Any] = {"available": False}
+        if self.runner.available():
+            try:
+                runner_status = {"available": True, **await self.runner.ping()}
+            except Exception as e:
+                runner_status["error"] = str(e)
+
+        process = await self._spawn(["which", "amass", "subfinder", "theharvester"])
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout=30)
+        return {
+            "status": "ok" if process.returncode == 0 else "degraded",
+            "runner": runner_status,
+            "tools": stdout.decode().split(),
+        }
     
-    async def get_partial_results(self, domain: str) -> Dict[str, Any]:
+    async def get_partial_results(self, scan_id: str, tool: str) -> Dict[str, Any]:
        
-        return self.partial_results.get(domain, {
-            "subdomains": [],
-            "emails": [],
-            "hosts": [],
-            "ips": []
-        })
+        snapshot = self.partial_results.get(scan_id, tool)
+        if snapshot is None:
+            return FindingsAccumulator().to_dict()
+        return snapshot.to_dict()
     
-    def clear_partial_results(self, domain: str):
+    def clear_partial_results(self, scan_id: str, tool: str):
       
-        if domain in self.partial_results:
-            del self.partial_results[domain]
+        self.partial_results.discard(scan_id, tool)
     
-    async def run_amass(self, domain: str, timeout: int = 300) -> Dict[str, Any]:
+    async def _stream_tool(self, cmd: List[str], timeout: float, on_line) -> Tuple[Optional[int], str]:
         """
-        Run Amass subdomain enumeration with partial results support
+        Run a tool, handing each stdout line to `on_line` while its stderr is
+        drained into a bounded tail. Returns the exit code (None when the tool
+        timed out and was terminated) and the stderr tail.
         """
-        logger.info(f"Starting Amass scan for domain: {domain}")
-        
-      
-        self.partial_results[domain] = {
-            "subdomains": [],
-            "emails": [],
-            "hosts": [],
-            "ips": []
-        }
-        
-        try:
-            cmd = [
-                "docker", "exec", self.tools_container,
-                "amass", "enum", "-passive", "-d", domain
-            ]
-            logger.debug(f"Executing Amass command: {' '.join(cmd)}")
-
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            subdomains_found = []
-            
+        stderr = StderrTail(self.stderr_tail_bytes)
+        async with self._tool_process(cmd, timeout) as process:
             try:
-                while True:
-                    try:
-                        line = await asyncio.wait_for(
-                            process.stdout.readline(), 
-                            timeout=10
-                        )
-                        if not line:
-                            break
-                            
-                        decoded = line.decode().strip()
-                        if decoded and decoded not in subdomains_found:
-                            subdomains_found.append(decoded)
-                            self.partial_results[domain]["subdomains"] = subdomains_found
-                            logger.debug(f"Found subdomain: {decoded} (total: {len(subdomains_found)})")
-                            
-                    except asyncio.TimeoutError:
-                      
-                        if process.returncode is not None:
-                            break
-                        continue
-                        
-              
-                await asyncio.wait_for(process.wait(), timeout=timeout)
-                
-                logger.info(f"Amass completed successfully for {domain}. Found {len(subdomains_found)} subdomains.")
-                return {
-                    "success": True,
-                    "tool": "amass",
-                    "domain": domain,
-                    "subdomains": subdomains_found,
-                    "count": len(subdomains_found)
-                }
-                
+                returncode = await asyncio.wait_for(drain_process(process, on_line, stderr), timeout=timeout)
             except asyncio.TimeoutError:
-              
-                logger.warning(f"Amass timed out for {domain}, returning partial results: {len(subdomains_found)} subdomains")
-                try:
-                    process.kill()
-                    await process.wait()
-                except:
-                    pass
-                    
-                return {
-                    "success": True, 
-                    "partial": True,
-                    "timeout": True,
-                    "tool": "amass",
-                    "domain": domain,
-                    "subdomains": subdomains_found,
-                    "count": len(subdomains_found),
-                    "error": f"Timeout after {timeout} seconds"
-                }
-                
+                await self.terminate(process)
+                returncode = None
+        tail = stderr.text()
+        if tail:
+            logger.debug(f"{cmd[0]} stderr (last {self.stderr_tail_bytes} bytes): {tail}")
+        return returncode, tail
+
+    def _subdomain_result(self, tool: str, domain: str, findings, returncode: Optional[int], stderr: str, timeout: float) -> Dict[str, Any]:
+        result = {
+            "success": True,
+            "tool": tool,
+            "domain": domain,
+            "subdomains": findings.to_dict()["subdomains"],
+            "count": findings.count("subdomains"),
+            "returncode": returncode,
+            "stderr": stderr,
+        }
+        if returncode is None:
+            logger.warning(f"{tool} timed out for {domain}, returning partial results: {findings.count('subdomains')} subdomains")
+            result.update(partial=True, timeout=True, error=f"Timeout after {timeout} seconds")
+        else:
+            logger.info(f"{tool} completed for {domain} (exit code {returncode}). Found {findings.count('subdomains')} subdomains.")
+        return result
+
+    async def _run_subdomain_tool(self, tool: str, cmd: List[str], domain: str, timeout: int, scan_id: Optional[str]) -> Dict[str, Any]:
+        findings = self.partial_results.open(scan_id or domain, tool)
+        logger.debug(f"Executing {tool} command: {' '.join(cmd)}")
+
+        def on_line(line: str):
+            if findings.add("subdomains", line):
+                logger.debug(f"{tool} found: {line} (total: {findings.count('subdomains')})")
+
+        try:
+            returncode, stderr = await self._stream_tool(cmd, timeout, on_line)
         except Exception as e:
-            logger.exception(f"Exception in Amass for {domain}")
-          
-            partial = self.partial_results.get(domain, {})
+            logger.exception(f"Exception in {tool} for {domain}")
             return {
                 "success": False,
                 "error": str(e),
-                "subdomains": partial.get("subdomains", []),
-                "count": len(partial.get("subdomains", []))
+                "subdomains": findings.to_dict()["subdomains"],
+                "count": findings.count("subdomains")
             }
-    
-    async def run_subfinder(self, domain: str, timeout: int = 120) -> Dict[str, Any]:
+        return self._subdomain_result(tool, domain, findings, returncode, stderr, timeout)
+
+    async def _run_batched(self, tool: str, domain: str, timeout: int, scan_id: Optional[str], priority: int) -> Dict[str, Any]:
         """
-        Run subfinder with partial results support
+        Run `tool` for `domain` as part of a batch; the result has the same
+        shape as a single-domain run's, plus the number of domains the process ran.
         """
-        logger.info(f"Starting subfinder scan for domain: {domain}")
-        
-     
-        self.partial_results[domain] = {
-            "subdomains": [],
-            "emails": [],
-            "hosts": [],
-            "ips": []
-        }
-        
+        findings = self.partial_results.open(scan_id or domain, tool)
         try:
-            cmd = [
-                "docker", "exec", self.tools_container,
-                "subfinder", "-d", domain, "-silent"
-            ]
-            logger.debug(f"Executing subfinder command: {' '.join(cmd)}")
-
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            subdomains_found = []
-            
-            try:
-                while True:
-                    try:
-                        line = await asyncio.wait_for(
-                            process.stdout.readline(), 
-                            timeout=10
-                        )
-                        if not line:
-                            break
-                            
-                        decoded = line.decode().strip()
-                        if decoded and decoded not in subdomains_found:
-                            subdomains_found.append(decoded)
-                            self.partial_results[domain]["subdomains"] = subdomains_found
-                            logger.debug(f"Subfinder found: {decoded} (total: {len(subdomains_found)})")
-                            
-                    except asyncio.TimeoutError:
-                        if process.returncode is not None:
-                            break
-                        continue
-                        
-                await asyncio.wait_for(process.wait(), timeout=timeout)
-                
-                logger.info(f"Subfinder completed for {domain}. Found {len(subdomains_found)} subdomains.")
-                return {
-                    "success": True,
-                    "tool": "subfinder",
-                    "domain": domain,
-                    "subdomains": subdomains_found,
-                    "count": len(subdomains_found)
-                }
-                
-            except asyncio.TimeoutError:
-                logger.warning(f"Subfinder timed out for {domain}, returning partial results: {len(subdomains_found)} subdomains")
-                try:
-                    process.kill()
-                    await process.wait()
-                except:
-                    pass
-                    
-                return {
-                    "success": True,
-                    "partial": True,
-                    "timeout": True,
-                    "tool": "subfinder", 
-                    "domain": domain,
-                    "subdomains": subdomains_found,
-                    "count": len(subdomains_found),
-                    "error": f"Timeout after {timeout} seconds"
-                }
-                
+            returncode, stderr, batch_domains = await self.batchers[tool].submit(domain, findings, timeout, priority)
         except Exception as e:
-            logger.exception(f"Exception in subfinder for {domain}")
-            partial = self.partial_results.get(domain, {})
+            logger.exception(f"Exception in batched {tool} for {domain}")
             return {
                 "success": False,
                 "error": str(e),
-                "subdomains": partial.get("subdomains", []),
-                "count": len(partial.get("subdomains", []))
+                "subdomains": findings.to_dict()["subdomains"],
+                "count": findings.count("subdomains")
             }
+        result = self._subdomain_result(tool, domain, findings, returncode, stderr, timeout)
+        result["batch_domains"] = batch_domains
+        return result
+
+    async def _run_amass_batch(self, domains: List[str], timeout: float, on_line) -> Tuple[Optional[int], str]:
+        cmd = ["amass", "enum", "-passive"]
+        for domain in domains:
+            cmd += ["-d", domain]
+        logger.debug(f"Executing amass command: {' '.join(cmd)}")
+        return await self._stream_tool(cmd, timeout, on_line)
+
+    async def _run_subfinder_batch(self, domains: List[str], timeout: float, on_line) -> Tuple[Optional[int], str]:
+        # subfinder reads the domains from a file in the shared directory.
+        list_name = f"subfinder_domains_{uuid.uuid4().hex[:12]}.txt"
+        api_list_path = f"{self.shared_dir}/{list_name}"
+        with open(api_list_path, "w") as f:
+            f.write("\n".join(domains) + "\n")
+        try:
+            cmd = ["subfinder", "-dL", f"{TOOLS_CONTAINER_SHARED_DIR}/{list_name}", "-silent"]
+            logger.debug(f"Executing subfinder command: {' '.join(cmd)}")
+            return await self._stream_tool(cmd, timeout, on_line)
+        finally:
+            try:
+                os.remove(api_list_path)
+            except OSError as e:
+                logger.warning(f"Could not remove subfinder domain list {api_list_path}: {e}")
+
+    async def run_amass(self, domain: str, timeout: int = 300, scan_id: Optional[str] = None, priority: int = 0) -> Dict[str, Any]:
+        """
+        Run Amass subdomain enumeration with partial results support
+        """
+        logger.info(f"Starting Amass scan for domain: {domain}")
+        if "amass" in self.batchers:
+            return await self._run_batched("amass", domain, timeout, scan_id, priority)
+        return await self._run_subdomain_tool(
+            "amass", ["amass", "enum", "-passive", "-d", domain], domain, timeout, scan_id
+        )
+
+    async def run_subfinder(self, domain: str, timeout: int = 120, scan_id: Optional[str] = None, priority: int = 0) -> Dict[str, Any]:
+        """
+        Run subfinder with partial results support
+        """
+        logger.info(f"Starting subfinder scan for domain: {domain}")
+        if "subfinder" in self.batchers:
+            return await self._run_batched("subfinder", domain, timeout, scan_id, priority)
+        return await self._run_subdomain_tool(
+            "subfinder", ["subfinder", "-d", domain, "-silent"], domain, timeout, scan_id
+        )
 
-    async def run_theharvester(self, domain: str, sources: str = "google,bing", timeout: int = 300) -> Dict[str, Any]:
+    async def _read_harvester_output(self, path: str, findings) -> None:
         """
-        Run theHarvester with partial results support
+        Add what the report file holds beyond the streamed findings. Large
+        reports are decoded through `offload` so the event loop keeps serving.
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            file_results = await self.offload(
+                load_output_file, path, size=os.path.getsize(path), threshold=self.output_offload_bytes
+            )
+            for kind in HARVESTER_KINDS:
+                findings.extend(kind, file_results[kind])
+        except Exception as e:
+            logger.error(f"Error reading theHarvester output: {e}")
+
+    def _remove_harvester_output(self, output_stem: str) -> None:
+        # theHarvester may write more than one report format next to the requested path.
+        for path in glob.glob(f"{self.shared_dir}/{output_stem}*"):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove theHarvester output {path}: {e}")
+
+    async def run_theharvester(self, domain: str, sources: str = "google,bing", timeout: int = 300, scan_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run theHarvester with partial results support.
+        Findings are parsed from its stdout as it runs; the JSON report of a
+        complete run only adds what the console output left out.
         """
         logger.info(f"Starting theHarvester scan for domain: {domain}")
         
      
-        self.partial_results[domain] = {
-            "subdomains": [],
-            "emails": [],
-            "hosts": [],
-            "ips": []
-        }
+        findings = self.partial_results.open(scan_id or domain, "theharvester")
         
-        output_file_name = f"harvester_output_{domain.replace('.', '_')}.json"
-        tools_output_path = f"/home/tools/shared/{output_file_name}"
-        api_output_path = f"{self.shared_dir}/{output_file_name}"
+        # Unique per run, so concurrent scans of the same domain never share a report.
+        output_stem = f"harvester_output_{domain.replace('.', '_')}_{uuid.uuid4().hex[:12]}"
+        tools_output_path = f"{TOOLS_CONTAINER_SHARED_DIR}/{output_stem}.json"
+        api_output_path = f"{self.shared_dir}/{output_stem}.json"
 
         try:
             cmd = [
-                "docker", "exec", self.tools_container,
                 "python3", "/opt/theHarvester/theHarvester.py",
                 "-d", domain,
                 "-b", sources,
                 "-f", tools_output_path
             ]
             logger.debug(f"Executing theHarvester command: {' '.join(cmd)}")
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=timeout
-                )
-                
-          
-                results = {"emails": [], "hosts": [], "ips": []}
-                if os.path.exists(api_output_path):
-                    try:
-                        with open(api_output_path, 'r') as f:
-                            file_results = json.load(f)
-                            if 'hosts' in file_results:
-                                results['hosts'].extend(file_results['hosts'])
-                            if 'emails' in file_results:
-                                results['emails'].extend(file_results['emails'])
-                            if 'ips' in file_results:
-                                results['ips'].extend(file_results['ips'])
-                        
-                      
-                        self.partial_results[domain].update(results)
-                        
-                    except Exception as e:
-                        logger.error(f"Error reading theHarvester output: {e}")
-                    finally:
-                        if os.path.exists(api_output_path):
-                            os.remove(api_output_path)
-                
-                return {
-                    "success": True,
-                    "tool": "theHarvester",
-                    "domain": domain,
-                    "sources": sources,
-                    "results": results
-                }
-                
-            except asyncio.TimeoutError:
-                logger.warning(f"theHarvester timed out for {domain}")
-                try:
-                    process.kill()
-                    await process.wait()
-                except:
-                    pass
-                
-         
-                partial_results = {"emails": [], "hosts": [], "ips": []}
-                if os.path.exists(api_output_path):
-                    try:
-                        with open(api_output_path, 'r') as f:
-                            file_results = json.load(f)
-                            if 'hosts' in file_results:
-                                partial_results['hosts'].extend(file_results['hosts'])
-                            if 'emails' in file_results:
-                                partial_results['emails'].extend(file_results['emails'])
-                            if 'ips' in file_results:
-                                partial_results['ips'].extend(file_results['ips'])
-                        os.remove(api_output_path)
-                    except:
-                        pass
-                
-                return {
-                    "success": True,
-                    "partial": True,
-                    "timeout": True,
-                    "tool": "theHarvester",
-                    "domain": domain,
-                    "sources": sources,
-                    "results": partial_results,
-                    "error": f"Timeout after {timeout} seconds"
-                }
-                
+
+            returncode, stderr = await self._stream_tool(cmd, timeout, HarvesterOutputParser(findings).feed)
+            if returncode is not None:
+                # A timed-out run keeps what it streamed; its report may be half written.
+                await self._read_harvester_output(api_output_path, findings)
+
+            result = {
+                "success": True,
+                "tool": "theHarvester",
+                "domain": domain,
+                "sources": sources,
+                "results": findings.to_dict(HARVESTER_KINDS),
+                "returncode": returncode,
+                "stderr": stderr,
+            }
+            if returncode is None:
+                logger.warning(f"theHarvester timed out for {domain}, returning partial results: {len(findings)} findings")
+                result.update(partial=True, timeout=True, error=f"Timeout after {timeout} seconds")
+            return result
+
         except Exception as e:
             logger.exception(f"Exception in theHarvester for {domain}")
-            partial = self.partial_results.get(domain, {})
             return {
                 "success": False,
                 "error": str(e),
-                "results": {
-                    "emails": partial.get("emails", []),
-                    "hosts": partial.get("hosts", []),
-                    "ips": partial.get("ips", [])
-                }
+                "results": findings.to_dict(HARVESTER_KINDS)
             }
+        finally:
+            self._remove_harvester_output(output_stem)
     
     async def run_combined_scan(self, domain: str) -> Dict[str, Any]:
         """
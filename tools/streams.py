@@ -0,0 +1,94 @@
+import asyncio
+from typing import AsyncIterator, Callable, Optional
+
+CHUNK_SIZE = 64 * 1024
+# Longer stdout lines are cut here, a tool without newlines cannot grow the buffer without bound.
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class StderrTail:
+    """
+    Fixed-size ring buffer keeping the last `max_bytes` of a tool's stderr.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._buffer = bytearray()
+        self.total_bytes = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self.total_bytes += len(chunk)
+        self._buffer += chunk
+        overflow = len(self._buffer) - self.max_bytes
+        if overflow > 0:
+            del self._buffer[:overflow]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > len(self._buffer)
+
+    def text(self) -> str:
+        data = bytes(self._buffer)
+        if self.truncated:
+            # Start at a line boundary rather than in the middle of a line.
+            _, newline, rest = data.partition(b"\n")
+            data = rest if newline else data
+        return data.decode(errors="replace").strip()
+
+
+async def iter_lines(stream: asyncio.StreamReader, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[str]:
+    """
+    Decoded, stripped non-empty lines of a stream, read in chunks. The next
+    chunk is only read once the lines of the previous one have been handled,
+    so a slow consumer pauses the stream (and through it the tool) instead of
+    buffering its output.
+    """
+    pending = bytearray()
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find(b"\n", start)
+            if end < 0:
+                break
+            line = pending[start:end].decode(errors="replace").strip()
+            if line:
+                yield line
+            start = end + 1
+        del pending[:start]
+        if len(pending) > MAX_LINE_BYTES:
+            yield pending.decode(errors="replace").strip()
+            pending.clear()
+    line = pending.decode(errors="replace").strip()
+    if line:
+        yield line
+
+
+async def drain(stream: asyncio.StreamReader, tail: StderrTail, chunk_size: int = CHUNK_SIZE) -> None:
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        tail.feed(chunk)
+
+
+async def drain_process(
+    process,
+    on_line: Optional[Callable[[str], None]],
+    stderr: StderrTail,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """
+    Read a tool's stdout line by line and its stderr into `stderr` at the same
+    time, so neither pipe can fill up and block the tool. Returns the exit code.
+    """
+    async def read_stdout():
+        async for line in iter_lines(process.stdout, chunk_size):
+            if on_line is not None:
+                on_line(line)
+
+    await asyncio.gather(read_stdout(), drain(process.stderr, stderr, chunk_size))
+    return await process.wait()